@@ -1,7 +1,13 @@
 import streamlit as st
 import os
+from concurrent.futures import CancelledError
 from datetime import datetime
-from modulos.processamento import limpar_dados_brutos, gerar_dashboard_oee
+from modulos.processamento import limpar_dados_brutos, calcular_oee, salvar_historico_csv, gerar_relatorios_lote
+from modulos.cache_arquivos import carregar_historico, invalidar
+from modulos.desempenho import MedidorDesempenho, configurar_log_desempenho, vazao_leitura
+from modulos.espacos_trabalho import espaco_da_sessao, gravar_em_segundo_plano, limpar_espacos
+from modulos.ingestao import ArquivoEmMemoria
+from modulos.fila_tarefas import Progresso, TarefaCancelada, obter_fila
 import config
 import pandas as pd
 
@@ -11,6 +17,97 @@ st.set_page_config(
     layout="wide"
 )
 
+configurar_log_desempenho(config.DESEMPENHO_LOG_PATH)
+
+fila = obter_fila(max_workers=config.FILA_MAX_WORKERS, max_pendentes=config.FILA_MAX_PENDENTES)
+nova_sessao = 'espaco_trabalho' not in st.session_state
+espaco = espaco_da_sessao(st.session_state, config.SESSOES_FOLDER)
+if nova_sessao:
+    limpar_espacos(config.SESSOES_FOLDER, config.SESSOES_MAX_BYTES, config.SESSOES_MAX_IDADE_HORAS * 3600,
+                   preservar=fila.donos_ativos() | {espaco['id']})
+# Os cálculos usam só o CSV desta sessão; se ele sumiu, o usuário precisa processar de novo
+csv_processado = espaco['csv_processado']
+
+MENSAGEM_SEM_DADOS = "Os dados processados desta sessão não foram encontrados. Envie e processe os arquivos novamente."
+
+
+def dados_processados_disponiveis():
+    if os.path.exists(csv_processado):
+        return True
+    st.session_state.processamento_concluido = False
+    st.error(MENSAGEM_SEM_DADOS)
+    return False
+
+
+def iniciar_tarefa(tipo, funcao, *args, contexto=None, **kwargs):
+    # A tarefa roda na fila em segundo plano; a página acompanha o progresso e recolhe o resultado ao terminar
+    progresso = Progresso()
+    futuro = fila.enviar(espaco['id'], funcao, *args, progresso=progresso, **kwargs)
+    if futuro is None:
+        st.error("O servidor está ocupado com outras análises. Tente novamente em instantes.")
+        return
+    st.session_state.tarefa = {'tipo': tipo, 'futuro': futuro, 'progresso': progresso, 'contexto': contexto or {}}
+    st.rerun()
+
+
+def gerar_relatorio_mes(arquivo, ano, mes, formulas_excel, progresso=None, **kwargs):
+    resultados = calcular_oee(arquivo_entrada_path=arquivo, ano=ano, mes=mes, progresso=progresso, **kwargs)
+    if resultados is not None:
+        resultados['formulas_excel'] = formulas_excel
+        salvar_historico_csv(ano, mes, resultados['sumario'], config.OUTPUT_FOLDER)
+    return resultados
+
+
+def recolher_tarefa():
+    # Chamado no início de cada execução do script: passa o resultado da tarefa concluída para a sessão
+    tarefa = st.session_state.get('tarefa')
+    if tarefa is None or not tarefa['futuro'].done():
+        return
+    del st.session_state['tarefa']
+    contexto = tarefa['contexto']
+    try:
+        retorno = tarefa['futuro'].result()
+    except (TarefaCancelada, CancelledError):
+        st.session_state.mensagem_tarefa = ('warning', "Tarefa cancelada.")
+        return
+    except Exception as e:
+        st.session_state.mensagem_tarefa = ('error', f"Falha na execução: {e}")
+        return
+
+    if tarefa['tipo'] == 'processamento':
+        sucesso, lista_circuitos = retorno
+        st.session_state.desempenho = {'Processamento dos arquivos': contexto['medidor'].resumo()}
+        if sucesso:
+            invalidar(contexto['csv'])
+            st.session_state.processamento_concluido = True
+            st.session_state.lista_de_circuitos = lista_circuitos
+            st.session_state.resultados_gerados = None
+            contadores = st.session_state.desempenho['Processamento dos arquivos']['contadores']
+            avisos = [f"{contadores[chave]} {texto}" for chave, texto in (('duplicatas', 'duplicatas removidas'), ('sobrepostas', 'atividades sobrepostas'))
+                      if contadores.get(chave)]
+            st.session_state.mensagem_tarefa = ('success', "Arquivos processados! Pronto para gerar o relatório."
+                                                + (f" Qualidade dos dados: {', '.join(avisos)} (ver Dados Detalhados)." if avisos else ""))
+        else:
+            st.session_state.processamento_concluido = False
+            st.session_state.lista_de_circuitos = []
+            st.session_state.mensagem_tarefa = ('error', "Falha ao processar os arquivos.")
+    elif tarefa['tipo'] == 'lote':
+        if retorno:
+            st.session_state.resultados_gerados = retorno.get(contexto['periodo'], retorno[contexto['ultimo_periodo']])
+        else:
+            st.session_state.resultados_gerados = None
+            st.session_state.mensagem_tarefa = ('error', "Falha ao gerar os relatórios: nenhum mês pôde ser calculado a partir dos dados processados.")
+    elif tarefa['tipo'] == 'relatorio':
+        st.session_state.resultados_gerados = retorno
+        if retorno is None:
+            st.session_state.mensagem_tarefa = ('error', "Falha ao calcular o relatório a partir dos dados processados.")
+    elif tarefa['tipo'] == 'carregar_mes':
+        st.session_state.resultados_gerados = retorno
+        if retorno is None:
+            st.session_state.mensagem_tarefa = ('error', "Falha ao carregar o mês a partir dos dados processados.")
+        else:
+            st.switch_page("pages/1_Dashboard.py")
+
 # Inicialização do session_state
 if 'processamento_concluido' not in st.session_state:
     st.session_state.processamento_concluido = False
@@ -18,6 +115,11 @@ if 'lista_de_circuitos' not in st.session_state:
     st.session_state.lista_de_circuitos = []
 if 'resultados_gerados' not in st.session_state:
     st.session_state.resultados_gerados = None
+if 'desempenho' not in st.session_state:
+    st.session_state.desempenho = {}
+
+recolher_tarefa()
+tarefa_em_andamento = 'tarefa' in st.session_state
 
 st.markdown("""
 <style>
@@ -70,10 +172,52 @@ with col3:
     if st.button("Ver Dados Detalhados", key="btn_dados", use_container_width=True):
         st.switch_page("pages/3_Dados.py")
 
+# --- Painel de Desempenho da última execução ---
+desempenho_execucoes = dict(st.session_state.desempenho)
+if st.session_state.resultados_gerados is not None and st.session_state.resultados_gerados.get('desempenho'):
+    desempenho_execucoes['Cálculo do relatório'] = st.session_state.resultados_gerados['desempenho']
+if desempenho_execucoes:
+    with st.expander("⏱️ Desempenho"):
+        for operacao, desempenho in desempenho_execucoes.items():
+            vazao = vazao_leitura(desempenho)
+            st.markdown(f"**{operacao}** — {desempenho['total_segundos']:.3f} s no total" + (f" · leitura a {vazao:.1f} MB/s" if vazao else ''))
+            etapas_df = pd.DataFrame({'Etapa': list(desempenho['etapas']), 'Segundos': list(desempenho['etapas'].values())})
+            col_etapas, col_contadores = st.columns([2, 1])
+            with col_etapas:
+                st.bar_chart(etapas_df, x='Etapa', y='Segundos', horizontal=True)
+            with col_contadores:
+                st.dataframe(pd.Series(desempenho['contadores'], name='Quantidade'), use_container_width=True)
+            if desempenho.get('perfil'):
+                st.code(desempenho['perfil'], language=None)
+
+
+@st.fragment(run_every="1s")
+def painel_tarefa():
+    # Redesenha só este trecho a cada segundo; quando a tarefa termina, a página inteira roda de novo para recolhê-la
+    tarefa = st.session_state.get('tarefa')
+    if tarefa is None:
+        return
+    if tarefa['futuro'].done():
+        st.rerun()
+    estado = tarefa['progresso'].estado()
+    texto = estado['etapa'] + (f" ({estado['atual']}/{estado['total']})" if estado['total'] else "")
+    st.progress(estado['fracao'] or 0.0, text=texto)
+    if tarefa['progresso'].cancelada:
+        st.caption("Cancelando...")
+    elif st.button("Cancelar", use_container_width=True):
+        tarefa['futuro'].cancel()
+        tarefa['progresso'].cancelar()
+        st.rerun()
+
 
 # --- Barra Lateral (Sidebar) com a Lógica de Processamento ---
 with st.sidebar:
     st.title("⚙️ Controles")
+    if tarefa_em_andamento:
+        painel_tarefa()
+    if 'mensagem_tarefa' in st.session_state:
+        tipo_mensagem, texto_mensagem = st.session_state.pop('mensagem_tarefa')
+        getattr(st, tipo_mensagem)(texto_mensagem)
     st.header("Passo 1: Enviar e Processar Dados")
     uploaded_files = st.file_uploader(
         "Selecione os arquivos .txt", type="txt", accept_multiple_files=True, key="file_uploader"
@@ -86,24 +230,21 @@ with st.sidebar:
     )
     
  
-    if st.button("Processar Arquivos", use_container_width=True):
-        if uploaded_files:
-            with st.spinner('Salvando e processando arquivos... ⏳'):
-                lista_paths = [os.path.join(config.UPLOAD_FOLDER, f.name) for f in uploaded_files]
-                for uploaded_file, path in zip(uploaded_files, lista_paths):
-                    with open(path, "wb") as f: f.write(uploaded_file.getbuffer())
-                
-                sucesso, lista_circuitos = limpar_dados_brutos(lista_paths, config.PROCESSED_CSV_PATH, formato_data=formato_data_selecionado)
-            
-            if sucesso:
-                st.session_state.processamento_concluido = True
-                st.session_state.lista_de_circuitos = lista_circuitos
-                st.session_state.resultados_gerados = None
-                st.success("Arquivos processados! Pronto para gerar o relatório.")
-            else:
-                st.error("Falha ao processar os arquivos.")
-                st.session_state.processamento_concluido = False
-                st.session_state.lista_de_circuitos = []
+    if st.button("Processar Arquivos", use_container_width=True, disabled=tarefa_em_andamento):
+        if uploaded_files and sum(f.size for f in uploaded_files) > config.SESSAO_MAX_BYTES_UPLOAD:
+            st.error(f"Os arquivos enviados passam do limite de {config.SESSAO_MAX_BYTES_UPLOAD // 2**20} MB por sessão.")
+        elif uploaded_files:
+            # Os arquivos são lidos direto da memória; a cópia em disco, se ativada, não atrasa o processamento
+            arquivos = [ArquivoEmMemoria(os.path.basename(f.name), f.getbuffer()) for f in uploaded_files]
+            if config.SESSAO_GUARDAR_UPLOADS:
+                gravar_em_segundo_plano([(a.nome, a.dados) for a in arquivos], espaco['uploads'])
+
+            medidor = MedidorDesempenho()
+            iniciar_tarefa(
+                'processamento', limpar_dados_brutos, arquivos, espaco['csv_processado'], formato_data=formato_data_selecionado,
+                max_workers=config.INGESTAO_MAX_WORKERS, min_bytes_paralelo=config.INGESTAO_MIN_BYTES_PARALELO,
+                incremental=True, mesclar_sobreposicoes=config.QUALIDADE_MESCLAR_SOBREPOSICOES, medidor=medidor, contexto={'medidor': medidor, 'csv': espaco['csv_processado']}
+            )
         else:
             st.warning("Por favor, envie pelo menos um arquivo .txt para processar.")
 
@@ -136,6 +277,9 @@ with st.sidebar:
             if aplicar_min_dias_up:
                 min_dias_up_input = st.number_input("Mínimo de dias 'UP' para uso:", min_value=1, value=1, step=1)
             
+            formulas_excel = not st.checkbox("Gravar totais já calculados no Excel (sem fórmulas)", value=False)
+            perfilar = st.checkbox("Capturar perfil (cProfile) do cálculo", value=False)
+
             st.write("**Forçar Circuitos como Produtivos (UP):**")
             circuitos_force_up = st.multiselect("Selecione:", options=st.session_state.get('lista_de_circuitos', []), key='force_up_select')
             tipo_force_up = st.radio("Tipo de regra 'UP':", ["Forçar 100% UP", "Forçar Semana Padrão (Seg-Sex UP)"], key="tipo_force_up")
@@ -146,44 +290,60 @@ with st.sidebar:
             st.write("**Remover Circuitos do Relatório:**")
             circuitos_force_vazio = st.multiselect("Selecione:", options=st.session_state.get('lista_de_circuitos', []), key='force_vazio_select')
         
-        if st.button("Gerar Relatório e Dashboard", use_container_width=True, type="primary"):
+        gerar_ano_inteiro = st.checkbox("Gerar todos os meses do ano de uma vez", value=False)
+        if gerar_ano_inteiro:
+            ultimo_mes = agora.month if ano_desejado == agora.year else 12
+            st.caption("Entradas de OEE de cada mês:")
+            entradas_lote = st.data_editor(
+                pd.DataFrame({
+                    'Mês': meses_pt[:ultimo_mes],
+                    'C': [0] * ultimo_mes, 'D': [0] * ultimo_mes, 'E': [0] * ultimo_mes, 'F': [0] * ultimo_mes
+                }),
+                disabled=['Mês'], hide_index=True, use_container_width=True, key='entradas_lote'
+            )
+
+        if st.button("Gerar Relatório e Dashboard", use_container_width=True, type="primary", disabled=tarefa_em_andamento) and dados_processados_disponiveis():
             regras_de_force = {'circuitos_up': circuitos_force_up, 'tipo_up': tipo_force_up, 'circuitos_pq': circuitos_force_pq, 'circuitos_vazio': circuitos_force_vazio}
-            with st.spinner('Criando seu relatório e visualização... 📊'):
-                resultados = gerar_dashboard_oee(
-                    arquivo_entrada_path=config.PROCESSED_CSV_PATH, arquivo_saida_folder=config.OUTPUT_FOLDER,
-                    ano=ano_desejado, mes=mes_desejado, capacidade_total=capacidade_total_input,
+            if gerar_ano_inteiro:
+                periodos = [(ano_desejado, m) for m in range(1, ultimo_mes + 1)]
+                por_mes = lambda coluna: {(ano_desejado, i + 1): int(v) for i, v in enumerate(entradas_lote[coluna])}
+                iniciar_tarefa(
+                    'lote', gerar_relatorios_lote, csv_processado, espaco['saida'], periodos, capacidade_total=capacidade_total_input,
+                    regras_de_force=regras_de_force, min_dias_up=min_dias_up_input, aplicar_min_dias_up=aplicar_min_dias_up,
+                    ensaios_executados=por_mes('D'), ensaios_solicitados=por_mes('C'),
+                    relatorios_no_prazo=por_mes('F'), relatorios_emitidos=por_mes('E'),
+                    formulas_excel=formulas_excel, max_workers=config.RELATORIOS_MAX_WORKERS,
+                    pasta_cache=config.CACHE_FOLDER, cache_max_bytes=config.CACHE_MAX_BYTES, cache_max_entradas=config.CACHE_MAX_ENTRADAS,
+                    pasta_historico=config.OUTPUT_FOLDER,
+                    contexto={'periodo': (ano_desejado, mes_desejado), 'ultimo_periodo': periodos[-1]}
+                )
+            else:
+                iniciar_tarefa(
+                    'relatorio', gerar_relatorio_mes, csv_processado, ano_desejado, mes_desejado, formulas_excel,
+                    capacidade_total=capacidade_total_input,
                     regras_de_force=regras_de_force, min_dias_up=min_dias_up_input, aplicar_min_dias_up=aplicar_min_dias_up,
                     ensaios_executados=ensaios_executados_input, ensaios_solicitados=ensaios_solicitados_input,
-                    relatorios_no_prazo=relatorios_no_prazo_input, relatorios_emitidos=relatorios_emitidos_input
+                    relatorios_no_prazo=relatorios_no_prazo_input, relatorios_emitidos=relatorios_emitidos_input,
+                    pasta_cache=config.CACHE_FOLDER, cache_max_bytes=config.CACHE_MAX_BYTES, cache_max_entradas=config.CACHE_MAX_ENTRADAS,
+                    perfilar=perfilar
                 )
-            st.session_state.resultados_gerados = resultados
-            st.rerun()
 
     st.divider()
     st.header("Visualizar Mês Anterior")
-    caminho_csv = os.path.join(config.OUTPUT_FOLDER, 'historico_oee.csv')
-    if os.path.exists(caminho_csv):
-        df_historico = pd.read_csv(caminho_csv)
-        meses_pt_map = {1: "Janeiro", 2: "Fevereiro", 3: "Março", 4: "Abril", 5: "Maio", 6: "Junho", 7: "Julho", 8: "Agosto", 9: "Setembro", 10: "Outubro", 11: "Novembro", 12: "Dezembro"}
-        df_historico['display'] = df_historico.apply(lambda row: f"{meses_pt_map.get(row['mes'], '')}/{row['ano']}", axis=1)
-        
+    df_historico = carregar_historico(config.OUTPUT_FOLDER)
+    if not df_historico.empty:
         mes_ano_selecionado = st.selectbox(
             "Selecione um mês do histórico:",
             options=df_historico['display'].unique()
         )
 
-        if st.button("Carregar Mês", use_container_width=True):
+        if st.button("Carregar Mês", use_container_width=True, disabled=tarefa_em_andamento) and dados_processados_disponiveis():
             if mes_ano_selecionado:
                 display_selecionado = df_historico[df_historico['display'] == mes_ano_selecionado].iloc[0]
                 ano, mes = int(display_selecionado['ano']), int(display_selecionado['mes'])
-                
-                with st.spinner(f"Recalculando dados para {mes_ano_selecionado}..."):
-                    resultados = gerar_dashboard_oee(
-                        arquivo_entrada_path=config.PROCESSED_CSV_PATH, arquivo_saida_folder=config.OUTPUT_FOLDER,
-                        ano=ano, mes=mes
-                    )
-                st.session_state.resultados_gerados = resultados
-                st.success(f"Dados de {mes_ano_selecionado} carregados!")
-                st.switch_page("pages/1_Dashboard.py")
+                iniciar_tarefa(
+                    'carregar_mes', calcular_oee, arquivo_entrada_path=csv_processado, ano=ano, mes=mes,
+                    pasta_cache=config.CACHE_FOLDER, cache_max_bytes=config.CACHE_MAX_BYTES, cache_max_entradas=config.CACHE_MAX_ENTRADAS
+                )
     else:
         st.info("Nenhum histórico encontrado. Gere um relatório para começar.")
\ No newline at end of file
@@ -0,0 +1,53 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+NORMAS = ['SAEJ2801', 'SAEJ2801_COM_LIMITES', 'C20R49', 'Thermal_Stability_Test', 'DESC80_1H', 'DESC70_1H', 'RC20R180', 'REC60', 'CHADISCHHOND_60AH']
+
+MODELOS = ['M60GD', 'M60G', 'VW49EFB', 'TO65LD', 'FI72EFB', 'GM70LD', 'M40SD', 'M75LX']
+
+
+def _formatar_data(data):
+    # Mesmo formato dos digitalizadores: m/d/aa H:MM, sem zeros à esquerda no mês, dia e hora
+    return f"{data.month}/{data.day}/{data.year % 100:02d} {data.hour}:{data.minute:02d}"
+
+
+def gerar_linhas_circuito(gerador, circuito, inicio, fim, densidade):
+    # Caminha do fim para o início, como nos arquivos reais (atividade mais recente primeiro)
+    linhas = []
+    cursor = fim - timedelta(hours=gerador.uniform(0, 48 / densidade))
+    aberta = gerador.random() < 0.05
+    while cursor > inicio:
+        duracao = timedelta(hours=gerador.uniform(6, 24 * 7))
+        datastart = cursor - duracao
+        norma, modelo = gerador.choice(NORMAS), gerador.choice(MODELOS)
+        amostra = f"{gerador.randint(10000, 19999)}-E{gerador.randint(1, 400)}-{datastart.year}_CIC_{gerador.randint(1, 10)}UN"
+        datastop = '' if aberta else _formatar_data(cursor)
+        if gerador.random() < 0.2:
+            linhas.append(f"{circuito}\t{_formatar_data(datastart)}\t{datastop}\n")
+        else:
+            linhas.append(f"{circuito}\t{_formatar_data(datastart)}\t{datastop}\t{norma}\t{modelo}\t{amostra}\n")
+        aberta = False
+        # Intervalo ocioso entre ensaios; densidade maior deixa o circuito mais ocupado
+        cursor = datastart - timedelta(hours=gerador.expovariate(densidade / 24))
+    return linhas
+
+
+def gerar_arquivos(pasta, n_circuitos=375, meses=12, densidade=1.0, n_arquivos=4, semente=0, fim=None):
+    gerador = random.Random(semente)
+    fim = fim or datetime(2025, 7, 31, 18, 0)
+    inicio = fim - timedelta(days=30 * meses)
+    os.makedirs(pasta, exist_ok=True)
+
+    caminhos = [os.path.join(pasta, f"dig{i + 1:02d}.txt") for i in range(n_arquivos)]
+    arquivos = [open(caminho, 'w', encoding='utf-8', newline='') for caminho in caminhos]
+    total_linhas = 0
+    try:
+        for numero in range(1, n_circuitos + 1):
+            linhas = gerar_linhas_circuito(gerador, f"Circuit{numero:03d}", inicio, fim, densidade)
+            arquivos[(numero - 1) % n_arquivos].writelines(linhas)
+            total_linhas += len(linhas)
+    finally:
+        for f in arquivos:
+            f.close()
+    return caminhos, total_linhas
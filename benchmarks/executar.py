@@ -0,0 +1,163 @@
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dados_sinteticos import gerar_arquivos
+from modulos.armazenamento import consultar_atividades
+from modulos.calendario import construir_calendario_vencedores
+from modulos.ingestao import COLUNAS_ATRIBUTOS, ArquivoEmMemoria, blocos_de_texto, converter_datas, iterar_lotes_registros, iterar_registros_brutos
+from modulos.processamento import calcular_oee, exportar_excel_oee, limpar_dados_brutos, salvar_historico_csv
+
+PASTA_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+
+def _medir(etapas, nome, funcao, repeticoes, medir_memoria):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        valor = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    etapa = {'segundos': min(tempos)}
+    if medir_memoria:
+        # Passada separada: o tracemalloc deixa a execução bem mais lenta
+        tracemalloc.start()
+        funcao()
+        etapa['pico_memoria_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    etapas[nome] = etapa
+    print(f"  {nome:<20} {etapa['segundos']:8.3f} s" + (f"  {etapa['pico_memoria_bytes'] / 2**20:8.1f} MiB" if medir_memoria else ''))
+    return valor
+
+
+def _ler_blocos(fontes):
+    return [bloco for fonte in fontes for bloco in blocos_de_texto(fonte)]
+
+
+def executar_cenario(pasta, n_circuitos, meses, densidade, repeticoes=1, medir_memoria=True, semente=0):
+    pasta_dados = os.path.join(pasta, f"c{n_circuitos}_m{meses}_d{densidade}")
+    pasta_saida = os.path.join(pasta_dados, 'saida')
+    os.makedirs(pasta_saida, exist_ok=True)
+    caminhos, total_linhas = gerar_arquivos(pasta_dados, n_circuitos=n_circuitos, meses=meses, densidade=densidade, semente=semente)
+    caminho_csv = os.path.join(pasta_saida, 'dados_processados.csv')
+    print(f"Cenário: {n_circuitos} circuitos, {meses} meses, densidade {densidade} ({total_linhas} linhas)")
+
+    etapas = {}
+    blocos = _medir(etapas, 'leitura', lambda: _ler_blocos(caminhos), repeticoes, medir_memoria)
+    em_memoria = []
+    for caminho in caminhos:
+        with open(caminho, 'rb') as f:
+            em_memoria.append(ArquivoEmMemoria(os.path.basename(caminho), f.read()))
+    _medir(etapas, 'leitura_memoria', lambda: _ler_blocos(em_memoria), repeticoes, medir_memoria)
+    linhas = [linha for bloco in blocos for linha in io.StringIO(bloco, newline='\n')]
+    registros = _medir(etapas, 'separacao_regex', lambda: list(iterar_registros_brutos(linhas)), repeticoes, medir_memoria)
+    _medir(etapas, 'tokenizador', lambda: list(iterar_lotes_registros(caminhos)), repeticoes, medir_memoria)
+    df_registros = pd.DataFrame(registros, columns=['circuito', 'datastart', 'datastop'] + COLUNAS_ATRIBUTOS)
+    _medir(etapas, 'conversao_datas', lambda: (converter_datas(df_registros['datastart'], dayfirst=False), converter_datas(df_registros['datastop'], dayfirst=False)), repeticoes, medir_memoria)
+    _medir(etapas, 'limpeza_completa', lambda: limpar_dados_brutos(caminhos, caminho_csv, formato_data='mm/dd/aaaa'), repeticoes, medir_memoria)
+    _medir(etapas, 'limpeza_memoria', lambda: limpar_dados_brutos(em_memoria, caminho_csv, formato_data='mm/dd/aaaa'), repeticoes, medir_memoria)
+
+    ano, mes = 2025, 7
+    inicio_mes = datetime(ano, mes, 1)
+    fim_do_periodo = pd.Timestamp(inicio_mes) + pd.offsets.MonthBegin(1) - pd.Timedelta(1, 'ns')
+    dias_do_mes_range = pd.date_range(start=inicio_mes, end=inicio_mes + pd.offsets.MonthEnd(0), freq='D')
+
+    def calendario():
+        df_atividades, circuitos = consultar_atividades(caminho_csv, inicio_mes, fim_do_periodo)
+        df_atividades['status'] = 'UP'
+        df_atividades['datastop'] = df_atividades['datastop'].fillna(dias_do_mes_range[-1] + pd.Timedelta(hours=23, minutes=59, seconds=59))
+        return construir_calendario_vencedores(sorted(circuitos), dias_do_mes_range, df_atividades)
+
+    _medir(etapas, 'calendario', calendario, repeticoes, medir_memoria)
+    resultado = _medir(etapas, 'calculo_oee', lambda: calcular_oee(caminho_csv, ano, mes, capacidade_total=n_circuitos), repeticoes, medir_memoria)
+    _medir(etapas, 'excel', lambda: exportar_excel_oee(resultado, pasta_saida), repeticoes, medir_memoria)
+    _medir(etapas, 'historico', lambda: salvar_historico_csv(ano, mes, resultado['sumario'], pasta_saida), repeticoes, medir_memoria)
+
+    return {
+        'circuitos': n_circuitos,
+        'meses': meses,
+        'densidade': densidade,
+        'linhas': total_linhas,
+        'bytes': sum(os.path.getsize(c) for c in caminhos),
+        'etapas': etapas,
+    }
+
+
+def _versao_codigo():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual, anterior):
+    # Razão tempo_atual / tempo_anterior por cenário e etapa (> 1 indica regressão)
+    chave = lambda c: (c['circuitos'], c['meses'], c['densidade'])
+    anteriores = {chave(c): c for c in anterior['cenarios']}
+    for cenario in atual['cenarios']:
+        base = anteriores.get(chave(cenario))
+        if base is None:
+            continue
+        print(f"Comparação {chave(cenario)} com {anterior.get('versao_codigo')}:")
+        for nome, etapa in cenario['etapas'].items():
+            if nome in base['etapas'] and base['etapas'][nome]['segundos'] > 0:
+                razao = etapa['segundos'] / base['etapas'][nome]['segundos']
+                print(f"  {nome:<20} {razao:6.2f}x" + ('  <-- regressão' if razao > 1.2 else ''))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da ingestão e do relatório de OEE com dados sintéticos.")
+    parser.add_argument('--circuitos', type=int, nargs='+', default=[375, 1000, 5000])
+    parser.add_argument('--meses', type=int, nargs='+', default=[12])
+    parser.add_argument('--densidade', type=float, nargs='+', default=[1.0])
+    parser.add_argument('--repeticoes', type=int, default=1)
+    parser.add_argument('--sem-memoria', action='store_true', help="Não mede picos de memória com tracemalloc")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', help="Arquivo JSON de resultados")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args(argv)
+
+    resultados = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'versao_codigo': _versao_codigo(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cpus': os.cpu_count(),
+        'cenarios': [],
+    }
+    with tempfile.TemporaryDirectory(prefix='benchmark_oee_') as pasta:
+        for n_circuitos in args.circuitos:
+            for meses in args.meses:
+                for densidade in args.densidade:
+                    resultados['cenarios'].append(executar_cenario(
+                        pasta, n_circuitos, meses, densidade, repeticoes=args.repeticoes,
+                        medir_memoria=not args.sem_memoria, semente=args.semente
+                    ))
+
+    saida = args.saida or os.path.join(PASTA_RESULTADOS, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"Resultados salvos em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            comparar(resultados, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,5 +8,42 @@ PROCESSED_CSV_FILENAME = 'dados_processados.csv'
 
 PROCESSED_CSV_PATH = os.path.join(OUTPUT_FOLDER, PROCESSED_CSV_FILENAME)
 
+CACHE_FOLDER = os.path.join(OUTPUT_FOLDER, 'cache_oee')
+
+DESEMPENHO_LOG_PATH = os.path.join(OUTPUT_FOLDER, 'desempenho.jsonl')
+
+SESSOES_FOLDER = 'sessoes'
+
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
\ No newline at end of file
+os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+PROCESSADORES = os.cpu_count() or 1
+
+FILA_MAX_WORKERS = 2
+
+FILA_MAX_PENDENTES = 8
+
+# Leitura e planilhas abrem pools de processos de dentro das tarefas da fila: cada uma das
+# FILA_MAX_WORKERS tarefas simultâneas fica só com a sua parte dos processadores
+INGESTAO_MAX_WORKERS = max(1, PROCESSADORES // FILA_MAX_WORKERS)
+
+INGESTAO_MIN_BYTES_PARALELO = 8 * 1024 * 1024
+
+# Junta atividades encerradas e sobrepostas do mesmo circuito num só intervalo ao gravar o CSV processado
+# (duplicatas exatas sempre saem; as sem datastop não são mescladas). Os casos ficam em relatorios/qualidade_dados.csv
+QUALIDADE_MESCLAR_SOBREPOSICOES = True
+
+RELATORIOS_MAX_WORKERS = max(1, PROCESSADORES // FILA_MAX_WORKERS)
+
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+CACHE_MAX_ENTRADAS = 500
+
+SESSOES_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+SESSOES_MAX_IDADE_HORAS = 24
+
+SESSAO_MAX_BYTES_UPLOAD = 500 * 1024 * 1024
+
+# Guarda uma cópia dos arquivos enviados em sessoes/<id>/dados_brutos (gravada em segundo plano)
+SESSAO_GUARDAR_UPLOADS = True
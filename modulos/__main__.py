@@ -0,0 +1,179 @@
+import argparse
+import glob
+import os
+import sys
+from datetime import datetime
+
+import config
+from modulos.desempenho import MedidorDesempenho, configurar_log_desempenho, vazao_leitura
+from modulos.historico import exportar_csv
+from modulos.processamento import calcular_oee_lote, exportar_excel_lote, limpar_dados_brutos, salvar_historico_lote
+from modulos.qualidade import caminho_relatorio_qualidade
+
+# Uso sem o Streamlit (cron, scripts):
+#   python -m modulos processar --formato mm/dd/aaaa
+#   python -m modulos relatorio --ano 2025 --mes 6 7
+#   python -m modulos relatorio --ano 2025 --ano-inteiro --sem-excel
+#   python -m modulos historico --saida historico_oee.csv
+
+
+TIPOS_UP = {'100': "Forçar 100% UP", 'semana': "Forçar Semana Padrão (Seg-Sex UP)"}
+
+
+def _criar_pasta(pasta):
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+
+
+def _arquivos_de_entrada(entradas):
+    # Pastas viram os .txt que estão nelas; arquivos passam direto
+    arquivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            arquivos.extend(sorted(glob.glob(os.path.join(entrada, '*.txt'))))
+        else:
+            arquivos.append(entrada)
+    return arquivos
+
+
+def comando_processar(args):
+    arquivos = _arquivos_de_entrada(args.entrada or [config.UPLOAD_FOLDER])
+    if not arquivos:
+        print("Nenhum arquivo .txt encontrado.", file=sys.stderr)
+        return 1
+    _criar_pasta(os.path.dirname(args.saida))
+    medidor = MedidorDesempenho()
+    sucesso, circuitos = limpar_dados_brutos(
+        arquivos, args.saida, formato_data=args.formato, max_workers=args.workers,
+        min_bytes_paralelo=config.INGESTAO_MIN_BYTES_PARALELO, incremental=args.incremental,
+        mesclar_sobreposicoes=not args.sem_mesclar, medidor=medidor
+    )
+    if not sucesso:
+        print("Falha ao processar os arquivos.", file=sys.stderr)
+        return 1
+    resumo = medidor.resumo()
+    print(f"{len(arquivos)} arquivo(s), {len(circuitos)} circuitos, {resumo['contadores'].get('registros_gravados', 0)} registros "
+          f"em {resumo['total_segundos']:.2f} s -> {args.saida}")
+    contadores = resumo['contadores']
+    vazao = vazao_leitura(resumo)
+    if vazao:
+        print(f"Leitura: {vazao:.1f} MB/s; {contadores.get('linhas_tsv', 0)} de {contadores.get('linhas_lidas', 0)} linhas pelo caminho "
+              f"tab-separado, {contadores.get('linhas_varridas', 0)} pela varredura")
+    print(f"Qualidade: {contadores.get('duplicatas', 0)} duplicatas removidas, {contadores.get('sobrepostas', 0)} atividades sobrepostas "
+          f"em {contadores.get('grupos_sobrepostos', 0)} grupos, {contadores.get('sem_datastop', 0)} sem datastop -> "
+          f"{caminho_relatorio_qualidade(args.saida)}")
+    return 0
+
+
+def comando_relatorio(args):
+    if not os.path.exists(args.entrada):
+        print(f"Arquivo processado não encontrado: {args.entrada}", file=sys.stderr)
+        return 1
+    meses = range(1, 13) if args.ano_inteiro else (args.mes or [datetime.now().month])
+    periodos = [(args.ano, mes) for mes in meses]
+    regras_de_force = {'circuitos_up': args.forcar_up, 'tipo_up': TIPOS_UP[args.tipo_up], 'circuitos_pq': args.forcar_pq, 'circuitos_vazio': args.remover}
+
+    resultados = calcular_oee_lote(
+        args.entrada, periodos, capacidade_total=args.capacidade, regras_de_force=regras_de_force,
+        min_dias_up=args.min_dias_up or 1, aplicar_min_dias_up=args.min_dias_up is not None,
+        ensaios_solicitados=args.solicitados, ensaios_executados=args.executados,
+        relatorios_emitidos=args.emitidos, relatorios_no_prazo=args.no_prazo,
+        pasta_cache=None if args.sem_cache else config.CACHE_FOLDER,
+        cache_max_bytes=config.CACHE_MAX_BYTES, cache_max_entradas=config.CACHE_MAX_ENTRADAS
+    )
+    if not resultados:
+        print("Nenhum resultado calculado.", file=sys.stderr)
+        return 1
+
+    print(f"{'Mês':<8} {'Disp.':>8} {'Perf.':>8} {'Qual.':>8} {'OEE':>8}")
+    for (ano, mes), resultado in resultados.items():
+        sumario = resultado['sumario']
+        print(f"{mes:02d}/{ano:<5} {sumario.get('Disponibilidade', 0):7.2f}% {sumario.get('Performance', 0):7.2f}% "
+              f"{sumario.get('Qualidade', 0):7.2f}% {sumario.get('OEE', 0):7.2f}%")
+
+    if not args.sem_excel:
+        _criar_pasta(args.saida)
+        for resultado in resultados.values():
+            resultado['formulas_excel'] = not args.sem_formulas
+        caminhos = exportar_excel_lote(resultados, args.saida, formulas_excel=not args.sem_formulas, max_workers=args.workers)
+        for (ano, mes), caminho in caminhos.items():
+            if caminho is None:
+                print(f"Falha ao gerar a planilha de {mes:02d}/{ano}.", file=sys.stderr)
+            else:
+                print(f"Planilha: {caminho}")
+    if not args.sem_historico:
+        _criar_pasta(args.pasta_historico or args.saida)
+        salvar_historico_lote([(ano, mes, r['sumario']) for (ano, mes), r in resultados.items()], args.pasta_historico or args.saida)
+    return 0
+
+
+def comando_historico(args):
+    # O histórico vive no SQLite; o CSV só é gerado quando alguém pede
+    if not os.path.isdir(args.pasta):
+        print(f"Pasta do histórico não encontrada: {args.pasta}", file=sys.stderr)
+        return 1
+    if args.saida:
+        _criar_pasta(os.path.dirname(args.saida))
+    caminho = exportar_csv(args.pasta, args.saida)
+    print(f"Histórico: {caminho}")
+    return 0
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(prog='python -m modulos', description="Processamento e relatórios de OEE sem a interface.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    processar = subparsers.add_parser('processar', aliases=['ingest'], help="Lê os arquivos brutos e grava o CSV processado")
+    processar.add_argument('entrada', nargs='*', help=f"Arquivos .txt ou pastas (padrão: {config.UPLOAD_FOLDER})")
+    processar.add_argument('--saida', default=config.PROCESSED_CSV_PATH)
+    processar.add_argument('--formato', choices=['dd/mm/aaaa', 'mm/dd/aaaa'], default='dd/mm/aaaa')
+    processar.add_argument('--incremental', action='store_true', help="Reprocessa só os arquivos alterados desde a última execução")
+    processar.add_argument('--workers', type=int, default=config.PROCESSADORES)
+    processar.add_argument('--sem-mesclar', action='store_true', default=not config.QUALIDADE_MESCLAR_SOBREPOSICOES,
+                           help="Mantém as atividades sobrepostas separadas (só remove as duplicatas)")
+    processar.set_defaults(funcao=comando_processar)
+
+    relatorio = subparsers.add_parser('relatorio', aliases=['report'], help="Calcula o OEE dos meses, gera as planilhas e atualiza o histórico")
+    relatorio.add_argument('--entrada', default=config.PROCESSED_CSV_PATH)
+    relatorio.add_argument('--saida', default=config.OUTPUT_FOLDER)
+    relatorio.add_argument('--pasta-historico', help="Pasta do histórico (padrão: a mesma de --saida)")
+    relatorio.add_argument('--ano', type=int, default=datetime.now().year)
+    relatorio.add_argument('--mes', type=int, nargs='+', choices=range(1, 13), metavar='MES')
+    relatorio.add_argument('--ano-inteiro', action='store_true')
+    relatorio.add_argument('--capacidade', type=int, default=375)
+    relatorio.add_argument('--min-dias-up', type=int, help="Aplica a regra de mínimo de dias 'UP'")
+    relatorio.add_argument('--forcar-up', nargs='+', default=[], metavar='CIRCUITO')
+    relatorio.add_argument('--tipo-up', choices=list(TIPOS_UP), default='100',
+                           help="Regra dos circuitos de --forcar-up: 100 (todos os dias UP) ou semana (Seg-Sex UP)")
+    relatorio.add_argument('--forcar-pq', nargs='+', default=[], metavar='CIRCUITO')
+    relatorio.add_argument('--remover', nargs='+', default=[], metavar='CIRCUITO')
+    relatorio.add_argument('--solicitados', type=int, default=0, help="Ensaios Solicitados (C)")
+    relatorio.add_argument('--executados', type=int, default=0, help="Ensaios Executados (D)")
+    relatorio.add_argument('--emitidos', type=int, default=0, help="Relatórios Emitidos (E)")
+    relatorio.add_argument('--no-prazo', type=int, default=0, help="Relatórios no Prazo (F)")
+    relatorio.add_argument('--sem-excel', action='store_true', help="Só o sumário; não importa o openpyxl")
+    relatorio.add_argument('--sem-formulas', action='store_true', help="Grava os totais já calculados no Excel")
+    relatorio.add_argument('--sem-historico', action='store_true')
+    relatorio.add_argument('--sem-cache', action='store_true')
+    relatorio.add_argument('--workers', type=int, default=config.PROCESSADORES)
+    relatorio.set_defaults(funcao=comando_relatorio)
+
+    historico = subparsers.add_parser('historico', help="Exporta o histórico de OEE para CSV")
+    historico.add_argument('--pasta', default=config.OUTPUT_FOLDER, help="Pasta do histórico")
+    historico.add_argument('--saida', help="Arquivo CSV (padrão: historico_oee.csv na pasta do histórico)")
+    historico.set_defaults(funcao=comando_historico)
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    try:
+        configurar_log_desempenho(config.DESEMPENHO_LOG_PATH)
+        return args.funcao(args)
+    except OSError as e:
+        print(f"Erro de arquivo: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
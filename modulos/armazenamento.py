@@ -0,0 +1,234 @@
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from modulos.indice_intervalos import IndiceIntervalos
+from modulos.ingestao import COLUNAS_ATRIBUTOS
+from modulos.manifesto import assinatura_arquivo
+
+NOME_INDICE = 'indice.json'
+
+PARTICAO_ABERTAS = 'abertas'
+
+VERSAO_ARMAZENAMENTO = 2
+
+MAX_INDICES_EM_CACHE = 64
+
+_indices_particao = OrderedDict()
+
+_trava_indices = threading.Lock()
+
+
+def pasta_particoes(caminho_csv):
+    return os.path.splitext(caminho_csv)[0] + '_particoes'
+
+
+def _assinatura_csv(caminho_csv):
+    info = os.stat(caminho_csv)
+    return {'tamanho': info.st_size, 'mtime_ns': info.st_mtime_ns}
+
+
+def impressao_digital_dados(caminho_csv):
+    # Pelo conteúdo, não pelo caminho: o mesmo CSV em espaços de sessão diferentes divide o cache de resultados.
+    # O hash fica no índice das partições e só é recalculado quando o índice não vale mais para o CSV
+    indice = _carregar_indice(caminho_csv)
+    if indice is not None and indice.get('hash'):
+        return indice['hash']
+    return assinatura_arquivo(caminho_csv)['hash']
+
+
+def _chave_mes(ano, mes):
+    return f"{ano:04d}-{mes:02d}"
+
+
+def _meses_no_intervalo(inicio, fim):
+    return [_chave_mes(p.year, p.month) for p in pd.period_range(pd.Timestamp(inicio).to_period('M'), pd.Timestamp(fim).to_period('M'), freq='M')]
+
+
+def ler_csv_processado(caminho_csv):
+    # CSVs anteriores aos atributos só têm as três primeiras colunas
+    df_atividades = pd.read_csv(caminho_csv, sep=';', dtype={'circuito': str, **{c: 'category' for c in COLUNAS_ATRIBUTOS}}, na_values='')
+    df_atividades['datastart'] = pd.to_datetime(df_atividades['datastart'], format='%d/%m/%Y %H:%M:%S', errors='coerce')
+    df_atividades['datastop'] = pd.to_datetime(df_atividades['datastop'], format='%d/%m/%Y %H:%M:%S', errors='coerce')
+    return df_atividades
+
+
+def gravar_particoes(caminho_csv, circuitos, datastart, datastop, status=None, atributos=None):
+    # circuitos, datastart, datastop e atributos ({coluna: valores}) seguem a ordem das linhas do CSV exportado.
+    # Os atributos ficam como códigos int32 nas partições e as categorias no índice.
+    codigos, nomes = pd.factorize(np.asarray(circuitos, dtype=object))
+    datastart = np.asarray(datastart, dtype='datetime64[ns]')
+    datastop = np.asarray(datastop, dtype='datetime64[ns]')
+    ordem = np.arange(len(codigos), dtype=np.int64)
+    if status is not None:
+        codigos_status, rotulos_status = pd.factorize(np.asarray(status, dtype=object))
+    else:
+        codigos_status, rotulos_status = None, []
+    categoricos = {coluna: pd.Categorical(valores) for coluna, valores in (atributos or {}).items()}
+
+    validos = ~np.isnat(datastart)
+    abertas = validos & np.isnat(datastop)
+    fechadas = validos & ~abertas
+
+    mes_inicio = datastart.astype('datetime64[M]').astype(np.int64)
+    mes_fim = np.maximum(datastop.astype('datetime64[M]').astype(np.int64), mes_inicio)
+    linhas_fechadas = np.flatnonzero(fechadas)
+    duracoes = mes_fim[linhas_fechadas] - mes_inicio[linhas_fechadas] + 1
+    # Uma atividade entra em todas as partições mensais que ela atravessa
+    linhas_expandidas = np.repeat(linhas_fechadas, duracoes)
+    meses_expandidos = mes_inicio[linhas_expandidas] + (np.arange(len(linhas_expandidas)) - np.repeat(np.cumsum(duracoes) - duracoes, duracoes))
+
+    pasta = pasta_particoes(caminho_csv)
+    temporaria = f"{pasta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.rmtree(temporaria, ignore_errors=True)
+    os.makedirs(temporaria)
+
+    def gravar(nome, linhas):
+        arrays = {'ordem': ordem[linhas], 'circuito': codigos[linhas].astype(np.int32),
+                  'datastart': datastart[linhas], 'datastop': datastop[linhas]}
+        if codigos_status is not None:
+            arrays['status'] = codigos_status[linhas].astype(np.int16)
+        for coluna, categorico in categoricos.items():
+            arrays[coluna] = categorico.codes[linhas].astype(np.int32)
+        np.savez(os.path.join(temporaria, f"{nome}.npz"), **arrays)
+
+    particoes = []
+    if len(linhas_expandidas):
+        ordem_meses = np.argsort(meses_expandidos, kind='stable')
+        meses_ordenados = meses_expandidos[ordem_meses]
+        limites = np.flatnonzero(np.diff(meses_ordenados)) + 1
+        for grupo in np.split(ordem_meses, limites):
+            mes = pd.Period(np.datetime64(int(meses_expandidos[grupo[0]]), 'M'), freq='M')
+            chave = _chave_mes(mes.year, mes.month)
+            gravar(chave, linhas_expandidas[grupo])
+            particoes.append(chave)
+    gravar(PARTICAO_ABERTAS, np.flatnonzero(abertas))
+
+    indice = {
+        'versao': VERSAO_ARMAZENAMENTO,
+        'csv': _assinatura_csv(caminho_csv),
+        'hash': assinatura_arquivo(caminho_csv)['hash'],
+        'circuitos': [str(nome) for nome in nomes],
+        'circuitos_validos': [str(nome) for nome in pd.unique(np.asarray(circuitos, dtype=object)[validos])],
+        'status': [str(rotulo) for rotulo in rotulos_status],
+        'atributos': {coluna: [str(c) for c in categorico.categories] for coluna, categorico in categoricos.items()},
+        'particoes': particoes,
+    }
+    with open(os.path.join(temporaria, NOME_INDICE), 'w', encoding='utf-8') as f:
+        json.dump(indice, f, ensure_ascii=False)
+
+    shutil.rmtree(pasta, ignore_errors=True)
+    os.replace(temporaria, pasta)
+
+
+def gravar_particoes_de_dataframe(caminho_csv, df_atividades):
+    status = df_atividades['status'] if 'status' in df_atividades.columns else None
+    atributos = {coluna: df_atividades[coluna] for coluna in COLUNAS_ATRIBUTOS if coluna in df_atividades.columns}
+    gravar_particoes(caminho_csv, df_atividades['circuito'], df_atividades['datastart'], df_atividades['datastop'], status, atributos)
+
+
+def _carregar_indice(caminho_csv):
+    caminho_indice = os.path.join(pasta_particoes(caminho_csv), NOME_INDICE)
+    try:
+        with open(caminho_indice, 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if indice.get('versao') != VERSAO_ARMAZENAMENTO or indice.get('csv') != _assinatura_csv(caminho_csv):
+        return None
+    return indice
+
+
+def carregar_atividades(caminho_csv, inicio=None, fim=None):
+    # Retorna as atividades que podem tocar o período [inicio, fim] (na ordem do CSV)
+    # e o conjunto de circuitos com atividade válida em todo o arquivo.
+    indice = _carregar_indice(caminho_csv)
+    if indice is None:
+        df_atividades = ler_csv_processado(caminho_csv)
+        try:
+            gravar_particoes_de_dataframe(caminho_csv, df_atividades)
+        except Exception as e:
+            print(f"Erro ao gravar partições: {e}")
+        todos_circuitos = set(df_atividades.dropna(subset=['datastart'])['circuito'].unique())
+        return df_atividades, todos_circuitos
+
+    pasta = pasta_particoes(caminho_csv)
+    if inicio is None or fim is None:
+        nomes = list(indice['particoes'])
+    else:
+        nomes = [chave for chave in _meses_no_intervalo(inicio, fim) if chave in set(indice['particoes'])]
+    nomes.append(PARTICAO_ABERTAS)
+
+    partes = []
+    for nome in nomes:
+        with np.load(os.path.join(pasta, f"{nome}.npz")) as dados:
+            partes.append({chave: dados[chave] for chave in dados.files})
+    return _atividades_das_partes(indice, partes), set(indice['circuitos_validos'])
+
+
+def _atividades_das_partes(indice, partes):
+    # Uma atividade que atravessa meses aparece em várias partições: fica uma vez, na ordem do CSV
+    _, posicoes = np.unique(np.concatenate([p['ordem'] for p in partes]), return_index=True)
+
+    def coluna(nome):
+        return np.concatenate([p[nome] for p in partes])[posicoes]
+
+    circuitos = np.asarray(indice['circuitos'] + [None], dtype=object)
+    df_atividades = pd.DataFrame({
+        'circuito': circuitos[coluna('circuito')],
+        'datastart': coluna('datastart'),
+        'datastop': coluna('datastop'),
+    })
+    if indice['status']:
+        rotulos_status = np.asarray(indice['status'] + [None], dtype=object)
+        df_atividades['status'] = rotulos_status[coluna('status')]
+    for nome, categorias in indice['atributos'].items():
+        df_atividades[nome] = pd.Categorical.from_codes(coluna(nome), categories=pd.Index(categorias, dtype=object))
+    return df_atividades
+
+
+def _indice_particao(pasta, nome, assinatura):
+    chave = (pasta, nome, assinatura['tamanho'], assinatura['mtime_ns'])
+    with _trava_indices:
+        if chave in _indices_particao:
+            _indices_particao.move_to_end(chave)
+            return _indices_particao[chave]
+
+    with np.load(os.path.join(pasta, f"{nome}.npz")) as dados:
+        colunas = {coluna: dados[coluna] for coluna in dados.files}
+    indice = IndiceIntervalos(colunas['circuito'], colunas['datastart'], colunas['datastop'])
+    indice.colunas = colunas
+
+    with _trava_indices:
+        _indices_particao[chave] = indice
+        while len(_indices_particao) > MAX_INDICES_EM_CACHE:
+            _indices_particao.popitem(last=False)
+    return indice
+
+
+def consultar_atividades(caminho_csv, inicio, fim):
+    # Mesmo retorno de carregar_atividades, mas só com as atividades que
+    # sobrepõem [inicio, fim], consultadas no índice de intervalos de cada partição.
+    indice = _carregar_indice(caminho_csv)
+    if indice is None:
+        df_atividades, todos_circuitos = carregar_atividades(caminho_csv)
+        indice = _carregar_indice(caminho_csv)
+        if indice is None:
+            linhas = IndiceIntervalos(df_atividades['circuito'], df_atividades['datastart'], df_atividades['datastop']).consultar(inicio, fim)
+            return df_atividades.iloc[linhas].reset_index(drop=True), todos_circuitos
+
+    pasta = pasta_particoes(caminho_csv)
+    particoes = set(indice['particoes'])
+    nomes = [chave for chave in _meses_no_intervalo(inicio, fim) if chave in particoes] + [PARTICAO_ABERTAS]
+
+    partes = []
+    for nome in nomes:
+        indice_particao = _indice_particao(pasta, nome, indice['csv'])
+        linhas = indice_particao.consultar(inicio, fim)
+        partes.append({coluna: valores[linhas] for coluna, valores in indice_particao.colunas.items()})
+    return _atividades_das_partes(indice, partes), set(indice['circuitos_validos'])
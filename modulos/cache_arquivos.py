@@ -0,0 +1,99 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from modulos.historico import caminho_banco, consultar_historico
+
+MESES_PT = {1: "Janeiro", 2: "Fevereiro", 3: "Março", 4: "Abril", 5: "Maio", 6: "Junho", 7: "Julho", 8: "Agosto", 9: "Setembro", 10: "Outubro", 11: "Novembro", 12: "Dezembro"}
+
+# Cache do processo, compartilhado entre sessões e reruns do Streamlit.
+# Cada entrada guarda a assinatura (tamanho, mtime) do arquivo de onde veio e o tamanho em memória;
+# passando dos limites, saem as usadas há mais tempo.
+_entradas = OrderedDict()
+
+MAX_BYTES = 256 * 1024 * 1024
+
+MAX_ENTRADAS = 64
+
+_trava = threading.Lock()
+
+
+def _assinatura(caminho):
+    try:
+        info = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return (info.st_size, info.st_mtime_ns)
+
+
+def _tamanho(valor):
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    return 0
+
+
+def _carregar_com_cache(caminho, tipo, carregar, assinatura=None):
+    assinatura = assinatura or _assinatura(caminho)
+    if assinatura is None:
+        return None
+    chave = (os.path.abspath(caminho), tipo)
+    with _trava:
+        entrada = _entradas.get(chave)
+        if entrada is not None and entrada[0] == assinatura:
+            _entradas.move_to_end(chave)
+            return entrada[1]
+
+    valor = carregar(caminho)
+    with _trava:
+        _entradas[chave] = (assinatura, valor, _tamanho(valor))
+        _entradas.move_to_end(chave)
+        total = sum(e[2] for e in _entradas.values())
+        while len(_entradas) > 1 and (len(_entradas) > MAX_ENTRADAS or total > MAX_BYTES):
+            _, removida = _entradas.popitem(last=False)
+            total -= removida[2]
+    return valor
+
+
+def _ler_historico(pasta_saida):
+    df_historico = consultar_historico(pasta_saida)
+    df_historico['periodo'] = pd.to_datetime(dict(year=df_historico['ano'], month=df_historico['mes'], day=1))
+    df_historico['display'] = df_historico['mes'].map(MESES_PT).fillna('') + '/' + df_historico['ano'].astype(str)
+    return df_historico.sort_values('periodo', kind='stable')
+
+
+def carregar_historico(pasta_saida):
+    # Com o banco em WAL, um commit pode mexer só no arquivo -wal: a assinatura olha os dois.
+    # Cópia para que a página possa acrescentar colunas sem mexer no cache.
+    banco = caminho_banco(pasta_saida)
+    assinatura = (_assinatura(banco), _assinatura(banco + '-wal'), _assinatura(os.path.join(pasta_saida, 'historico_oee.csv')))
+    df_historico = _carregar_com_cache(banco, 'historico', lambda _: _ler_historico(pasta_saida), assinatura)
+    return df_historico.copy()
+
+
+def ler_bytes(caminho):
+    def ler(caminho):
+        with open(caminho, 'rb') as f:
+            return f.read()
+    return _carregar_com_cache(caminho, 'bytes', ler)
+
+
+def invalidar(caminho=None):
+    with _trava:
+        if caminho is None:
+            _entradas.clear()
+            return
+        alvo = os.path.abspath(caminho)
+        for chave in [chave for chave in _entradas if chave[0] == alvo]:
+            del _entradas[chave]
+
+
+def invalidar_pasta(pasta):
+    # Tira tudo o que veio de dentro de pasta (ex.: o espaço de uma sessão removida)
+    prefixo = os.path.join(os.path.abspath(pasta), '')
+    with _trava:
+        for chave in [chave for chave in _entradas if chave[0].startswith(prefixo)]:
+            del _entradas[chave]
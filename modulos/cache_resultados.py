@@ -0,0 +1,90 @@
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import threading
+import zlib
+
+
+VERSAO_CACHE = 4
+
+EXTENSAO = '.pkl.gz'
+
+
+def chave_resultado(impressao_dados, ano, mes, regras_de_force, min_dias_up, aplicar_min_dias_up, capacidade_total,
+                    ensaios_executados, ensaios_solicitados, relatorios_no_prazo, relatorios_emitidos):
+    regras = {}
+    for nome, valor in (regras_de_force or {}).items():
+        regras[nome] = sorted(valor) if isinstance(valor, (list, tuple, set)) else valor
+    parametros = {
+        'versao': VERSAO_CACHE,
+        'dados': impressao_dados,
+        'ano': ano,
+        'mes': mes,
+        'regras_de_force': regras,
+        'min_dias_up': min_dias_up,
+        'aplicar_min_dias_up': aplicar_min_dias_up,
+        'capacidade_total': capacidade_total,
+        'ensaios_executados': ensaios_executados,
+        'ensaios_solicitados': ensaios_solicitados,
+        'relatorios_no_prazo': relatorios_no_prazo,
+        'relatorios_emitidos': relatorios_emitidos,
+    }
+    texto = json.dumps(parametros, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def ler_resultado(pasta_cache, chave):
+    caminho = os.path.join(pasta_cache, chave + EXTENSAO)
+    try:
+        with gzip.open(caminho, 'rb') as f:
+            conteudo = pickle.load(f)
+        os.utime(caminho)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, zlib.error, pickle.UnpicklingError, ValueError, AttributeError):
+        # Entrada truncada ou corrompida: conta como ausente e sai do cache
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+        return None
+    return dict(conteudo)
+
+
+def gravar_resultado(pasta_cache, chave, resultado, max_bytes, max_entradas):
+    os.makedirs(pasta_cache, exist_ok=True)
+    # O calendário já está em códigos int8 + rótulos, então vai para o pickle como está
+    conteudo = {k: v for k, v in resultado.items() if k not in ('caminho_excel', 'desempenho')}
+
+    caminho = os.path.join(pasta_cache, chave + EXTENSAO)
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with gzip.open(temporario, 'wb', compresslevel=6) as f:
+        pickle.dump(conteudo, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, caminho)
+    limpar_cache(pasta_cache, max_bytes, max_entradas)
+
+
+def limpar_cache(pasta_cache, max_bytes, max_entradas):
+    # LRU pelo mtime: cada leitura "toca" o arquivo, então os mais antigos saem primeiro
+    entradas = []
+    for nome in os.listdir(pasta_cache):
+        if not nome.endswith(EXTENSAO):
+            continue
+        caminho = os.path.join(pasta_cache, nome)
+        try:
+            info = os.stat(caminho)
+        except FileNotFoundError:
+            continue
+        entradas.append((info.st_mtime_ns, info.st_size, caminho))
+    entradas.sort(reverse=True)
+
+    total = 0
+    for posicao, (_, tamanho, caminho) in enumerate(entradas):
+        total += tamanho
+        if posicao >= max_entradas or total > max_bytes:
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
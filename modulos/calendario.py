@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+ROTULOS_STATUS = ['', 'SD', 'PP', 'UP', 'PQ']
+
+
+def _codigos_padrao_dias(dias_do_mes_range):
+    # Fim de semana começa como 'PP', dias úteis como 'SD'
+    fim_de_semana = np.asarray(dias_do_mes_range.weekday) >= 5
+    return np.where(fim_de_semana, ROTULOS_STATUS.index('PP'), ROTULOS_STATUS.index('SD')).astype(np.int8)
+
+
+def _offsets_em_dias(datas, inicio_mes):
+    valores = np.asarray(datas, dtype='datetime64[ns]').astype('datetime64[D]')
+    return (valores - np.datetime64(inicio_mes, 'D')).astype(np.int64)
+
+
+def construir_calendario_vencedores(circuitos, dias_do_mes_range, df_atividades):
+    # Além da matriz, devolve para cada célula (circuito * n_dias + dia) a posição em
+    # df_atividades da atividade que venceu, ou -1 se a célula ficou com o padrão do dia
+    rotulos = list(ROTULOS_STATUS)
+    n_circuitos, n_dias = len(circuitos), len(dias_do_mes_range)
+    matriz = np.tile(_codigos_padrao_dias(dias_do_mes_range), (n_circuitos, 1))
+    vencedor = np.full(n_circuitos * n_dias, -1, dtype=np.int64)
+    if n_circuitos == 0 or df_atividades.empty:
+        return matriz, rotulos, vencedor
+
+    ids_circuito = pd.Index(circuitos).get_indexer(df_atividades['circuito'])
+    validos = ids_circuito >= 0
+    if not validos.any():
+        return matriz, rotulos, vencedor
+    ids_circuito = ids_circuito[validos]
+
+    inicio = _offsets_em_dias(df_atividades['datastart'], dias_do_mes_range[0])[validos]
+    fim = _offsets_em_dias(df_atividades['datastop'], dias_do_mes_range[0])[validos]
+    inicio = np.maximum(inicio, 0)
+    fim = np.minimum(fim, n_dias - 1)
+    duracoes = np.clip(fim - inicio + 1, 0, None)
+
+    status = df_atividades['status'].to_numpy()[validos]
+    for valor in pd.unique(status):
+        if valor not in rotulos:
+            rotulos.append(valor)
+    codigos_status = pd.Index(rotulos).get_indexer(status).astype(np.int8)
+
+    # Expande cada intervalo em células (circuito, dia) sem laço em Python
+    total_celulas = int(duracoes.sum())
+    if total_celulas == 0:
+        return matriz, rotulos, vencedor
+    linhas = np.repeat(np.arange(len(duracoes)), duracoes)
+    deslocamento = np.arange(total_celulas) - np.repeat(np.cumsum(duracoes) - duracoes, duracoes)
+    celulas = ids_circuito[linhas] * n_dias + inicio[linhas] + deslocamento
+
+    # A última atividade (na ordem do arquivo) que cobre a célula define o status
+    np.maximum.at(vencedor, celulas, linhas)
+    preenchidas = vencedor >= 0
+    matriz.reshape(-1)[preenchidas] = codigos_status[vencedor[preenchidas]]
+    vencedor[preenchidas] = np.flatnonzero(validos)[vencedor[preenchidas]]
+    return matriz, rotulos, vencedor
+
+
+def agregar_utilizacao(matriz, rotulos, vencedor, agrupamentos, rotulo_ausente='(não informado)'):
+    # Dias de cada status por grupo a partir das células vencedoras do calendário (antes das forças).
+    # agrupamentos: {nome: (código do grupo por linha de df_atividades, -1 se ausente; categorias)}.
+    # Cada agrupamento é um bincount sobre (grupo, status); circuitos conta os circuitos distintos do grupo
+    # e utilizacao é dias / (circuitos * dias do mês), em %.
+    n_circuitos, n_dias = matriz.shape
+    n_rotulos = len(rotulos)
+    preenchidas = np.flatnonzero(vencedor >= 0)
+    linhas_vencedoras = vencedor[preenchidas]
+    circuito_celula = preenchidas // n_dias
+    status_celula = matriz.reshape(-1)[preenchidas].astype(np.int64)
+
+    resultado = {}
+    for nome, (codigos_grupo, categorias) in agrupamentos.items():
+        n_grupos = len(categorias) + 1
+        grupo_celula = np.asarray(codigos_grupo, dtype=np.int64)[linhas_vencedoras]
+        grupo_celula[grupo_celula < 0] = n_grupos - 1
+        contagens = np.bincount(grupo_celula * n_rotulos + status_celula, minlength=n_grupos * n_rotulos).reshape(n_grupos, n_rotulos)
+        pares = np.unique(grupo_celula * max(n_circuitos, 1) + circuito_celula)
+        circuitos_grupo = np.bincount(pares // max(n_circuitos, 1), minlength=n_grupos)
+
+        com_status = contagens.sum(axis=0) > 0
+        df_grupo = pd.DataFrame(contagens[:, com_status], columns=[str(r) for r in np.asarray(rotulos, dtype=object)[com_status]],
+                                index=pd.Index([str(c) for c in categorias] + [rotulo_ausente], name=nome))
+        df_grupo['dias'] = contagens.sum(axis=1)
+        df_grupo['circuitos'] = circuitos_grupo
+        df_grupo = df_grupo[df_grupo['dias'] > 0].copy()
+        df_grupo['utilizacao'] = (df_grupo['dias'] / (df_grupo['circuitos'] * n_dias) * 100).round(2)
+        resultado[nome] = df_grupo.sort_values('dias', ascending=False, kind='stable')
+    return resultado
+
+
+def aplicar_forcas_matriz(matriz, circuitos, dias_do_mes_range, regras_de_force):
+    indice = pd.Index(circuitos, dtype=object)
+    codigo_up, codigo_pp, codigo_pq = (ROTULOS_STATUS.index(s) for s in ('UP', 'PP', 'PQ'))
+
+    def linhas(nomes):
+        posicoes = indice.get_indexer(pd.Index(list(nomes), dtype=object)) if len(indice) and len(nomes) else np.array([], dtype=np.int64)
+        return posicoes[posicoes >= 0]
+
+    tipo_up_force = regras_de_force.get('tipo_up')
+    linhas_up = linhas(regras_de_force.get('circuitos_up', []))
+    if len(linhas_up):
+        if tipo_up_force == "Forçar 100% UP":
+            matriz[linhas_up] = codigo_up
+        elif tipo_up_force == "Forçar Semana Padrão (Seg-Sex UP)":
+            semana_padrao = np.where(np.asarray(dias_do_mes_range.weekday) < 5, codigo_up, codigo_pp)
+            matriz[linhas_up] = semana_padrao
+
+    linhas_pq = linhas(regras_de_force.get('circuitos_pq', []))
+    if len(linhas_pq):
+        matriz[linhas_pq] = codigo_pq
+    return matriz
+
+
+def contar_status_por_linha(matriz, n_rotulos):
+    # Quantidade de células de cada status por linha com um único bincount: (linhas, rótulos)
+    n_linhas = matriz.shape[0]
+    chaves = matriz.astype(np.int64) + (np.arange(n_linhas, dtype=np.int64) * n_rotulos)[:, None]
+    return np.bincount(chaves.ravel(), minlength=n_linhas * n_rotulos).reshape(n_linhas, n_rotulos)
+
+
+def selecionar_circuitos(matriz, rotulos, circuitos, regras_de_force, min_dias_up, aplicar_min_dias_up):
+    # Regras pós-calendário com máscaras sobre a contagem por linha, sem laço por circuito.
+    # Devolve (usados, apenas_sd_pp): circuitos que entram no cálculo e os que só têm SD/PP.
+    # Status nulo é ignorado, como no dropna da versão em DataFrame.
+    n_linhas = matriz.shape[0]
+    if n_linhas == 0:
+        vazio = np.zeros(0, dtype=bool)
+        return vazio, vazio
+    contagens = contar_status_por_linha(matriz, len(rotulos))
+    nao_nulos = ~pd.isna(np.asarray(rotulos, dtype=object))
+    sd_pp = np.isin(np.arange(len(rotulos)), [ROTULOS_STATUS.index('SD'), ROTULOS_STATUS.index('PP')])
+    com_status = contagens[:, nao_nulos].sum(axis=1) > 0
+    apenas_sd_pp = com_status & (contagens[:, nao_nulos & ~sd_pp].sum(axis=1) == 0)
+
+    usados = ~apenas_sd_pp
+    if aplicar_min_dias_up:
+        forcados = np.isin(np.asarray(circuitos, dtype=object), list(regras_de_force.get('circuitos_up', [])) + list(regras_de_force.get('circuitos_pq', [])))
+        usados &= forcados | (contagens[:, ROTULOS_STATUS.index('UP')] >= min_dias_up)
+    # Linha só com '' ou só com nulos não conta
+    usados &= com_status & (contagens[:, ROTULOS_STATUS.index('')] < matriz.shape[1])
+    return usados, apenas_sd_pp
+
+
+def calendario_para_dataframe(calendario):
+    # Fronteira com a interface e o Excel: só aqui os códigos int8 voltam a ser strings
+    valores = np.asarray(calendario['rotulos'], dtype=object)[calendario['codigos']]
+    indice = pd.Index(calendario['circuitos'], dtype=object)
+    colunas = pd.Index(calendario['dias'], name='Data')
+    return pd.DataFrame(valores, index=indice, columns=colunas, dtype=object)
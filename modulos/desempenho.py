@@ -0,0 +1,91 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger('modulos.desempenho')
+
+
+class MedidorDesempenho:
+    # Tempos por etapa (acumulados se a etapa se repete), contadores e, opcionalmente,
+    # um cProfile da execução inteira.
+
+    def __init__(self, perfilar=False):
+        self.etapas = {}
+        self.contadores = {}
+        self._inicio = time.perf_counter()
+        self._perfil = None
+        self._texto_perfil = None
+        if perfilar:
+            self._perfil = cProfile.Profile()
+            try:
+                self._perfil.enable()
+            except ValueError:
+                # Já existe outro profiler ativo nesta thread
+                self._perfil = None
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.acumular(nome, time.perf_counter() - inicio)
+
+    def acumular(self, nome, segundos):
+        self.etapas[nome] = self.etapas.get(nome, 0.0) + segundos
+
+    def contar(self, nome, quantidade=1):
+        self.contadores[nome] = self.contadores.get(nome, 0) + int(quantidade)
+
+    def parar_perfil(self, linhas_perfil=30):
+        # Idempotente; quem cria um medidor com perfilar=True chama isto num finally, senão o
+        # cProfile continua ligado na thread da fila e pega as próximas tarefas
+        if self._perfil is None:
+            return
+        self._perfil.disable()
+        saida = io.StringIO()
+        pstats.Stats(self._perfil, stream=saida).sort_stats('cumulative').print_stats(linhas_perfil)
+        self._texto_perfil = saida.getvalue()
+        self._perfil = None
+
+    def resumo(self, linhas_perfil=30):
+        resumo = {
+            'total_segundos': time.perf_counter() - self._inicio,
+            'etapas': dict(self.etapas),
+            'contadores': dict(self.contadores),
+        }
+        self.parar_perfil(linhas_perfil)
+        if self._texto_perfil is not None:
+            resumo['perfil'] = self._texto_perfil
+        return resumo
+
+
+def vazao_leitura(resumo):
+    # MB/s do tokenizador na ingestão; None quando o resumo não é de uma leitura de arquivos
+    segundos = resumo['etapas'].get('tokenizacao')
+    if not segundos:
+        return None
+    return resumo['contadores'].get('bytes_lidos', 0) / segundos / 2**20
+
+
+def registrar_desempenho(operacao, resumo, **contexto):
+    # Uma linha JSON por execução; o perfil em texto fica só no dicionário de resultados
+    registro = {'data': datetime.now().isoformat(timespec='seconds'), 'operacao': operacao, **contexto}
+    registro.update({k: v for k, v in resumo.items() if k != 'perfil'})
+    logger.info(json.dumps(registro, ensure_ascii=False, default=str))
+
+
+def configurar_log_desempenho(caminho_log):
+    caminho_log = os.path.abspath(caminho_log)
+    if any(getattr(h, 'baseFilename', None) == caminho_log for h in logger.handlers):
+        return
+    handler = logging.FileHandler(caminho_log, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
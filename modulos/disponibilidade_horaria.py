@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from modulos.calendario import ROTULOS_STATUS
+
+SEGUNDOS_DIA = 24 * 60 * 60
+
+
+def _segundos_desde(datas, inicio):
+    valores = np.asarray(datas, dtype='datetime64[ns]')
+    return (valores - np.datetime64(inicio, 'ns')).astype('timedelta64[s]').astype(np.int64)
+
+
+def _trocas_fim_de_semana(inicio, duracao):
+    # Instantes (em segundos desde o início) em que o padrão muda entre dia útil e fim de semana
+    dias = pd.date_range(start=inicio, periods=int(np.ceil(duracao / SEGUNDOS_DIA)), freq='D')
+    fim_de_semana = np.asarray(dias.weekday) >= 5
+    trocas = np.flatnonzero(np.diff(fim_de_semana.astype(np.int8))) + 1
+    return trocas.astype(np.int64) * SEGUNDOS_DIA
+
+
+def calcular_horas_status(circuitos, inicio, fim, df_atividades, regras_de_force=None):
+    # Horas em cada status por circuito no período [inicio, fim), direto dos intervalos:
+    # as bordas de todos os intervalos viram segmentos elementares por circuito e a última
+    # atividade (na ordem do arquivo) que cobre o segmento define o status dele. O tempo sem
+    # atividade segue o padrão do calendário diário ('PP' no fim de semana, 'SD' nos dias úteis).
+    regras_de_force = regras_de_force or {}
+    rotulos = list(ROTULOS_STATUS)
+    n_circuitos = len(circuitos)
+    duracao = int((pd.Timestamp(fim) - pd.Timestamp(inicio)) // pd.Timedelta(1, 's'))
+    passo = duracao + 1
+
+    ids_circuito = pd.Index(circuitos).get_indexer(df_atividades['circuito']) if len(df_atividades) else np.array([], dtype=np.int64)
+    # datastop vazio = atividade ainda em andamento, vai até o fim do período
+    paradas = df_atividades['datastop'].fillna(pd.Timestamp(fim)) if len(df_atividades) else df_atividades['datastop']
+    inicios = np.clip(_segundos_desde(df_atividades['datastart'], inicio), 0, duracao)
+    fins = np.clip(_segundos_desde(paradas, inicio), 0, duracao)
+    validos = (ids_circuito >= 0) & ~np.isnat(np.asarray(df_atividades['datastart'], dtype='datetime64[ns]')) & (fins > inicios)
+    linhas = np.flatnonzero(validos)
+
+    status = df_atividades['status'].to_numpy()[linhas] if len(linhas) else np.array([], dtype=object)
+    for valor in pd.unique(status):
+        if valor not in rotulos:
+            rotulos.append(valor)
+    codigos_status = pd.Index(rotulos).get_indexer(status).astype(np.int8)
+
+    # Bordas por circuito codificadas numa chave única: circuito * passo + segundo
+    fixas = np.concatenate(([0, duracao], _trocas_fim_de_semana(inicio, duracao)))
+    base = ids_circuito[linhas].astype(np.int64) * passo
+    bordas = np.unique(np.concatenate((
+        (np.arange(n_circuitos, dtype=np.int64)[:, None] * passo + fixas[None, :]).ravel(),
+        base + inicios[linhas],
+        base + fins[linhas],
+    )))
+    circuito_segmento = bordas[:-1] // passo
+    continuo = (bordas[1:] // passo) == circuito_segmento
+    duracoes = np.where(continuo, np.diff(bordas), 0)
+
+    # Cada intervalo cobre os segmentos [a, b); a expansão é pelo número de bordas, não de horas
+    a = np.searchsorted(bordas, base + inicios[linhas])
+    b = np.searchsorted(bordas, base + fins[linhas])
+    quantidades = b - a
+    vencedor = np.full(len(duracoes), -1, dtype=np.int64)
+    if quantidades.sum():
+        repeticoes = np.repeat(np.arange(len(linhas)), quantidades)
+        segmentos = a[repeticoes] + np.arange(len(repeticoes)) - np.repeat(np.cumsum(quantidades) - quantidades, quantidades)
+        np.maximum.at(vencedor, segmentos, repeticoes)
+
+    inicio_segmento = bordas[:-1] - circuito_segmento * passo
+    dia_util = ((pd.Timestamp(inicio).weekday() + inicio_segmento // SEGUNDOS_DIA) % 7) < 5
+    codigo_up, codigo_pq, codigo_pp, codigo_sd = (rotulos.index(s) for s in ('UP', 'PQ', 'PP', 'SD'))
+    codigos = np.where(dia_util, codigo_sd, codigo_pp).astype(np.int16)
+    cobertos = vencedor >= 0
+    codigos[cobertos] = codigos_status[vencedor[cobertos]]
+
+    # Mesmas regras de força do calendário diário
+    posicoes = {circuito: i for i, circuito in enumerate(circuitos)}
+    ids_up = [posicoes[c] for c in regras_de_force.get('circuitos_up', []) if c in posicoes]
+    if ids_up:
+        forcados = np.isin(circuito_segmento, ids_up)
+        if regras_de_force.get('tipo_up') == "Forçar 100% UP":
+            codigos[forcados] = codigo_up
+        elif regras_de_force.get('tipo_up') == "Forçar Semana Padrão (Seg-Sex UP)":
+            codigos[forcados] = np.where(dia_util[forcados], codigo_up, codigo_pp)
+    ids_pq = [posicoes[c] for c in regras_de_force.get('circuitos_pq', []) if c in posicoes]
+    if ids_pq:
+        codigos[np.isin(circuito_segmento, ids_pq)] = codigo_pq
+
+    segundos = np.bincount(circuito_segmento * len(rotulos) + codigos, weights=duracoes, minlength=n_circuitos * len(rotulos))
+    horas = segundos.reshape(n_circuitos, len(rotulos)) / 3600
+    colunas = ['UP', 'PQ', 'PP', 'SD'] + [r for r in rotulos[len(ROTULOS_STATUS):]]
+    return pd.DataFrame(horas[:, [rotulos.index(c) for c in colunas]], index=pd.Index(circuitos, name='Circuito'), columns=colunas)
@@ -0,0 +1,120 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+import weakref
+
+from modulos.cache_arquivos import invalidar_pasta
+
+MARCADOR_USO = '.ultimo_uso'
+
+_trava_limpeza = threading.Lock()
+
+# id do espaço -> marcador guardado no session_state. Quando o Streamlit descarta a sessão, o marcador
+# é coletado e o id sai daqui sozinho; enquanto estiver aqui, a limpeza não remove o espaço.
+_sessoes_vivas = weakref.WeakValueDictionary()
+
+
+class _PresencaSessao:
+    pass
+
+
+def _caminhos_espaco(pasta_base, id_sessao):
+    raiz = os.path.join(pasta_base, id_sessao)
+    saida = os.path.join(raiz, 'relatorios')
+    return {
+        'id': id_sessao,
+        'raiz': raiz,
+        'uploads': os.path.join(raiz, 'dados_brutos'),
+        'saida': saida,
+        'csv_processado': os.path.join(saida, 'dados_processados.csv'),
+    }
+
+
+def tocar_espaco(espaco):
+    # Garante as pastas (podem ter sido removidas pela limpeza) e marca o uso mais recente
+    os.makedirs(espaco['uploads'], exist_ok=True)
+    os.makedirs(espaco['saida'], exist_ok=True)
+    with open(os.path.join(espaco['raiz'], MARCADOR_USO), 'w') as f:
+        f.write(str(time.time()))
+    return espaco
+
+
+def espaco_da_sessao(estado_sessao, pasta_base):
+    # Cada sessão do Streamlit tem uploads, CSV processado e planilhas em uma pasta própria
+    if 'espaco_trabalho' not in estado_sessao:
+        estado_sessao['espaco_trabalho'] = _caminhos_espaco(pasta_base, uuid.uuid4().hex)
+    if 'presenca_espaco' not in estado_sessao:
+        estado_sessao['presenca_espaco'] = _PresencaSessao()
+    _sessoes_vivas[estado_sessao['espaco_trabalho']['id']] = estado_sessao['presenca_espaco']
+    return tocar_espaco(estado_sessao['espaco_trabalho'])
+
+
+def sessoes_vivas():
+    return set(_sessoes_vivas.keys())
+
+
+def gravar_arquivo_atomico(caminho, dados):
+    # Escreve em um temporário na mesma pasta e troca de uma vez: quem lê nunca vê arquivo pela metade
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, 'wb') as f:
+        f.write(dados)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def gravar_em_segundo_plano(arquivos, pasta):
+    # arquivos: pares (nome, dados). A cópia em disco é só para guardar os brutos; a leitura não espera por ela.
+    def gravar():
+        for nome, dados in arquivos:
+            try:
+                gravar_arquivo_atomico(os.path.join(pasta, os.path.basename(nome)), dados)
+            except OSError as e:
+                print(f"Erro ao guardar {nome}: {e}")
+    thread = threading.Thread(target=gravar, name='oee-guardar-uploads', daemon=True)
+    thread.start()
+    return thread
+
+
+def uso_disco(pasta):
+    total = 0
+    for raiz, _, arquivos in os.walk(pasta):
+        for nome in arquivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, nome))
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def limpar_espacos(pasta_base, max_bytes, max_idade_segundos, preservar=()):
+    # Remove espaços parados há mais de max_idade_segundos e, se o total ainda passar de
+    # max_bytes, os menos usados recentemente. Os ids em preservar e os de sessões ainda
+    # abertas neste processo nunca são removidos.
+    if not os.path.isdir(pasta_base):
+        return []
+    with _trava_limpeza:
+        preservar = set(preservar) | sessoes_vivas()
+        agora = time.time()
+        espacos = []
+        for id_sessao in os.listdir(pasta_base):
+            raiz = os.path.join(pasta_base, id_sessao)
+            if not os.path.isdir(raiz):
+                continue
+            marcador = os.path.join(raiz, MARCADOR_USO)
+            ultimo_uso = os.path.getmtime(marcador) if os.path.exists(marcador) else os.path.getmtime(raiz)
+            espacos.append((ultimo_uso, id_sessao, raiz, uso_disco(raiz)))
+        espacos.sort()
+
+        removidos = []
+        total = sum(e[3] for e in espacos)
+        for ultimo_uso, id_sessao, raiz, tamanho in espacos:
+            if id_sessao in preservar:
+                continue
+            if agora - ultimo_uso > max_idade_segundos or total > max_bytes:
+                shutil.rmtree(raiz, ignore_errors=True)
+                invalidar_pasta(raiz)
+                total -= tamanho
+                removidos.append(id_sessao)
+        return removidos
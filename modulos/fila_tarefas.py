@@ -0,0 +1,92 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TarefaCancelada(Exception):
+    pass
+
+
+class Progresso:
+    # Passado às funções longas como progresso(etapa, atual, total). A sessão lê o estado
+    # para desenhar a barra e pede o cancelamento; a tarefa para na próxima chamada.
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._cancelar = threading.Event()
+        self.etapa = 'Na fila'
+        self.atual = 0
+        self.total = 0
+
+    def __call__(self, etapa, atual=0, total=0):
+        with self._trava:
+            self.etapa, self.atual, self.total = etapa, atual, total
+        self.verificar()
+
+    def verificar(self):
+        # Ponto de cancelamento sem mudar a etapa mostrada
+        if self._cancelar.is_set():
+            raise TarefaCancelada(self.etapa)
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    @property
+    def cancelada(self):
+        return self._cancelar.is_set()
+
+    def estado(self):
+        with self._trava:
+            fracao = min(self.atual / self.total, 1.0) if self.total else None
+            return {'etapa': self.etapa, 'atual': self.atual, 'total': self.total, 'fracao': fracao}
+
+
+class FilaTarefas:
+    # Pool de threads com limite de tarefas aceitas (em execução + esperando).
+    # Leitura e relatório passam por aqui para que várias sessões não disputem CPU e disco sem controle.
+
+    def __init__(self, max_workers=2, max_pendentes=8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='oee')
+        self._vagas = threading.BoundedSemaphore(max_pendentes)
+        self._trava = threading.Lock()
+        self._ativas = {}
+
+    def enviar(self, dono, funcao, *args, **kwargs):
+        # Devolve um Future, ou None se a fila estiver cheia
+        if not self._vagas.acquire(blocking=False):
+            return None
+        try:
+            futuro = self._executor.submit(funcao, *args, **kwargs)
+        except Exception:
+            self._vagas.release()
+            raise
+        with self._trava:
+            self._ativas[futuro] = dono
+        futuro.add_done_callback(self._concluir)
+        return futuro
+
+    def _concluir(self, futuro):
+        with self._trava:
+            self._ativas.pop(futuro, None)
+        self._vagas.release()
+
+    def donos_ativos(self):
+        with self._trava:
+            return set(self._ativas.values())
+
+    def pendentes(self):
+        with self._trava:
+            return len(self._ativas)
+
+
+_fila = None
+
+_trava_fila = threading.Lock()
+
+
+def obter_fila(max_workers=2, max_pendentes=8):
+    # Uma fila por processo, compartilhada por todas as sessões do servidor
+    global _fila
+    with _trava_fila:
+        if _fila is None:
+            _fila = FilaTarefas(max_workers=max_workers, max_pendentes=max_pendentes)
+        return _fila
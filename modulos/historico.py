@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import threading
+from urllib.request import pathname2url
+
+import pandas as pd
+
+NOME_BANCO = 'historico_oee.sqlite'
+
+NOME_CSV = 'historico_oee.csv'
+
+COLUNAS_HISTORICO = ['ano', 'mes', 'disponibilidade', 'performance', 'qualidade', 'oee_final']
+
+
+def caminho_banco(pasta_saida):
+    return os.path.join(pasta_saida, NOME_BANCO)
+
+
+def _conectar(pasta_saida):
+    # WAL deixa leituras seguirem enquanto outra sessão grava; o timeout espera o lock em vez de falhar
+    conexao = sqlite3.connect(caminho_banco(pasta_saida), timeout=30)
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.execute("""
+        CREATE TABLE IF NOT EXISTS historico (
+            ano INTEGER NOT NULL,
+            mes INTEGER NOT NULL,
+            disponibilidade REAL,
+            performance REAL,
+            qualidade REAL,
+            oee_final REAL,
+            PRIMARY KEY (ano, mes)
+        ) WITHOUT ROWID
+    """)
+    conexao.execute("CREATE TABLE IF NOT EXISTS metadados (chave TEXT PRIMARY KEY, valor TEXT)")
+    _importar_csv_legado(conexao, pasta_saida)
+    return conexao
+
+
+def _conectar_leitura(pasta_saida):
+    # Só leitura: não cria o banco nem mexe no journal_mode. None enquanto o banco não existe
+    banco = caminho_banco(pasta_saida)
+    if not os.path.exists(banco):
+        return None
+    return sqlite3.connect(f"file:{pathname2url(os.path.abspath(banco))}?mode=ro", uri=True, timeout=30)
+
+
+def _ler_csv_legado(pasta_saida):
+    # O CSV da versão anterior, como o upsert o deixaria: a última linha de cada (ano, mes) vale
+    caminho_csv = os.path.join(pasta_saida, NOME_CSV)
+    if not os.path.exists(caminho_csv):
+        return pd.DataFrame({c: pd.Series(dtype='int64' if c in ('ano', 'mes') else 'float64') for c in COLUNAS_HISTORICO})
+    df_csv = pd.read_csv(caminho_csv)[COLUNAS_HISTORICO]
+    return df_csv.drop_duplicates(['ano', 'mes'], keep='last').sort_values(['ano', 'mes']).reset_index(drop=True)
+
+
+def _importar_csv_legado(conexao, pasta_saida):
+    # Na primeira abertura para escrita, o historico_oee.csv existente vira o conteúdo inicial do banco
+    if conexao.execute("SELECT 1 FROM metadados WHERE chave = 'csv_importado'").fetchone():
+        return
+    with conexao:
+        _upsert(conexao, _ler_csv_legado(pasta_saida).itertuples(index=False, name=None))
+        conexao.execute("INSERT OR REPLACE INTO metadados (chave, valor) VALUES ('csv_importado', '1')")
+
+
+def _upsert(conexao, linhas):
+    conexao.executemany("""
+        INSERT INTO historico (ano, mes, disponibilidade, performance, qualidade, oee_final)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (ano, mes) DO UPDATE SET
+            disponibilidade = excluded.disponibilidade,
+            performance = excluded.performance,
+            qualidade = excluded.qualidade,
+            oee_final = excluded.oee_final
+    """, [(int(l[0]), int(l[1]), float(l[2]), float(l[3]), float(l[4]), float(l[5])) for l in linhas])
+
+
+def _exportar_por_padrao(pasta_saida, exportar):
+    # exportar=None mantém o historico_oee.csv em dia onde ele já existe (instalações anteriores ao banco
+    # e scripts que o leem); instalações novas só têm o CSV sob demanda, por exportar_csv/historico_csv
+    return os.path.exists(os.path.join(pasta_saida, NOME_CSV)) if exportar is None else exportar
+
+
+def salvar_meses(pasta_saida, linhas, exportar=None):
+    # linhas: dicionários com as COLUNAS_HISTORICO; tudo entra numa única transação
+    exportar = _exportar_por_padrao(pasta_saida, exportar)
+    conexao = _conectar(pasta_saida)
+    try:
+        with conexao:
+            _upsert(conexao, [tuple(linha[c] for c in COLUNAS_HISTORICO) for linha in linhas])
+        if exportar:
+            exportar_csv(pasta_saida, conexao=conexao)
+    finally:
+        conexao.close()
+
+
+def apagar_meses(pasta_saida, periodos, exportar=None):
+    exportar = _exportar_por_padrao(pasta_saida, exportar)
+    conexao = _conectar(pasta_saida)
+    try:
+        with conexao:
+            conexao.executemany("DELETE FROM historico WHERE ano = ? AND mes = ?", [(int(a), int(m)) for a, m in periodos])
+        if exportar:
+            exportar_csv(pasta_saida, conexao=conexao)
+    finally:
+        conexao.close()
+
+
+def consultar_historico(pasta_saida, inicio=None, fim=None, conexao=None):
+    # inicio e fim são (ano, mes) inclusivos; a chave primária atende a faixa direto pelo índice
+    propria = conexao is None
+    if propria:
+        conexao = _conectar_leitura(pasta_saida)
+        if conexao is None:
+            df_historico = _ler_csv_legado(pasta_saida)
+            periodo = df_historico['ano'] * 12 + df_historico['mes']
+            if inicio is not None:
+                df_historico = df_historico[periodo >= int(inicio[0]) * 12 + int(inicio[1])]
+            if fim is not None:
+                df_historico = df_historico[periodo <= int(fim[0]) * 12 + int(fim[1])]
+            return df_historico.reset_index(drop=True)
+    try:
+        condicoes, parametros = [], []
+        if inicio is not None:
+            condicoes.append("(ano, mes) >= (?, ?)")
+            parametros.extend(int(v) for v in inicio)
+        if fim is not None:
+            condicoes.append("(ano, mes) <= (?, ?)")
+            parametros.extend(int(v) for v in fim)
+        consulta = f"SELECT {', '.join(COLUNAS_HISTORICO)} FROM historico"
+        if condicoes:
+            consulta += " WHERE " + " AND ".join(condicoes)
+        return pd.read_sql_query(consulta + " ORDER BY ano, mes", conexao, params=parametros)
+    finally:
+        if propria:
+            conexao.close()
+
+
+def historico_csv(pasta_saida):
+    # Conteúdo do historico_oee.csv montado na hora, para o download da página de histórico
+    return consultar_historico(pasta_saida).to_csv(index=False).encode('utf-8')
+
+
+def exportar_csv(pasta_saida, caminho_csv=None, conexao=None):
+    caminho_csv = caminho_csv or os.path.join(pasta_saida, NOME_CSV)
+    df_historico = consultar_historico(pasta_saida, conexao=conexao)
+    temporario = f"{caminho_csv}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df_historico.to_csv(temporario, index=False)
+    os.replace(temporario, caminho_csv)
+    return caminho_csv
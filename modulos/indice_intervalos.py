@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+FIM_ABERTO = np.iinfo(np.int64).max
+
+
+def _para_int64(datas):
+    return np.asarray(datas, dtype='datetime64[ns]').view(np.int64)
+
+
+class IndiceIntervalos:
+    # Por circuito: inícios ordenados e o máximo acumulado dos fins. Uma consulta
+    # [t0, t1] faz duas buscas binárias por circuito e só percorre os candidatos.
+
+    def __init__(self, circuitos, datastart, datastop):
+        codigos, circuitos_unicos = pd.factorize(np.asarray(circuitos, dtype=object))
+        self.circuitos = pd.Index(circuitos_unicos)
+        inicios = _para_int64(datastart)
+        fins = _para_int64(datastop).copy()
+        validos = (inicios != np.iinfo(np.int64).min) & (codigos >= 0)
+        fins[fins == np.iinfo(np.int64).min] = FIM_ABERTO
+
+        linhas_validas = np.flatnonzero(validos)
+        ordem = linhas_validas[np.lexsort((inicios[linhas_validas], codigos[linhas_validas]))]
+        self.linhas = ordem
+        self.inicios = inicios[ordem]
+        self.fins = fins[ordem]
+
+        codigos_ordenados = codigos[ordem]
+        self.limites = np.concatenate(([0], np.flatnonzero(np.diff(codigos_ordenados)) + 1, [len(ordem)]))
+        self.codigos_grupo = codigos_ordenados[self.limites[:-1]] if len(ordem) else np.array([], dtype=np.int64)
+        self.maximo_fins = np.empty_like(self.fins)
+        for a, b in zip(self.limites[:-1], self.limites[1:]):
+            self.maximo_fins[a:b] = np.maximum.accumulate(self.fins[a:b])
+
+    def __len__(self):
+        return len(self.linhas)
+
+    def consultar(self, t0, t1, circuitos=None):
+        # Linhas (posições na entrada original, em ordem crescente) com inicio <= t1 e fim >= t0
+        t0 = pd.Timestamp(t0).as_unit('ns').value
+        t1 = pd.Timestamp(t1).as_unit('ns').value
+        grupos = range(len(self.codigos_grupo))
+        if circuitos is not None:
+            codigos = set(self.circuitos.get_indexer(list(circuitos)))
+            grupos = [g for g in grupos if self.codigos_grupo[g] in codigos]
+
+        encontrados = []
+        for g in grupos:
+            a, b = self.limites[g], self.limites[g + 1]
+            ate = a + np.searchsorted(self.inicios[a:b], t1, side='right')
+            desde = a + np.searchsorted(self.maximo_fins[a:ate], t0, side='left')
+            if desde < ate:
+                candidatos = np.arange(desde, ate)
+                encontrados.append(candidatos[self.fins[desde:ate] >= t0])
+        if not encontrados:
+            return np.array([], dtype=np.int64)
+        return np.sort(self.linhas[np.concatenate(encontrados)])
@@ -0,0 +1,397 @@
+import codecs
+import io
+import itertools
+import os
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+circuit_pattern = re.compile(r"Circuit\d+", re.IGNORECASE)
+
+datetime_pattern = re.compile(r"\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}(?:\s+\d{1,2}:\d{2}(?::\d{2})?)?\b")
+
+TAMANHO_BLOCO_LEITURA = 1 << 20
+
+# Colunas depois do fim do ensaio nas exportações: norma, modelo da bateria e amostra/ordem
+COLUNAS_ATRIBUTOS = ['norma', 'modelo', 'amostra']
+
+formato_data_pattern = re.compile(r"^\d{1,2}(?P<sep>[/-])\d{1,2}(?P=sep)(?P<ano>\d{4}|\d{2})(?P<hora> \d{1,2}:\d{2}(?P<segundos>:\d{2})?)?$")
+
+
+def interpretar_data_flexivel(string_data, dayfirst=True):
+    if pd.isna(string_data) or not isinstance(string_data, str):
+        return pd.NaT
+    string_data = string_data.strip()
+    if re.search(r'\b(am|pm)\b', string_data, re.IGNORECASE):
+        return pd.NaT
+    return pd.to_datetime(string_data, dayfirst=dayfirst, errors='coerce')
+
+
+@lru_cache(maxsize=65536)
+def _interpretar_data_em_cache(string_data, dayfirst):
+    return interpretar_data_flexivel(string_data, dayfirst=dayfirst)
+
+
+def _formato_dominante(strings, dayfirst):
+    formas = strings.str.extract(formato_data_pattern)
+    formas = formas[formas['sep'].notna()]
+    if formas.empty:
+        return None, None
+    chaves = formas['sep'] + formas['ano'].str.len().astype(str) + formas['hora'].notna().astype(str) + formas['segundos'].notna().astype(str)
+    chave = chaves.value_counts().index[0]
+    exemplo = formas[chaves == chave].iloc[0]
+
+    sep = exemplo['sep']
+    partes_data = ['%d', '%m'] if dayfirst else ['%m', '%d']
+    formato = sep.join(partes_data + ['%Y' if len(exemplo['ano']) == 4 else '%y'])
+    if pd.notna(exemplo['hora']):
+        formato += ' %H:%M:%S' if pd.notna(exemplo['segundos']) else ' %H:%M'
+    conformes = pd.Series(False, index=strings.index)
+    conformes[chaves.index[chaves == chave]] = True
+    return formato, conformes
+
+
+def converter_datas(valores, dayfirst=True):
+    # Converte cada string distinta uma única vez: o formato dominante vai em
+    # uma chamada vetorizada e só as strings fora do padrão usam o caminho lento.
+    serie = pd.Series(valores, dtype=object)
+    textos = serie[serie.map(lambda v: isinstance(v, str))]
+    resultado = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+    if textos.empty:
+        return resultado
+
+    unicos = pd.Series(pd.unique(textos.to_numpy()), dtype=object)
+    limpos = unicos.str.strip()
+    convertidos = pd.Series(pd.NaT, index=unicos.index, dtype='datetime64[ns]')
+
+    formato, conformes = _formato_dominante(limpos, dayfirst)
+    if formato:
+        rapidos = pd.to_datetime(limpos[conformes], format=formato, errors='coerce').astype('datetime64[ns]')
+        if '%y' in formato:
+            # strptime e dateutil só concordam no século dentro da janela de +-50 anos do dateutil
+            ano_atual = datetime.now().year
+            rapidos[(rapidos.dt.year < ano_atual - 50) | (rapidos.dt.year >= ano_atual + 50)] = pd.NaT
+        rapidos = rapidos.dropna()
+        convertidos[rapidos.index] = rapidos
+        pendentes = unicos.index.difference(rapidos.index)
+    else:
+        pendentes = unicos.index
+
+    for i in pendentes:
+        convertidos[i] = _interpretar_data_em_cache(unicos[i], dayfirst)
+
+    mapa = pd.Series(convertidos.to_numpy(), index=pd.Index(unicos.to_numpy(), dtype=object))
+    resultado[textos.index] = mapa.reindex(textos.to_numpy()).to_numpy()
+    return resultado
+
+
+class ArquivoEmMemoria:
+    # Upload ainda na memória: nome (usado no manifesto e como origem) e conteúdo em bytes/memoryview
+
+    __slots__ = ('nome', 'dados')
+
+    def __init__(self, nome, dados):
+        self.nome = nome
+        self.dados = dados
+
+
+def _blocos_de_bytes(fonte, tamanho_bloco):
+    # Caminho ou ArquivoEmMemoria; os uploads saem como fatias do próprio buffer, sem cópia
+    if isinstance(fonte, ArquivoEmMemoria):
+        dados = memoryview(fonte.dados).cast('B')
+        for inicio in range(0, dados.nbytes, tamanho_bloco):
+            yield dados[inicio:inicio + tamanho_bloco]
+        return
+    with open(fonte, 'rb') as f:
+        yield from iter(lambda: f.read(tamanho_bloco), b'')
+
+
+def nome_fonte(fonte):
+    return fonte.nome if isinstance(fonte, ArquivoEmMemoria) else os.path.basename(fonte)
+
+
+def tamanho_fonte(fonte):
+    if isinstance(fonte, ArquivoEmMemoria):
+        return memoryview(fonte.dados).nbytes
+    return os.path.getsize(fonte) if os.path.exists(fonte) else 0
+
+
+def _atributos_do_blob(data_blob):
+    # Por posição na linha do circuito (circuito, início, fim, norma, modelo, amostra), mesmo com o fim vazio
+    campos = data_blob.split('\n', 1)[0].split('\t')
+    return tuple(campos[i] if i < len(campos) else '' for i in range(3, 3 + len(COLUNAS_ATRIBUTOS)))
+
+
+def _registro_do_blob(circuito, partes_blob):
+    data_blob = "".join(partes_blob)
+    found_datetimes = []
+    for match in datetime_pattern.finditer(data_blob):
+        found_datetimes.append(match.group(0))
+        if len(found_datetimes) == 2:
+            break
+    datastart_str = found_datetimes[0] if len(found_datetimes) >= 1 else None
+    datastop_str = found_datetimes[1] if len(found_datetimes) >= 2 else None
+    if datastart_str:
+        return (circuito, datastart_str, datastop_str) + _atributos_do_blob(data_blob)
+    return None
+
+
+def iterar_registros_brutos(linhas):
+    # Equivale a varrer "\n".join(linhas) com o padrão Circuit\d+, mas guarda
+    # apenas o trecho do circuito atual em vez do conteúdo total.
+    circuito_atual = None
+    partes_blob = []
+    primeira_linha = True
+    for linha in linhas:
+        trecho = linha if primeira_linha else "\n" + linha
+        primeira_linha = False
+        posicao = 0
+        for match in circuit_pattern.finditer(trecho):
+            if circuito_atual is not None:
+                partes_blob.append(trecho[posicao:match.start()])
+                registro = _registro_do_blob(circuito_atual, partes_blob)
+                if registro:
+                    yield registro
+            circuito_atual = match.group(0)
+            partes_blob = []
+            posicao = match.end()
+        if circuito_atual is not None:
+            partes_blob.append(trecho[posicao:])
+    if circuito_atual is not None:
+        registro = _registro_do_blob(circuito_atual, partes_blob)
+        if registro:
+            yield registro
+
+
+# Caminho rápido para as exportações dos digitalizadores: uma linha por ensaio, separada por tab
+# (Circuit001<tab>início<tab>fim[<tab>norma<tab>modelo<tab>amostra]). Uma linha só entra por aqui
+# quando a varredura acima daria exatamente o mesmo registro (atributos inclusive); as demais seguem
+# para iterar_registros_brutos.
+_DATA = r"\d{1,2}[/-]\d{1,2}[/-]\d{2,4}"
+_HORA = r"[^\S\t\n]+\d{1,2}:\d{2}(?::\d{2})?"
+
+# O fim só com data é aceito quando nada depois dele pode virar a hora (o \s+ da varredura atravessa tabs e quebras)
+linha_tsv_pattern = re.compile(
+    rf"^(?:([Cc][Ii][Rr][Cc][Uu][Ii][Tt]\d+)\t({_DATA}(?:{_HORA})?)\t"
+    rf"(?:({_DATA}{_HORA})|({_DATA})(?=\t[^\S\n]*[^\s\d]|\n[^\s\d]))"
+    r"(\t([^\t\n]*)(?:\t([^\t\n]*)(?:\t([^\t\n]*))?)?[^\n]*)?|([^\n]*))$",
+    re.MULTILINE,
+)
+
+AMOSTRA_DETECCAO_FORMATO = 200
+
+
+def _ocorrencias_rcu(texto):
+    # Todo Circuit\d+ (com o IGNORECASE) contém 'rcu': contar isso acha circuitos fora da 1ª coluna.
+    # Nenhum caractere fora do ASCII vira r, c ou u no lower(), então a contagem não muda.
+    return texto.lower().count('rcu')
+
+
+def _trocar_para_latin1(decodificador):
+    # O decode que falhou não muda o estado: os bytes de um caractere partido e um \r pendente do
+    # bloco anterior continuam lá e passam para o decodificador latin-1
+    partidos, estado = decodificador.getstate()
+    decodificador = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('latin-1')(), translate=True)
+    decodificador.setstate((b'', estado & 1))
+    return decodificador, partidos
+
+
+def blocos_de_texto(fonte, tamanho_bloco=TAMANHO_BLOCO_LEITURA):
+    # Lê tamanho_bloco bytes por vez e devolve blocos de linhas inteiras (o último pode não terminar
+    # em \n); só a linha incompleta do fim de cada leitura espera pelo bloco seguinte. As quebras
+    # \r\n e \r viram \n, como na leitura em modo texto, mesmo partidas entre dois blocos.
+    # O arquivo é decodificado uma vez só, em utf-8; no primeiro byte inválido a leitura segue em
+    # latin-1 a partir do bloco que falhou. O que já saiu era ASCII, igual nas duas codificações,
+    # a não ser que o arquivo misture utf-8 válido com latin-1.
+    decodificador = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(), translate=True)
+    resto = ''
+    for dados in _blocos_de_bytes(fonte, tamanho_bloco):
+        try:
+            texto = resto + decodificador.decode(dados)
+        except UnicodeDecodeError:
+            decodificador, partidos = _trocar_para_latin1(decodificador)
+            texto = resto + decodificador.decode(partidos + bytes(dados))
+        corte = texto.rfind('\n') + 1
+        if corte:
+            yield texto[:corte]
+        resto = texto[corte:]
+    try:
+        resto += decodificador.decode(b'', final=True)
+    except UnicodeDecodeError:
+        # Caractere partido no fim do arquivo
+        decodificador, partidos = _trocar_para_latin1(decodificador)
+        resto += decodificador.decode(partidos, final=True)
+    if resto:
+        yield resto
+
+
+def detectar_formato(texto, amostra=AMOSTRA_DETECCAO_FORMATO):
+    # 'tsv' quando a maior parte das linhas não vazias do começo do arquivo cabe no caminho rápido
+    linhas = [l for l in texto[:amostra * 256].split('\n', amostra)[:amostra] if l.strip()]
+    if not linhas:
+        return 'irregular'
+    rapidas = sum(1 for l in linhas if linha_tsv_pattern.match(l + '\n')[1])
+    return 'tsv' if rapidas * 2 >= len(linhas) else 'irregular'
+
+
+def _somar(estatisticas, chave, valor):
+    estatisticas[chave] = estatisticas.get(chave, 0) + valor
+
+
+def _colunas_registros(registros):
+    # object, como as colunas do caminho rápido: assim o np.concatenate não vira array de texto fixo
+    return tuple(np.array(coluna, dtype=object) for coluna in zip(*registros))
+
+
+def _compactar_pendente(pendente, novas, estatisticas):
+    # Arquivo irregular: devolve os registros dos circuitos que já terminaram e deixa em pendente só o
+    # trecho a partir do último circuito, em vez de guardar o arquivo todo até a próxima linha rápida.
+    # Varrer as linhas até o último circuito e depois o resto dá os mesmos registros que varrer tudo.
+    for k in range(len(pendente) - 1, len(pendente) - novas - 1, -1):
+        ultimo = None
+        for ultimo in circuit_pattern.finditer(pendente[k]):
+            pass
+        if ultimo is not None:
+            break
+    else:
+        if not any(circuit_pattern.search(linha) for linha in pendente[:len(pendente) - novas]):
+            # Nenhum circuito ainda: essas linhas não entram em registro nenhum
+            _somar(estatisticas, 'linhas_varridas', len(pendente))
+            pendente.clear()
+        return []
+    registros = list(iterar_registros_brutos(pendente[:k] + [pendente[k][:ultimo.start()]]))
+    _somar(estatisticas, 'linhas_varridas', k)
+    pendente[:] = [pendente[k][ultimo.start():]] + pendente[k + 1:]
+    return registros
+
+
+def _tokenizar_bloco(bloco, pendente, estatisticas):
+    # Devolve os lotes (circuitos, inicios, fins, normas, modelos, amostras) do bloco na ordem das linhas. pendente guarda as
+    # linhas irregulares que podem continuar no próximo bloco ou arquivo (têm circuito e ainda não
+    # apareceu a próxima linha rápida).
+    linhas = linha_tsv_pattern.findall(bloco)
+    if bloco.endswith('\n'):
+        linhas.pop()
+    circuitos, inicios, fins_hora, fins_data, restos, *atributos, irregulares = zip(*linhas)
+    n = len(linhas)
+    rapidas = np.fromiter(map(bool, circuitos), dtype=bool, count=n)
+
+    idx_irregulares = np.flatnonzero(~rapidas)
+    com_rcu = {}
+    for i in idx_irregulares.tolist():
+        ocorrencias = _ocorrencias_rcu(irregulares[i])
+        if ocorrencias:
+            com_rcu[i] = ocorrencias
+    if _ocorrencias_rcu(bloco) != n - len(idx_irregulares) + sum(com_rcu.values()):
+        # Algum circuito fora da primeira coluna de uma linha rápida: essa linha volta para a varredura
+        for i in np.flatnonzero(rapidas).tolist():
+            if _ocorrencias_rcu(restos[i]):
+                rapidas[i] = False
+                com_rcu[i] = 1
+        idx_irregulares = np.flatnonzero(~rapidas)
+
+    def texto_linha(i):
+        if circuitos[i]:
+            linha = f"{circuitos[i]}\t{inicios[i]}\t{fins_hora[i] or fins_data[i]}{restos[i]}"
+        else:
+            linha = irregulares[i]
+        return linha + '\n' if i < n - 1 or bloco.endswith('\n') else linha
+
+    idx_rapidas = np.flatnonzero(rapidas)
+    if len(idx_rapidas):
+        coluna_circuitos = np.array(circuitos, dtype=object)
+        coluna_inicios = np.array(inicios, dtype=object)
+        coluna_fins = np.array([h or d for h, d in zip(fins_hora, fins_data)], dtype=object)
+        colunas_atributos = [np.array(valores, dtype=object) for valores in atributos]
+
+    lotes = []
+
+    def emitir_rapidas(de, ate):
+        selecao = idx_rapidas[np.searchsorted(idx_rapidas, de):np.searchsorted(idx_rapidas, ate)]
+        if len(selecao):
+            lotes.append((coluna_circuitos[selecao], coluna_inicios[selecao], coluna_fins[selecao], *(c[selecao] for c in colunas_atributos)))
+
+    def varrer_pendente():
+        registros = list(iterar_registros_brutos(pendente))
+        _somar(estatisticas, 'linhas_varridas', len(pendente))
+        pendente.clear()
+        if registros:
+            lotes.append(_colunas_registros(registros))
+
+    # Trechos consecutivos de linhas irregulares; só importam os que têm circuito
+    # (ou que continuam um pendente vindo do bloco anterior)
+    if len(idx_irregulares):
+        quebras = np.flatnonzero(np.diff(idx_irregulares) > 1) + 1
+        trechos = zip(idx_irregulares[np.r_[0, quebras]].tolist(), idx_irregulares[np.r_[quebras - 1, len(idx_irregulares) - 1]].tolist())
+    else:
+        trechos = ()
+    posicao = 0
+    for inicio, fim in trechos:
+        if inicio > 0 and pendente:
+            varrer_pendente()
+        if not pendente and not any(i in com_rcu for i in range(inicio, fim + 1)):
+            continue
+        emitir_rapidas(posicao, inicio)
+        pendente.extend(texto_linha(i) for i in range(inicio, fim + 1))
+        posicao = fim + 1
+        if fim < n - 1:
+            varrer_pendente()
+    if pendente and posicao < n:
+        varrer_pendente()
+    emitir_rapidas(posicao, n)
+
+    _somar(estatisticas, 'linhas', n)
+    _somar(estatisticas, 'linhas_tsv', len(idx_rapidas))
+    return lotes
+
+
+def iterar_lotes_registros(fontes, estatisticas=None, tamanho_bloco=TAMANHO_BLOCO_LEITURA):
+    # Mesmos registros, na mesma ordem, que iterar_registros_brutos sobre as linhas de todas as fontes, em lotes de
+    # colunas (circuitos, inicios, fins e as COLUNAS_ATRIBUTOS, '' quando faltam). O formato é detectado uma vez por arquivo: os que não parecem
+    # exportação tab-separada vão inteiros para a varredura. estatisticas recebe bytes, linhas,
+    # linhas_tsv, linhas_varridas, arquivos por formato e os segundos gastos aqui (sem o consumidor).
+    # A leitura é em blocos de tamanho_bloco bytes: a memória não cresce com o tamanho do arquivo.
+    estatisticas = {} if estatisticas is None else estatisticas
+    pendente = []
+    for fonte in fontes:
+        inicio = time.perf_counter()
+        blocos = blocos_de_texto(fonte, tamanho_bloco)
+        iniciais, lidos = [], 0
+        try:
+            for bloco in blocos:
+                iniciais.append(bloco)
+                lidos += len(bloco)
+                if lidos >= AMOSTRA_DETECCAO_FORMATO * 256:
+                    break
+        except FileNotFoundError:
+            continue
+        formato = detectar_formato(iniciais[0] if len(iniciais) == 1 else ''.join(iniciais))
+        _somar(estatisticas, 'bytes', tamanho_fonte(fonte))
+        _somar(estatisticas, f'arquivos_{formato}', 1)
+        _somar(estatisticas, 'segundos', time.perf_counter() - inicio)
+        for bloco in itertools.chain(iniciais, blocos):
+            inicio = time.perf_counter()
+            if formato == 'irregular':
+                linhas = list(io.StringIO(bloco, newline='\n'))
+                _somar(estatisticas, 'linhas', len(linhas))
+                lotes = []
+                if pendente or _ocorrencias_rcu(bloco):
+                    pendente.extend(linhas)
+                    registros = _compactar_pendente(pendente, len(linhas), estatisticas)
+                    if registros:
+                        lotes.append(_colunas_registros(registros))
+            else:
+                lotes = _tokenizar_bloco(bloco, pendente, estatisticas)
+            _somar(estatisticas, 'segundos', time.perf_counter() - inicio)
+            yield from lotes
+    if pendente:
+        inicio = time.perf_counter()
+        registros = list(iterar_registros_brutos(pendente))
+        _somar(estatisticas, 'linhas_varridas', len(pendente))
+        _somar(estatisticas, 'segundos', time.perf_counter() - inicio)
+        if registros:
+            yield _colunas_registros(registros)
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from modulos.ingestao import COLUNAS_ATRIBUTOS, ArquivoEmMemoria, nome_fonte
+
+NOME_MANIFESTO = 'manifesto_ingestao.json'
+
+NOME_REGISTROS = 'registros_processados.pkl'
+
+COLUNAS_REGISTROS = ['circuito', 'datastart', 'datastop'] + COLUNAS_ATRIBUTOS + ['origem']
+
+
+def assinatura_arquivo(caminho_arquivo, tamanho_bloco=1 << 20):
+    sha256 = hashlib.sha256()
+    with open(caminho_arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            sha256.update(bloco)
+    return {'hash': sha256.hexdigest(), 'tamanho': os.path.getsize(caminho_arquivo)}
+
+
+def assinatura_bytes(dados):
+    dados = memoryview(dados)
+    return {'hash': hashlib.sha256(dados).hexdigest(), 'tamanho': dados.nbytes}
+
+
+def carregar_manifesto(pasta_estado):
+    caminho = os.path.join(pasta_estado, NOME_MANIFESTO)
+    if not os.path.exists(caminho):
+        return {'formato_data': None, 'arquivos': {}}
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'formato_data': None, 'arquivos': {}}
+
+
+def salvar_manifesto(pasta_estado, manifesto):
+    caminho = os.path.join(pasta_estado, NOME_MANIFESTO)
+    # Duas tarefas na mesma pasta não podem dividir o temporário antes do os.replace
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def carregar_registros(pasta_estado):
+    caminho = os.path.join(pasta_estado, NOME_REGISTROS)
+    if os.path.exists(caminho):
+        try:
+            df_registros = pd.read_pickle(caminho)
+            # Registros gravados antes dos atributos: ficam sem norma/modelo/amostra até o arquivo mudar
+            for coluna in COLUNAS_ATRIBUTOS:
+                if coluna not in df_registros.columns:
+                    df_registros[coluna] = pd.Categorical([None] * len(df_registros))
+            return df_registros[COLUNAS_REGISTROS]
+        except Exception as e:
+            print(f"Erro ao ler registros processados: {e}")
+    return pd.DataFrame({
+        'circuito': pd.Series(dtype=object),
+        'datastart': pd.Series(dtype='datetime64[ns]'),
+        'datastop': pd.Series(dtype='datetime64[ns]'),
+        **{coluna: pd.Series(dtype='category') for coluna in COLUNAS_ATRIBUTOS},
+        'origem': pd.Series(dtype=object),
+    })
+
+
+def salvar_registros(pasta_estado, df_registros):
+    caminho = os.path.join(pasta_estado, NOME_REGISTROS)
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df_registros.to_pickle(temporario)
+    os.replace(temporario, caminho)
+
+
+def arquivos_alterados(manifesto, lista_arquivos_path):
+    # Aceita caminhos e ArquivoEmMemoria; as chaves do resultado são os próprios itens da lista
+    alterados = {}
+    for fonte in lista_arquivos_path:
+        if isinstance(fonte, ArquivoEmMemoria):
+            assinatura = assinatura_bytes(fonte.dados)
+        elif os.path.exists(fonte):
+            assinatura = assinatura_arquivo(fonte)
+        else:
+            continue
+        if manifesto['arquivos'].get(nome_fonte(fonte)) != assinatura:
+            alterados[fonte] = assinatura
+    return alterados
+
+
+def atualizar_registros(df_registros, origens_atuais, origens_reprocessadas, df_novos):
+    # Troca as linhas dos arquivos reprocessados e descarta as de arquivos que saíram da lista.
+    # Nada é deduplicado aqui: as linhas ficam na ordem de origens_atuais (e do arquivo), a mesma
+    # que a leitura completa produz, e a limpeza de duplicatas na gravação vale igual para os dois modos.
+    df_mantidos = df_registros[df_registros['origem'].isin(origens_atuais) & ~df_registros['origem'].isin(origens_reprocessadas)]
+    partes = [df for df in (df_mantidos, df_novos) if not df.empty]
+    if not partes:
+        return df_registros.iloc[0:0]
+    df_final = pd.concat(partes, ignore_index=True)
+    posicoes = {origem: i for i, origem in enumerate(origens_atuais)}
+    df_final = df_final.iloc[np.argsort(df_final['origem'].map(posicoes).to_numpy(), kind='stable')]
+    # O concat de categorias diferentes vira object; volta a ser categórico antes de ir para o pickle
+    for coluna in COLUNAS_ATRIBUTOS:
+        df_final[coluna] = df_final[coluna].astype('category')
+    return df_final[COLUNAS_REGISTROS].reset_index(drop=True)
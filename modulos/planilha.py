@@ -0,0 +1,239 @@
+import locale
+import math
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import CellIsRule
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side, NamedStyle
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+
+STATUS_COMPILACAO = ["UP", "PQ", "PP", "SD"]
+
+_locale_configurado = False
+
+
+def _configurar_locale():
+    # Nome do mês em português no cabeçalho (strftime('%B')); feito na primeira planilha, não na importação
+    global _locale_configurado
+    if _locale_configurado:
+        return
+    try:
+        locale.setlocale(locale.LC_TIME, 'pt_BR.UTF-8')
+    except locale.Error:
+        pass
+    _locale_configurado = True
+
+
+def escrever_planilha_oee(caminho_saida, ano, mes, inicio_mes, dias_do_mes_range, relatorio_detalhado_df, sumario_ui, circuitos_usados_count, capacidade_total, usar_formulas=True, progresso=None):
+    # Planilha em modo write_only: as linhas são montadas em ordem e enviadas direto
+    # para o arquivo. Os estilos repetidos por célula usam NamedStyle compartilhado.
+    _configurar_locale()
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(f"Controle_OEE_{ano}_{mes:02d}")
+
+    font_title = Font(name='Calibri', size=40, bold=True, color="FFFFFF")
+    font_header_white = Font(name='Calibri', size=11, bold=True, color="FFFFFF")
+    font_legend = Font(name='Calibri', size=11, bold=True, color="000000")
+    font_month_year = Font(name='Calibri', size=36, bold=True, color="FFFFFF")
+    font_bold_black = Font(name='Calibri', size=11, bold=True, color="000000")
+
+    align_center = Alignment(horizontal='center', vertical='center', wrap_text=True)
+
+    border_thin_side = Side(border_style="thin", color="D9D9D9")
+    border_thin_all = Border(left=border_thin_side, right=border_thin_side, top=border_thin_side, bottom=border_thin_side)
+
+    fill_dark_green = PatternFill(start_color="006B3D", end_color="006B3D", fill_type="solid")
+    fill_up = PatternFill(fill_type="solid", start_color="92D050")
+    fill_pq = PatternFill(fill_type="solid", start_color="FF0000")
+    fill_pp = PatternFill(fill_type="solid", start_color="9BC2E6")
+    fill_sd = PatternFill(fill_type="solid", start_color="FFEB9C")
+
+    fill_oee_header = PatternFill(start_color="2F5597", end_color="2F5597", fill_type="solid")
+    fill_oee_subheader = PatternFill(start_color="DDEBF7", end_color="DDEBF7", fill_type="solid")
+    font_oee_header = Font(name='Calibri', size=11, bold=True, color="FFFFFF")
+    font_oee_sub = Font(name='Calibri', size=11, bold=True, color="000000")
+
+    style_status = NamedStyle(name='status_style', font=DEFAULT_FONT, alignment=align_center, border=border_thin_all)
+    style_circuito = NamedStyle(name='circuito_style', font=DEFAULT_FONT, border=DEFAULT_BORDER, alignment=align_center)
+    style_compilacao = NamedStyle(name='compilacao_style', font=font_bold_black, border=DEFAULT_BORDER)
+    style_media = NamedStyle(name='media_style', font=font_bold_black, number_format='0')
+    for estilo in (style_status, style_circuito, style_compilacao):
+        wb.add_named_style(estilo)
+
+    def celula(valor=None, style=None, font=None, fill=None, alignment=None, border=None, number_format=None):
+        cell = WriteOnlyCell(ws, value=valor)
+        if style is not None: cell.style = style
+        if font is not None: cell.font = font
+        if fill is not None: cell.fill = fill
+        if alignment is not None: cell.alignment = alignment
+        if border is not None: cell.border = border
+        if number_format is not None: cell.number_format = number_format
+        return cell
+
+    last_day = dias_do_mes_range[-1].day
+
+    col_calendar_start = 2
+    col_calendar_end = col_calendar_start + last_day - 1
+    summary_start_col = col_calendar_end + 2
+
+    oee_table_start_col = summary_start_col + 5
+    col_label = oee_table_start_col
+    col_value = oee_table_start_col + 1
+    col_result_label = oee_table_start_col + 3
+    col_result_value = oee_table_start_col + 4
+
+    # Dimensões e painéis precisam ser definidos antes da primeira linha
+    ws.column_dimensions['A'].width = 20
+    for col_idx in range(col_calendar_start, col_calendar_end + 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = 5
+    for i in range(len(STATUS_COMPILACAO)):
+        ws.column_dimensions[get_column_letter(summary_start_col + i)].width = 7
+    ws.column_dimensions[get_column_letter(col_label)].width = 25
+    ws.column_dimensions[get_column_letter(col_value)].width = 15
+    ws.column_dimensions[get_column_letter(col_value + 1)].width = 2
+    ws.column_dimensions[get_column_letter(col_result_label)].width = 25
+    ws.column_dimensions[get_column_letter(col_result_value)].width = 15
+
+    header_row_dias_semana, header_row_numeros = 6, 7
+    month_year_row = 5
+    for row_idx, height in ((1, 60), (3, 25), (month_year_row, 50), (header_row_dias_semana, 25), (header_row_numeros, 25)):
+        ws.row_dimensions[row_idx].height = height
+    ws.freeze_panes = f'{get_column_letter(col_calendar_start)}{header_row_numeros + 1}'
+
+    linhas_fixas = {}
+
+    def fixar(row_idx, col_idx, cell):
+        linhas_fixas.setdefault(row_idx, {})[col_idx] = cell
+
+    ws.merged_cells.add(f'A1:{get_column_letter(col_result_value)}1')
+    fixar(1, 1, celula("Controle de OEE - Laboratório", fill=fill_dark_green, font=font_title, alignment=align_center))
+
+    legend_items = {"UP": fill_up, "PQ": fill_pq, "PP": fill_pp, "SD": fill_sd}
+    for i, (status_code, fill_color) in enumerate(legend_items.items()):
+        fixar(3, 2 + i, celula(status_code, fill=fill_color, font=font_legend, alignment=align_center))
+
+    ws.merged_cells.add(f'{get_column_letter(summary_start_col)}3:{get_column_letter(summary_start_col + 7)}3')
+    fixar(3, summary_start_col, celula(f"Capacidade de utilização: {capacidade_total} circuitos", fill=fill_dark_green, font=font_header_white, alignment=align_center))
+
+    month_col_end = col_calendar_start + (last_day // 2)
+    ws.merged_cells.add(f'{get_column_letter(col_calendar_start)}{month_year_row}:{get_column_letter(month_col_end)}{month_year_row}')
+    fixar(month_year_row, col_calendar_start, celula(inicio_mes.strftime('%B').capitalize(), fill=fill_dark_green, font=font_month_year, alignment=align_center))
+    year_col_start = month_col_end + 1
+    ws.merged_cells.add(f'{get_column_letter(year_col_start)}{month_year_row}:{get_column_letter(col_calendar_end)}{month_year_row}')
+    fixar(month_year_row, year_col_start, celula(str(ano), fill=fill_dark_green, font=font_month_year, alignment=align_center))
+
+    ws.merged_cells.add('A6:A7')
+    fixar(6, 1, celula("Circuitos", fill=fill_dark_green, font=font_header_white, alignment=align_center))
+
+    dias_semana_map = ['dom', 'seg', 'ter', 'qua', 'qui', 'sex', 'sáb']
+    for i, dia in enumerate(dias_do_mes_range, start=col_calendar_start):
+        fixar(header_row_dias_semana, i, celula(dias_semana_map[int(dia.strftime('%w'))], fill=fill_dark_green, font=font_header_white, alignment=align_center))
+        fixar(header_row_numeros, i, celula(dia.day, fill=fill_dark_green, font=font_header_white, alignment=align_center))
+
+    ws.merged_cells.add(f'{get_column_letter(summary_start_col)}6:{get_column_letter(summary_start_col + 3)}6')
+    fixar(6, summary_start_col, celula("Compilação", fill=fill_dark_green, font=font_header_white, alignment=align_center))
+    for i, header in enumerate(STATUS_COMPILACAO):
+        fixar(7, summary_start_col + i, celula(header, fill=fill_dark_green, font=font_header_white, alignment=align_center))
+
+    start_data_row = header_row_numeros + 1
+    n_linhas_dados = 0 if relatorio_detalhado_df.empty else len(relatorio_detalhado_df)
+    current_row = start_data_row + n_linhas_dados
+
+    contagens = None
+    if n_linhas_dados:
+        valores = relatorio_detalhado_df.to_numpy()
+        contagens = [(valores == status_code).sum(axis=1) for status_code in STATUS_COMPILACAO]
+
+    media_row = current_row + 1
+    if circuitos_usados_count > 0:
+        fixar(media_row, 1, celula("MÉDIA", font=font_bold_black, fill=fill_oee_subheader, alignment=align_center))
+        for i in range(len(STATUS_COMPILACAO)):
+            col_idx = summary_start_col + i
+            if usar_formulas:
+                col_letter = get_column_letter(col_idx)
+                sum_range = f"{col_letter}{start_data_row}:{col_letter}{current_row - 1}"
+                valor_media = f"=ROUNDUP(SUM({sum_range})/{circuitos_usados_count}, 0)"
+            else:
+                total = int(contagens[i].sum()) if contagens is not None else 0
+                valor_media = math.ceil(total / circuitos_usados_count)
+            fixar(media_row, col_idx, celula(valor_media, style=style_media, border=border_thin_all, fill=fill_oee_subheader))
+
+    oee_start_row = 9
+    fixar(oee_start_row, col_label, celula("Valores para o Cálculo do OEE", fill=fill_oee_header, font=font_oee_header, alignment=align_center, border=border_thin_all))
+    ws.merged_cells.add(f'{get_column_letter(col_label)}{oee_start_row}:{get_column_letter(col_value)}{oee_start_row}')
+
+    row_tempo_disp = oee_start_row + 1
+    row_tempo_real = oee_start_row + 2
+    row_ensaios_sol = oee_start_row + 3
+    row_ensaios_exec = oee_start_row + 4
+    row_rel_emit = oee_start_row + 5
+    row_rel_prazo = oee_start_row + 6
+    valores_oee = [
+        (row_tempo_disp, "Tempo Disponível (dias)", sumario_ui.get('tempo_disponivel', 0), '0.00'),
+        (row_tempo_real, "Tempo Real Utilizado (dias)", sumario_ui.get('tempo_real_op', 0), '0.00'),
+        (row_ensaios_sol, "Ensaios Solicitados", sumario_ui.get('ensaios_solicitados', 0), None),
+        (row_ensaios_exec, "Ensaios Executados", sumario_ui.get('ensaios_executados', 0), None),
+        (row_rel_emit, "Relatórios Emitidos", sumario_ui.get('relatorios_emitidos', 0), None),
+        (row_rel_prazo, "Relatórios no Prazo", sumario_ui.get('relatorios_no_prazo', 0), None),
+    ]
+    for row_idx, rotulo, valor, number_format in valores_oee:
+        fixar(row_idx, col_label, celula(rotulo, fill=fill_oee_subheader, font=font_oee_sub, border=border_thin_all))
+        fixar(row_idx, col_value, celula(valor, number_format=number_format, border=border_thin_all))
+
+    ws.merged_cells.add(f'{get_column_letter(col_result_label)}{oee_start_row}:{get_column_letter(col_result_value)}{oee_start_row}')
+    fixar(oee_start_row, col_result_label, celula("Resultados do OEE", fill=fill_oee_header, font=font_oee_header, alignment=align_center, border=border_thin_all))
+
+    letra_valor = get_column_letter(col_value)
+    letra_resultado = get_column_letter(col_result_value)
+    row_disp_final = oee_start_row + 1
+    row_perf_final = oee_start_row + 2
+    row_qual_final = oee_start_row + 3
+    row_oee_final = oee_start_row + 5
+    resultados_oee = [
+        (row_disp_final, "Disponibilidade", font_bold_black, f"={letra_valor}{row_tempo_real}/{letra_valor}{row_tempo_disp}"),
+        (row_perf_final, "Performance", font_bold_black, f"={letra_valor}{row_ensaios_exec}/{letra_valor}{row_ensaios_sol}"),
+        (row_qual_final, "Qualidade", font_bold_black, f"={letra_valor}{row_rel_prazo}/{letra_valor}{row_rel_emit}"),
+        (row_oee_final, "OEE Final", Font(name='Calibri', size=11, bold=True, color="FF0000"),
+         f"={letra_resultado}{row_disp_final}*{letra_resultado}{row_perf_final}*{letra_resultado}{row_qual_final}"),
+    ]
+    for row_idx, rotulo, fonte, formula in resultados_oee:
+        fixar(row_idx, col_result_label, celula(rotulo, font=fonte, border=border_thin_all))
+        fixar(row_idx, col_result_value, celula(formula, style='Percent', border=border_thin_all))
+
+    data_range_format = f"{get_column_letter(col_calendar_start)}{start_data_row}:{get_column_letter(col_calendar_end)}{current_row + 5}"
+    for status, fill_color in [("UP", fill_up), ("PQ", fill_pq), ("PP", fill_pp), ("SD", fill_sd)]:
+        ws.conditional_formatting.add(data_range_format, CellIsRule(operator='equal', formula=[f'"{status}"'], fill=fill_color))
+
+    letra_inicio = get_column_letter(col_calendar_start)
+    letra_fim = get_column_letter(col_calendar_end)
+    linhas_dados = relatorio_detalhado_df.itertuples(name=None) if n_linhas_dados else iter(())
+    ultima_linha = max([current_row - 1] + list(linhas_fixas))
+    for row_idx in range(1, ultima_linha + 1):
+        linha = dict(linhas_fixas.get(row_idx, {}))
+        if start_data_row <= row_idx < current_row:
+            posicao = row_idx - start_data_row
+            if progresso is not None and posicao % 50 == 0:
+                progresso('Escrevendo linhas no Excel', posicao, n_linhas_dados)
+            circuito, *status_dias = next(linhas_dados)
+            linha[1] = celula(circuito, style='circuito_style')
+            for col_idx, status in enumerate(status_dias, start=col_calendar_start):
+                linha[col_idx] = celula(status, style='status_style')
+            for i, status_code in enumerate(STATUS_COMPILACAO):
+                if usar_formulas:
+                    valor = f'=COUNTIF({letra_inicio}{row_idx}:{letra_fim}{row_idx}, "{status_code}")'
+                else:
+                    valor = int(contagens[i][posicao])
+                linha[summary_start_col + i] = celula(valor, style='compilacao_style')
+        if not linha:
+            ws.append([])
+            continue
+        valores_linha = [None] * max(linha)
+        for col_idx, cell in linha.items():
+            valores_linha[col_idx - 1] = cell
+        ws.append(valores_linha)
+
+    if progresso is not None:
+        progresso('Salvando o arquivo Excel', n_linhas_dados, n_linhas_dados)
+    wb.save(caminho_saida)
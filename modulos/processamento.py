@@ -1,82 +1,318 @@
 import pandas as pd
+import numpy as np
 import re
 import os
 import math
+import time
+import threading
+import multiprocessing
 from datetime import datetime
-import openpyxl
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side, NamedStyle
-from openpyxl.utils import get_column_letter
-from openpyxl.formatting.rule import CellIsRule
-import locale
-
-try:
-    locale.setlocale(locale.LC_TIME, 'pt_BR.UTF-8')
-except locale.Error:
-    pass
-
-def interpretar_data_flexivel(string_data, dayfirst=True):
-    if pd.isna(string_data) or not isinstance(string_data, str):
-        return pd.NaT
-    string_data = string_data.strip()
-    if re.search(r'\b(am|pm)\b', string_data, re.IGNORECASE):
-        return pd.NaT
-    return pd.to_datetime(string_data, dayfirst=dayfirst, errors='coerce')
-
-def limpar_dados_brutos(lista_arquivos_path, arquivo_saida_path, formato_data="dd/mm/aaaa"):
-    all_lines = []
-    for nome_arquivo in lista_arquivos_path:
-        try:
-            try:
-                with open(nome_arquivo, 'r', encoding='utf-8') as f: lines = f.readlines()
-            except UnicodeDecodeError:
-                with open(nome_arquivo, 'r', encoding='latin-1') as f: lines = f.readlines()
-            all_lines.extend(lines)
-        except FileNotFoundError: continue
-    if not all_lines: return (False, [])
-    
-    conteudo_total = "\n".join(all_lines)
-    circuit_pattern = re.compile(r"Circuit\d+", re.IGNORECASE)
-    
-    datetime_pattern = re.compile(r"\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}(?:\s+\d{1,2}:\d{2}(?::\d{2})?)?\b")
-    
-    data_list = []
-    circuit_matches = list(circuit_pattern.finditer(conteudo_total))
-
-    for i, match in enumerate(circuit_matches):
-        circuito = match.group(0)
-        start_pos = match.end()
-        end_pos = circuit_matches[i+1].start() if i + 1 < len(circuit_matches) else len(conteudo_total)
-        data_blob = conteudo_total[start_pos:end_pos]
-        found_datetimes = datetime_pattern.findall(data_blob)
-        datastart_str = found_datetimes[0] if len(found_datetimes) >= 1 else None
-        datastop_str = found_datetimes[1] if len(found_datetimes) >= 2 else None
-        if datastart_str: data_list.append({'circuito': circuito, 'datastart': datastart_str, 'datastop': datastop_str})
-    
-    if not data_list: return (False, [])
-    df = pd.DataFrame(data_list)
-    
-    dayfirst_bool = (formato_data == "dd/mm/aaaa")
-    
-    df['datastart'] = df['datastart'].apply(interpretar_data_flexivel, dayfirst=dayfirst_bool)
-    df['datastop'] = df['datastop'].apply(interpretar_data_flexivel, dayfirst=dayfirst_bool)
-    
+from concurrent.futures import ProcessPoolExecutor
+from modulos.ingestao import COLUNAS_ATRIBUTOS, ArquivoEmMemoria, converter_datas, iterar_lotes_registros, nome_fonte, tamanho_fonte
+from modulos.manifesto import arquivos_alterados, atualizar_registros, carregar_manifesto, carregar_registros, salvar_manifesto, salvar_registros
+from modulos.armazenamento import consultar_atividades, gravar_particoes, impressao_digital_dados
+from modulos.cache_resultados import chave_resultado, gravar_resultado, ler_resultado
+from modulos.calendario import ROTULOS_STATUS, agregar_utilizacao, aplicar_forcas_matriz, calendario_para_dataframe, construir_calendario_vencedores, contar_status_por_linha, selecionar_circuitos
+from modulos.desempenho import MedidorDesempenho, registrar_desempenho
+from modulos.disponibilidade_horaria import calcular_horas_status
+from modulos.historico import salvar_meses
+from modulos.fila_tarefas import TarefaCancelada
+from modulos.qualidade import analisar_intervalos, caminho_relatorio_qualidade, gravar_relatorio_qualidade, resumo_qualidade
+
+def _codificar_atributo(valores, codigos):
+    # Vazio ou só espaços vira -1; o strip roda só nos valores distintos
+    locais, unicos = pd.factorize(valores)
+    mapa = [codigos.setdefault(u.strip(), len(codigos)) if u.strip() else -1 for u in unicos]
+    return np.array(mapa + [-1], dtype=np.int32)[locais]
+
+def _converter_lote_registros(colunas, dayfirst_bool, codigos_circuito, codigos_atributos):
+    df = pd.DataFrame(dict(zip(['circuito', 'datastart', 'datastop'] + COLUNAS_ATRIBUTOS, colunas)))
+    df['datastart'] = converter_datas(df['datastart'], dayfirst=dayfirst_bool)
+    df['datastop'] = converter_datas(df['datastop'], dayfirst=dayfirst_bool)
     df.dropna(subset=['datastart'], inplace=True)
-    if df.empty: return (False, [])
-        
-    df['circuito_num'] = df['circuito'].str.extract(r'(\d+)').astype(int)
-    df.sort_values(by=['circuito_num', 'datastart'], ascending=[True, False], inplace=True)
-    df.drop(columns=['circuito_num'], inplace=True)
-    df.reset_index(drop=True, inplace=True)
-    
-    df.to_csv(arquivo_saida_path, index=False, sep=';', date_format='%d/%m/%Y %H:%M:%S', na_rep='')
-    
-    circuitos_unicos = sorted(df['circuito'].unique(), key=lambda x: int(re.search(r'\d+', x).group()))
+    for circuito in df['circuito'].unique():
+        codigos_circuito.setdefault(circuito, len(codigos_circuito))
+    return (
+        df['circuito'].map(codigos_circuito).to_numpy(dtype=np.int32),
+        df['datastart'].to_numpy(dtype='datetime64[ns]'),
+        df['datastop'].to_numpy(dtype='datetime64[ns]'),
+        np.column_stack([_codificar_atributo(df[c].to_numpy(), codigos) for c, codigos in zip(COLUNAS_ATRIBUTOS, codigos_atributos)]).astype(np.int32),
+    )
+
+def _informar(progresso, etapa, atual=0, total=0):
+    # progresso é opcional; quando existe, também é o ponto em que um cancelamento interrompe a tarefa
+    if progresso is not None:
+        progresso(etapa, atual, total)
+
+def _verificar_cancelamento(progresso):
+    # Só o Progresso da fila sabe ser cancelado no meio de uma etapa; uma função simples como progresso
+    # continua sendo chamada apenas com (etapa, atual, total)
+    verificar = getattr(progresso, 'verificar', None)
+    if verificar is not None:
+        verificar()
+
+def _fontes_com_progresso(lista_arquivos_path, progresso):
+    for i, fonte in enumerate(lista_arquivos_path):
+        _informar(progresso, 'Lendo arquivos', i, len(lista_arquivos_path))
+        yield fonte
+
+def _ler_registros(lista_arquivos_path, dayfirst_bool, tamanho_lote, medidor=None, progresso=None):
+    # Devolve (nomes dos circuitos, códigos, datastart, datastop, categorias de cada atributo,
+    # códigos dos atributos em uma matriz (registros, COLUNAS_ATRIBUTOS) com -1 para ausente)
+    codigos_circuito = {}
+    codigos_atributos = [{} for _ in COLUNAS_ATRIBUTOS]
+    lotes = []
+    pendentes = []
+    total_registros = 0
+    tempo_conversao = 0.0
+    estatisticas = {}
+    inicio = time.perf_counter()
+
+    def converter(quantidade):
+        # Os lotes de conversão têm sempre tamanho_lote registros (o formato dominante das datas é decidido por lote)
+        nonlocal pendentes, total_registros, tempo_conversao
+        inicio_conversao = time.perf_counter()
+        colunas = [np.concatenate([p[k] for p in pendentes]) for k in range(len(pendentes[0]))]
+        for de in range(0, quantidade, tamanho_lote):
+            lote = [coluna[de:min(de + tamanho_lote, quantidade)] for coluna in colunas]
+            lotes.append(_converter_lote_registros(lote, dayfirst_bool, codigos_circuito, codigos_atributos))
+        pendentes = [tuple(coluna[quantidade:] for coluna in colunas)] if len(colunas[0]) > quantidade else []
+        total_registros += quantidade
+        tempo_conversao += time.perf_counter() - inicio_conversao
+
+    acumulados = 0
+    for colunas in iterar_lotes_registros(_fontes_com_progresso(lista_arquivos_path, progresso), estatisticas):
+        pendentes.append(colunas)
+        acumulados += len(colunas[0])
+        if acumulados >= tamanho_lote:
+            _verificar_cancelamento(progresso)
+            completos = acumulados - acumulados % tamanho_lote
+            converter(completos)
+            acumulados -= completos
+    if acumulados:
+        converter(acumulados)
+    if medidor is not None:
+        # A leitura e a separação andam juntas no mesmo gerador; o que sobra tirando a conversão é delas.
+        # tokenizacao é só o tempo do tokenizador, para a vazão em MB/s.
+        medidor.acumular('leitura_e_regex', time.perf_counter() - inicio - tempo_conversao)
+        medidor.acumular('tokenizacao', estatisticas.get('segundos', 0.0))
+        medidor.acumular('conversao_datas', tempo_conversao)
+        medidor.contar('bytes_lidos', estatisticas.get('bytes', 0))
+        medidor.contar('linhas_lidas', estatisticas.get('linhas', 0))
+        medidor.contar('linhas_tsv', estatisticas.get('linhas_tsv', 0))
+        medidor.contar('linhas_varridas', estatisticas.get('linhas_varridas', 0))
+        medidor.contar('arquivos_irregulares', estatisticas.get('arquivos_irregulares', 0))
+        medidor.contar('registros_brutos', total_registros)
+        medidor.contar('registros_validos', sum(len(lote[0]) for lote in lotes))
+    if not lotes:
+        return None
+    return (
+        list(codigos_circuito),
+        np.concatenate([lote[0] for lote in lotes]),
+        np.concatenate([lote[1] for lote in lotes]),
+        np.concatenate([lote[2] for lote in lotes]),
+        [list(codigos) for codigos in codigos_atributos],
+        np.concatenate([lote[3] for lote in lotes]),
+    )
+
+def _pool_processos(max_workers):
+    # spawn: a leitura e as planilhas rodam a partir de threads da fila do Streamlit, e um fork
+    # de processo com várias threads pode herdar locks presos e travar o filho
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+def _ler_registros_processo(fontes, dayfirst_bool, tamanho_lote):
+    # Roda no processo filho; tempos e contadores voltam junto com os registros para o medidor do pai
+    medidor = MedidorDesempenho()
+    return _ler_registros(fontes, dayfirst_bool, tamanho_lote, medidor), medidor.etapas, medidor.contadores
+
+def _ler_registros_por_arquivo(lista_arquivos_path, dayfirst_bool, tamanho_lote, max_workers, medidor=None, progresso=None):
+    total = len(lista_arquivos_path)
+    if not max_workers or max_workers <= 1:
+        resultados = []
+        for i, caminho in enumerate(lista_arquivos_path):
+            _informar(progresso, 'Lendo arquivos', i, total)
+            resultados.append(_ler_registros([caminho], dayfirst_bool, tamanho_lote, medidor))
+        _informar(progresso, 'Lendo arquivos', total, total)
+        return resultados
+    # Um processo por arquivo; a ordem dos resultados segue a ordem dos arquivos.
+    # memoryview não vai por pickle: uploads em memória seguem para os processos como bytes.
+    fontes = [ArquivoEmMemoria(f.nome, bytes(f.dados)) if isinstance(f, ArquivoEmMemoria) else f for f in lista_arquivos_path]
+    # Os tempos das etapas somam os de todos os processos (tempo de CPU, não de relógio).
+    with _pool_processos(max_workers) as executor:
+        resultados = []
+        for resultado, etapas, contadores in executor.map(_ler_registros_processo, [[fonte] for fonte in fontes],
+                                                          [dayfirst_bool] * total, [tamanho_lote] * total):
+            resultados.append(resultado)
+            if medidor is not None:
+                for nome, segundos in etapas.items():
+                    medidor.acumular(nome, segundos)
+                for nome, quantidade in contadores.items():
+                    medidor.contar(nome, quantidade)
+            _informar(progresso, 'Lendo arquivos', len(resultados), total)
+        return resultados
+
+def _unir_resultados(resultados):
+    resultados = [r for r in resultados if r is not None]
+    if not resultados:
+        return None
+
+    codigos_circuito = {}
+    codigos_atributos = [{} for _ in COLUNAS_ATRIBUTOS]
+    codigos = []
+    atributos = []
+    for nomes, codigos_locais, _, _, categorias, atributos_locais in resultados:
+        mapa = np.array([codigos_circuito.setdefault(nome, len(codigos_circuito)) for nome in nomes], dtype=np.int32)
+        codigos.append(mapa[codigos_locais])
+        remapeados = np.empty_like(atributos_locais)
+        for j, (valores, codigos_globais) in enumerate(zip(categorias, codigos_atributos)):
+            # -1 (ausente) cai no último item do mapa e continua -1
+            mapa = np.array([codigos_globais.setdefault(v, len(codigos_globais)) for v in valores] + [-1], dtype=np.int32)
+            remapeados[:, j] = mapa[atributos_locais[:, j]]
+        atributos.append(remapeados)
+    return (
+        list(codigos_circuito),
+        np.concatenate(codigos),
+        np.concatenate([r[2] for r in resultados]),
+        np.concatenate([r[3] for r in resultados]),
+        [list(codigos) for codigos in codigos_atributos],
+        np.concatenate(atributos),
+    )
+
+def _categoricos_atributos(categorias, atributos):
+    return {coluna: pd.Categorical.from_codes(atributos[:, j], categories=pd.Index(categorias[j], dtype=object))
+            for j, coluna in enumerate(COLUNAS_ATRIBUTOS)}
+
+def _usar_paralelismo(lista_arquivos_path, max_workers, min_bytes_paralelo):
+    if not max_workers or max_workers <= 1 or len(lista_arquivos_path) <= 1:
+        return False
+    tamanho_total = sum(tamanho_fonte(fonte) for fonte in lista_arquivos_path)
+    return tamanho_total >= min_bytes_paralelo
+
+def _gravar_registros_ordenados(nomes, codigos, datastart, datastop, atributos, arquivo_saida_path, tamanho_lote):
+    # atributos: {coluna: pd.Categorical} alinhados com as linhas; vão para o CSV depois de datastop
+    nomes_circuito = np.array(nomes, dtype=object)
+    numeros_circuito = np.array([int(re.search(r'\d+', nome).group()) for nome in nomes_circuito], dtype=np.int64)
+    ordem = np.lexsort((-datastart.view(np.int64), numeros_circuito[codigos]))
+
+    # O CSV é montado num temporário e trocado de uma vez, para que leitores nunca vejam um arquivo pela metade
+    temporario = f"{arquivo_saida_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    for inicio in range(0, len(ordem), tamanho_lote):
+        fatia = ordem[inicio:inicio + tamanho_lote]
+        df_lote = pd.DataFrame({'circuito': nomes_circuito[codigos[fatia]], 'datastart': datastart[fatia], 'datastop': datastop[fatia],
+                                **{coluna: valores[fatia] for coluna, valores in atributos.items()}})
+        df_lote.to_csv(temporario, mode='w' if inicio == 0 else 'a', header=(inicio == 0), index=False, sep=';', date_format='%d/%m/%Y %H:%M:%S', na_rep='')
+    os.replace(temporario, arquivo_saida_path)
+    gravar_particoes(arquivo_saida_path, nomes_circuito[codigos[ordem]], datastart[ordem], datastop[ordem],
+                     atributos={coluna: valores[ordem] for coluna, valores in atributos.items()})
+
+    return sorted(nomes_circuito[pd.unique(codigos[ordem])], key=lambda x: int(re.search(r'\d+', x).group()))
+
+def _sanear_registros(nomes, codigos, datastart, datastop, atributos, arquivo_saida_path, mesclar_sobreposicoes, medidor):
+    # Tira duplicatas exatas e, com mesclar_sobreposicoes, junta intervalos sobrepostos do mesmo circuito;
+    # atividades sem datastop ficam como estão. Os casos vão para qualidade_dados.csv
+    with medidor.etapa('qualidade'):
+        # Os grupos do relatório são numerados na ordem dos circuitos, não na ordem em que os códigos
+        # apareceram: assim a leitura incremental e a completa dão o mesmo relatório
+        numeros = [int(re.search(r'\d+', nome).group()) for nome in nomes]
+        posicao_circuito = np.empty(len(nomes), dtype=np.int64)
+        posicao_circuito[np.lexsort((np.array(nomes, dtype=object).astype(str), numeros))] = np.arange(len(nomes))
+        analise = analisar_intervalos(posicao_circuito[codigos], datastart, datastop, mesclar=mesclar_sobreposicoes)
+        gravar_relatorio_qualidade(caminho_relatorio_qualidade(arquivo_saida_path), np.array(nomes, dtype=object)[codigos],
+                                   datastart, datastop, atributos, analise)
+    for chave, valor in resumo_qualidade(analise).items():
+        medidor.contar(chave, valor)
+    linhas = analise['linhas']
+    return codigos[linhas], analise['datastart'], analise['datastop'], {coluna: valores[linhas] for coluna, valores in atributos.items()}
+
+def _limpar_dados_incremental(lista_arquivos_path, arquivo_saida_path, formato_data, tamanho_lote, max_workers, min_bytes_paralelo, mesclar_sobreposicoes, medidor, progresso):
+    dayfirst_bool = (formato_data == "dd/mm/aaaa")
+    pasta_estado = os.path.dirname(arquivo_saida_path) or '.'
+    _informar(progresso, 'Comparando arquivos com o manifesto')
+    with medidor.etapa('manifesto'):
+        manifesto = carregar_manifesto(pasta_estado)
+        df_registros = carregar_registros(pasta_estado)
+        if manifesto.get('formato_data') != formato_data:
+            manifesto = {'formato_data': formato_data, 'arquivos': {}}
+            df_registros = df_registros.iloc[0:0]
+        alterados = arquivos_alterados(manifesto, lista_arquivos_path)
+        # Arquivos que não estão mais na lista saem do manifesto e dos registros, como na leitura completa
+        origens_atuais = list(dict.fromkeys(nome_fonte(fonte) for fonte in lista_arquivos_path))
+        removidas = (set(manifesto['arquivos']) | set(df_registros['origem'])) - set(origens_atuais)
+    medidor.contar('arquivos_alterados', len(alterados))
+    medidor.contar('arquivos_removidos', len(removidas))
+
+    if alterados or removidas:
+        caminhos = list(alterados)
+        if _usar_paralelismo(caminhos, max_workers, min_bytes_paralelo):
+            with medidor.etapa('leitura_paralela'):
+                resultados = _ler_registros_por_arquivo(caminhos, dayfirst_bool, tamanho_lote, max_workers, medidor, progresso)
+        else:
+            resultados = _ler_registros_por_arquivo(caminhos, dayfirst_bool, tamanho_lote, 1, medidor, progresso)
+        origens = [nome_fonte(fonte) for fonte in caminhos]
+        novos = []
+        for origem, resultado in zip(origens, resultados):
+            if resultado is None:
+                continue
+            nomes, codigos, datastart, datastop, categorias, atributos = resultado
+            novos.append(pd.DataFrame({
+                'circuito': np.array(nomes, dtype=object)[codigos], 'datastart': datastart, 'datastop': datastop,
+                **_categoricos_atributos(categorias, atributos), 'origem': origem
+            }))
+        with medidor.etapa('atualizacao_registros'):
+            df_novos = pd.concat(novos, ignore_index=True) if novos else df_registros.iloc[0:0]
+            df_registros = atualizar_registros(df_registros, origens_atuais, origens, df_novos)
+            salvar_registros(pasta_estado, df_registros)
+            for origem in removidas:
+                manifesto['arquivos'].pop(origem, None)
+            for fonte, assinatura in alterados.items():
+                manifesto['arquivos'][nome_fonte(fonte)] = assinatura
+            salvar_manifesto(pasta_estado, manifesto)
+
+    if df_registros.empty: return (False, [])
+    codigos, nomes = pd.factorize(df_registros['circuito'])
+    codigos, datastart, datastop, atributos = _sanear_registros(
+        list(nomes), codigos, df_registros['datastart'].to_numpy(dtype='datetime64[ns]'), df_registros['datastop'].to_numpy(dtype='datetime64[ns]'),
+        {coluna: pd.Categorical(df_registros[coluna]) for coluna in COLUNAS_ATRIBUTOS}, arquivo_saida_path, mesclar_sobreposicoes, medidor
+    )
+    _informar(progresso, 'Gravando dados processados', len(codigos), len(codigos))
+    with medidor.etapa('gravacao'):
+        circuitos_unicos = _gravar_registros_ordenados(list(nomes), codigos, datastart, datastop, atributos, arquivo_saida_path, tamanho_lote)
+    medidor.contar('registros_gravados', len(codigos))
     return (True, circuitos_unicos)
 
-def salvar_historico_csv(ano, mes, sumario, pasta_saida):
-    caminho_csv = os.path.join(pasta_saida, 'historico_oee.csv')
-    colunas = ['ano', 'mes', 'disponibilidade', 'performance', 'qualidade', 'oee_final']
-    nova_linha = {
+def _limpar_dados_completo(lista_arquivos_path, arquivo_saida_path, formato_data, tamanho_lote, max_workers, min_bytes_paralelo, mesclar_sobreposicoes, medidor, progresso):
+    dayfirst_bool = (formato_data == "dd/mm/aaaa")
+
+    if _usar_paralelismo(lista_arquivos_path, max_workers, min_bytes_paralelo):
+        with medidor.etapa('leitura_paralela'):
+            lidos = _unir_resultados(_ler_registros_por_arquivo(lista_arquivos_path, dayfirst_bool, tamanho_lote, max_workers, medidor, progresso))
+    else:
+        lidos = _ler_registros(lista_arquivos_path, dayfirst_bool, tamanho_lote, medidor, progresso)
+    if lidos is None: return (False, [])
+    nomes, codigos, datastart, datastop, categorias, atributos = lidos
+    if len(codigos) == 0: return (False, [])
+
+    codigos, datastart, datastop, atributos = _sanear_registros(
+        nomes, codigos, datastart, datastop, _categoricos_atributos(categorias, atributos), arquivo_saida_path, mesclar_sobreposicoes, medidor
+    )
+    _informar(progresso, 'Gravando dados processados', len(codigos), len(codigos))
+    with medidor.etapa('gravacao'):
+        circuitos_unicos = _gravar_registros_ordenados(nomes, codigos, datastart, datastop, atributos, arquivo_saida_path, tamanho_lote)
+    medidor.contar('registros_gravados', len(codigos))
+    return (True, circuitos_unicos)
+
+def limpar_dados_brutos(lista_arquivos_path, arquivo_saida_path, formato_data="dd/mm/aaaa", tamanho_lote=50000, max_workers=1, min_bytes_paralelo=8 * 1024 * 1024, incremental=False, mesclar_sobreposicoes=True, medidor=None, progresso=None):
+    # lista_arquivos_path aceita caminhos e ingestao.ArquivoEmMemoria (uploads lidos direto da memória).
+    # medidor (MedidorDesempenho) e progresso (fila_tarefas.Progresso) são opcionais
+    medidor = medidor or MedidorDesempenho()
+    limpar = _limpar_dados_incremental if incremental else _limpar_dados_completo
+    sucesso, circuitos_unicos = limpar(lista_arquivos_path, arquivo_saida_path, formato_data, tamanho_lote, max_workers, min_bytes_paralelo, mesclar_sobreposicoes, medidor, progresso)
+    medidor.contar('circuitos', len(circuitos_unicos))
+    registrar_desempenho('limpeza', medidor.resumo(), arquivos=len(lista_arquivos_path), incremental=incremental, sucesso=sucesso)
+    return (sucesso, circuitos_unicos)
+
+def _linha_historico(ano, mes, sumario):
+    return {
         'ano': ano,
         'mes': mes,
         'disponibilidade': sumario.get('Disponibilidade', 0),
@@ -84,43 +320,104 @@ def salvar_historico_csv(ano, mes, sumario, pasta_saida):
         'qualidade': sumario.get('Qualidade', 0),
         'oee_final': sumario.get('OEE', 0)
     }
-    df_novo = pd.DataFrame([nova_linha])
-    if os.path.exists(caminho_csv):
-        df_historico = pd.read_csv(caminho_csv)
-        filtro = (df_historico['ano'] == ano) & (df_historico['mes'] == mes)
-        if not df_historico[filtro].empty:
-            df_historico = df_historico[~filtro]
-        df_final = pd.concat([df_historico, df_novo], ignore_index=True)
-    else:
-        df_final = df_novo
-    df_final = df_final.sort_values(by=['ano', 'mes'])
-    df_final.to_csv(caminho_csv, index=False)
 
-def gerar_dashboard_oee(arquivo_entrada_path, arquivo_saida_folder, ano, mes, capacidade_total=300, regras_de_force=None, min_dias_up=1, aplicar_min_dias_up=True, ensaios_executados=None, ensaios_solicitados=None, relatorios_no_prazo=None, relatorios_emitidos=None):
-    if regras_de_force is None:
-        regras_de_force = {}
-    
+def salvar_historico_lote(linhas, pasta_saida):
+    # linhas: lista de (ano, mes, sumario); upsert por (ano, mes) numa única transação no SQLite
+    salvar_meses(pasta_saida, [_linha_historico(ano, mes, sumario) for ano, mes, sumario in linhas])
+
+def salvar_historico_csv(ano, mes, sumario, pasta_saida):
+    salvar_historico_lote([(ano, mes, sumario)], pasta_saida)
+
+def _chave_cache_mes(arquivo_entrada_path, ano, mes, capacidade_total, regras_de_force, min_dias_up, aplicar_min_dias_up, ensaios_executados, ensaios_solicitados, relatorios_no_prazo, relatorios_emitidos):
+    return chave_resultado(
+        impressao_digital_dados(arquivo_entrada_path), ano, mes, regras_de_force, min_dias_up, aplicar_min_dias_up,
+        capacidade_total, ensaios_executados, ensaios_solicitados, relatorios_no_prazo, relatorios_emitidos
+    )
+
+def _gravar_cache_mes(pasta_cache, chave_cache, resultado, cache_max_bytes, cache_max_entradas):
     try:
-        df_atividades = pd.read_csv(arquivo_entrada_path, sep=';', dtype={'circuito': str}, na_values='')
-        df_atividades['datastart'] = pd.to_datetime(df_atividades['datastart'], format='%d/%m/%Y %H:%M:%S', errors='coerce')
-        df_atividades['datastop'] = pd.to_datetime(df_atividades['datastop'], format='%d/%m/%Y %H:%M:%S', errors='coerce')
-        if 'status' not in df_atividades.columns:
-            df_atividades['status'] = 'UP'
-    except Exception as e:
-        print(f"Erro ao ler CSV: {e}")
-        return None
+        gravar_resultado(pasta_cache, chave_cache, resultado, cache_max_bytes, cache_max_entradas)
+    except OSError as e:
+        print(f"Erro ao gravar cache de resultados: {e}")
 
+def _limites_mes(ano, mes):
     inicio_mes = datetime(ano, mes, 1)
     fim_mes = (inicio_mes + pd.offsets.MonthEnd(0)).to_pydatetime()
+    fim_do_periodo = pd.Timestamp(inicio_mes) + pd.offsets.MonthBegin(1) - pd.Timedelta(1, 'ns')
+    return inicio_mes, fim_mes, fim_do_periodo
+
+def calcular_oee(arquivo_entrada_path, ano, mes, capacidade_total=300, regras_de_force=None, min_dias_up=1, aplicar_min_dias_up=True, ensaios_executados=None, ensaios_solicitados=None, relatorios_no_prazo=None, relatorios_emitidos=None, pasta_cache=None, cache_max_bytes=200 * 1024 * 1024, cache_max_entradas=500, perfilar=False, progresso=None):
+    if regras_de_force is None:
+        regras_de_force = {}
+    medidor = MedidorDesempenho(perfilar=perfilar)
+    try:
+        _informar(progresso, 'Procurando resultado em cache', 0, 4)
+
+        chave_cache = None
+        if pasta_cache:
+            with medidor.etapa('cache'):
+                try:
+                    chave_cache = _chave_cache_mes(
+                        arquivo_entrada_path, ano, mes, capacidade_total, regras_de_force, min_dias_up, aplicar_min_dias_up,
+                        ensaios_executados, ensaios_solicitados, relatorios_no_prazo, relatorios_emitidos
+                    )
+                except OSError as e:
+                    print(f"Erro ao ler CSV: {e}")
+                    return None
+                resultado = ler_resultado(pasta_cache, chave_cache)
+            if resultado is not None:
+                medidor.contar('cache_acertos')
+                resultado['desempenho'] = medidor.resumo()
+                registrar_desempenho('calculo_oee', resultado['desempenho'], ano=ano, mes=mes)
+                return resultado
+    
+        inicio_mes, _, fim_do_periodo = _limites_mes(ano, mes)
+        _informar(progresso, 'Consultando atividades do mês', 1, 4)
+        try:
+            with medidor.etapa('consulta_atividades'):
+                df_atividades, todos_circuitos_no_arquivo = consultar_atividades(arquivo_entrada_path, inicio_mes, fim_do_periodo)
+                if 'status' not in df_atividades.columns:
+                    df_atividades['status'] = 'UP'
+        except Exception as e:
+            print(f"Erro ao ler CSV: {e}")
+            return None
+
+        resultado = _calcular_mes(
+            df_atividades, todos_circuitos_no_arquivo, ano, mes, capacidade_total, regras_de_force, min_dias_up, aplicar_min_dias_up,
+            ensaios_executados, ensaios_solicitados, relatorios_no_prazo, relatorios_emitidos, medidor, progresso
+        )
+        if chave_cache:
+            with medidor.etapa('cache'):
+                _gravar_cache_mes(pasta_cache, chave_cache, resultado, cache_max_bytes, cache_max_entradas)
+        resultado['desempenho'] = medidor.resumo()
+        registrar_desempenho('calculo_oee', resultado['desempenho'], ano=ano, mes=mes)
+        return resultado
+    finally:
+        medidor.parar_perfil()
+
+def _agrupamentos_utilizacao(df_atividades, circuitos_calendario):
+    # norma e modelo pelas categorias do armazenamento; CSVs antigos, sem essas colunas, agrupam só por circuito
+    agrupamentos = {}
+    for coluna in ('norma', 'modelo'):
+        if coluna in df_atividades.columns:
+            categorico = pd.Categorical(df_atividades[coluna])
+            agrupamentos[coluna] = (categorico.codes, list(categorico.categories))
+    agrupamentos['circuito'] = (pd.Index(circuitos_calendario, dtype=object).get_indexer(df_atividades['circuito']), circuitos_calendario)
+    return agrupamentos
+
+def _calcular_mes(df_atividades, todos_circuitos_no_arquivo, ano, mes, capacidade_total, regras_de_force, min_dias_up, aplicar_min_dias_up, ensaios_executados, ensaios_solicitados, relatorios_no_prazo, relatorios_emitidos, medidor, progresso=None):
+    medidor.contar('atividades', len(df_atividades))
+    _informar(progresso, f'Expandindo {len(df_atividades)} intervalos no calendário', 2, 4)
+    inicio_mes, fim_mes, _ = _limites_mes(ano, mes)
     fim_do_ultimo_dia = fim_mes.replace(hour=23, minute=59, second=59)
+    # A varredura em horas trata datastop vazio como "até o fim do mês", então guarda o original
+    df_intervalos = df_atividades[['circuito', 'datastart', 'datastop', 'status']].copy()
 
     df_atividades['datastop'] = df_atividades['datastop'].fillna(fim_do_ultimo_dia)
     df_atividades.dropna(subset=['datastart'], inplace=True)
 
     dias_do_mes_range = pd.date_range(start=inicio_mes, end=fim_mes, freq='D')
     
-    todos_circuitos_no_arquivo = set(df_atividades['circuito'].unique())
-    
     circuitos_up_force = regras_de_force.get('circuitos_up', [])
     circuitos_pq_force = regras_de_force.get('circuitos_pq', [])
     circuitos_vazio_force = regras_de_force.get('circuitos_vazio', [])
@@ -136,103 +433,56 @@ def gerar_dashboard_oee(arquivo_entrada_path, arquivo_saida_folder, ano, mes, ca
         return numeric_parts
     
     circuitos_para_processar.discard('iDevice')
-    
-    circuitos_para_processar = sorted(list(circuitos_para_processar), key=lambda x: int(re.search(r'\d+', x).group()))
-
-    idevice_data = {}
-    for dia in dias_do_mes_range:
-        status = 'UP' if dia.weekday() < 5 else 'PP'
-        idevice_data[dia.day] = status
-    idevice_series = pd.Series(idevice_data, name='iDevice')
-    
-    if not circuitos_para_processar:
-        calendario_df = pd.DataFrame()
-    else:
-        dados_calendario = []
-        for circuito in circuitos_para_processar:
-            for dia in dias_do_mes_range:
-                status = 'PP' if dia.weekday() >= 5 else 'SD'
-                dados_calendario.append({'Circuito': circuito, 'Data': dia, 'Status': status})
-
-        calendario_df = pd.DataFrame(dados_calendario).set_index(['Circuito', 'Data'])
-    
-    if not calendario_df.empty:
-        df_periodo = df_atividades[df_atividades['circuito'].isin(circuitos_para_processar)].copy()
-    
-        for _, atividade in df_periodo.iterrows():
-            start_day = max(atividade['datastart'].normalize(), pd.Timestamp(inicio_mes))
-            end_day = min(atividade['datastop'].normalize(), pd.Timestamp(fim_mes))
-            status_atividade = atividade.get('status', 'UP')
-            
-            for dia in pd.date_range(start=start_day, end=end_day, freq='D'):
-                if (atividade['circuito'], dia) in calendario_df.index:
-                    calendario_df.loc[(atividade['circuito'], dia), 'Status'] = status_atividade
-
-        tipo_up_force = regras_de_force.get('tipo_up')
-        for circuito in circuitos_up_force:
-            if circuito in calendario_df.index.get_level_values('Circuito'):
-                if tipo_up_force == "Forçar 100% UP":
-                    calendario_df.loc[circuito, 'Status'] = 'UP'
-                elif tipo_up_force == "Forçar Semana Padrão (Seg-Sex UP)":
-                    for dia in dias_do_mes_range:
-                        if (circuito, dia) in calendario_df.index:
-                            status_forcado = 'UP' if dia.weekday() < 5 else 'PP'
-                            calendario_df.loc[(circuito, dia), 'Status'] = status_forcado
-        
-        for circuito in circuitos_pq_force:
-            if circuito in calendario_df.index.get_level_values('Circuito'):
-                calendario_df.loc[circuito, 'Status'] = 'PQ'
 
-    if not calendario_df.empty:
-        relatorio_detalhado_df = calendario_df.unstack(level='Data')['Status']
-        relatorio_detalhado_df.columns = relatorio_detalhado_df.columns.day
-    else:
-        relatorio_detalhado_df = pd.DataFrame(columns=[d.day for d in dias_do_mes_range])
-
-    indices_apenas_sd_pp = []
-    for index, row in relatorio_detalhado_df.iterrows():
-        valores_unicos = row.dropna().unique()
-        if len(valores_unicos) > 0 and all(val in ['PP', 'SD'] for val in valores_unicos):
-            indices_apenas_sd_pp.append(index)
-
-    df_para_calculo = relatorio_detalhado_df.drop(index=indices_apenas_sd_pp, errors='ignore')
+    # iDevice entra no cálculo como UP nos dias úteis e PP no fim de semana
+    idevice_codigos = np.where(np.asarray(dias_do_mes_range.weekday) < 5, ROTULOS_STATUS.index('UP'), ROTULOS_STATUS.index('PP')).astype(np.int8)
 
-    df_para_calculo.loc['iDevice'] = idevice_series
-    
-    if aplicar_min_dias_up:
-        indices_para_remover = []
-        for index, row in df_para_calculo.iterrows():
-            if index in circuitos_up_force or index in circuitos_pq_force or index == 'iDevice':
-                continue
-            dias_up_reais = (row == 'UP').sum()
-            if dias_up_reais < min_dias_up:
-                indices_para_remover.append(index)
-        df_para_calculo.drop(indices_para_remover, inplace=True)
+    # A ordem das linhas da matriz é só interna: o relatório é reordenado por custom_sort_key
+    circuitos_calendario = sorted(circuitos_para_processar)
+    medidor.contar('circuitos_calendario', len(circuitos_calendario))
+    with medidor.etapa('calendario'):
+        matriz_status, rotulos_status, vencedor = construir_calendario_vencedores(circuitos_calendario, dias_do_mes_range, df_atividades)
+    with medidor.etapa('utilizacao'):
+        # Antes das forças: a utilização por grupo vem só do que as atividades registraram
+        utilizacao = agregar_utilizacao(matriz_status, rotulos_status, vencedor, _agrupamentos_utilizacao(df_atividades, circuitos_calendario))
+    with medidor.etapa('horas'):
+        horas_status = calcular_horas_status(
+            circuitos_calendario, inicio_mes, pd.Timestamp(inicio_mes) + pd.offsets.MonthBegin(1), df_intervalos, regras_de_force
+        )
+    _informar(progresso, 'Aplicando regras e calculando totais', 3, 4)
+    inicio_regras = time.perf_counter()
 
-    df_para_calculo = df_para_calculo.loc[(df_para_calculo != '').any(axis=1) & (df_para_calculo.notna().any(axis=1))]
+    # Forças, mínimo de dias UP e separação dos circuitos parados: tudo em máscaras sobre a matriz
+    aplicar_forcas_matriz(matriz_status, circuitos_calendario, dias_do_mes_range, regras_de_force)
+    usados, apenas_sd_pp = selecionar_circuitos(matriz_status, rotulos_status, circuitos_calendario, regras_de_force, min_dias_up, aplicar_min_dias_up)
+    nomes_circuitos = np.asarray(circuitos_calendario, dtype=object)
+    nomes_calculo = nomes_circuitos[usados].tolist() + ['iDevice']
+    matriz_calculo = np.vstack([matriz_status[usados], idevice_codigos[None, :]])
 
-    df_sd_pp_vazio = pd.DataFrame(index=indices_apenas_sd_pp, columns=relatorio_detalhado_df.columns).fillna('')
-    circuitos_vazio_df = pd.DataFrame(index=circuitos_vazio_force, columns=relatorio_detalhado_df.columns).fillna('')
-    df_vazios_total = pd.concat([df_sd_pp_vazio, circuitos_vazio_df])
+    # Circuitos só com SD/PP e os removidos aparecem no relatório como linhas vazias
+    nomes_vazios = nomes_circuitos[apenas_sd_pp].tolist() + list(circuitos_vazio_force)
+    nomes_relatorio = nomes_calculo + nomes_vazios
+    matriz_relatorio = np.vstack([matriz_calculo, np.full((len(nomes_vazios), len(dias_do_mes_range)), ROTULOS_STATUS.index(''), dtype=np.int8)])
+    ordem = pd.Series(np.arange(len(nomes_relatorio)), index=pd.Index(nomes_relatorio, dtype=object)).sort_index(key=custom_sort_key).to_numpy()
+    calendario = {
+        'circuitos': [nomes_relatorio[i] for i in ordem],
+        'dias': np.asarray(dias_do_mes_range.day),
+        'codigos': matriz_relatorio[ordem],
+        'rotulos': rotulos_status,
+    }
 
-    if not df_vazios_total.empty:
-        relatorio_detalhado_df = pd.concat([df_para_calculo, df_vazios_total]).sort_index(key=custom_sort_key)
-    else:
-        relatorio_detalhado_df = df_para_calculo.sort_index(key=custom_sort_key)
-    
-    circuitos_usados_df = df_para_calculo
-    circuitos_usados_count = len(circuitos_usados_df)
+    circuitos_usados_count = len(nomes_calculo)
+    medidor.acumular('regras', time.perf_counter() - inicio_regras)
+    medidor.contar('circuitos_usados', circuitos_usados_count)
+    inicio_totais = time.perf_counter()
 
     sumario_ui = {'totais': {}, 'medias': {}}
     
     medias = {}
     if circuitos_usados_count > 0:
-        totais = {
-            'UP': (circuitos_usados_df == 'UP').sum().sum(),
-            'PQ': (circuitos_usados_df == 'PQ').sum().sum(),
-            'PP': (circuitos_usados_df == 'PP').sum().sum(),
-            'SD': (circuitos_usados_df == 'SD').sum().sum()
-        }
+        # Contagem por circuito e status num único bincount; o total do mês é a soma das linhas
+        totais_por_status = contar_status_por_linha(matriz_calculo, len(rotulos_status)).sum(axis=0)
+        totais = {status: totais_por_status[rotulos_status.index(status)] for status in ['UP', 'PQ', 'PP', 'SD']}
         sumario_ui['totais'] = totais
 
         medias = {status: total / circuitos_usados_count for status, total in totais.items()}
@@ -243,6 +493,13 @@ def gerar_dashboard_oee(arquivo_entrada_path, arquivo_saida_folder, ano, mes, ca
     tempo_disponivel = total_dias_mes - medias.get('PP', 0) - medias.get('SD', 0)
     tempo_real_op = medias.get('UP', 0) - medias.get('PQ', 0) - medias.get('SD', 0)
     disponibilidade = tempo_real_op / tempo_disponivel if tempo_disponivel > 0 else 0
+
+    # Mesma conta da disponibilidade diária, mas com as horas exatas dos circuitos usados
+    horas_usadas = horas_status.reindex([nome for nome in nomes_calculo if nome != 'iDevice']).dropna()
+    medias_horas = horas_usadas.mean() if not horas_usadas.empty else pd.Series(dtype=float)
+    tempo_disponivel_horas = total_dias_mes * 24 - medias_horas.get('PP', 0) - medias_horas.get('SD', 0)
+    tempo_real_op_horas = medias_horas.get('UP', 0) - medias_horas.get('PQ', 0) - medias_horas.get('SD', 0)
+    disponibilidade_horas = tempo_real_op_horas / tempo_disponivel_horas if tempo_disponivel_horas > 0 else 0
     
     performance = ensaios_executados / ensaios_solicitados if ensaios_solicitados and ensaios_solicitados > 0 else 0
     
@@ -257,266 +514,194 @@ def gerar_dashboard_oee(arquivo_entrada_path, arquivo_saida_folder, ano, mes, ca
     sumario_ui['relatorios_no_prazo'] = relatorios_no_prazo
     sumario_ui['relatorios_emitidos'] = relatorios_emitidos
     sumario_ui['Disponibilidade'] = round(disponibilidade * 100, 2)
+    sumario_ui['Disponibilidade_horas'] = round(disponibilidade_horas * 100, 2)
+    sumario_ui['horas_medias'] = {status: round(float(medias_horas.get(status, 0)), 2) for status in ['UP', 'PQ', 'PP', 'SD']}
     sumario_ui['Performance'] = round(performance * 100, 2)
     sumario_ui['Qualidade'] = round(qualidade * 100, 2)
     sumario_ui['OEE'] = round(oee * 100, 2)
 
     sumario_ui['circuitos_usados'] = circuitos_usados_count
     sumario_ui['circuitos_total'] = capacidade_total
+    medidor.acumular('totais', time.perf_counter() - inicio_totais)
     
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"Controle_OEE_{ano}_{mes:02d}"
-    
-    font_title = Font(name='Calibri', size=40, bold=True, color="FFFFFF")
-    font_header_white = Font(name='Calibri', size=11, bold=True, color="FFFFFF")
-    font_legend = Font(name='Calibri', size=11, bold=True, color="000000")
-    font_month_year = Font(name='Calibri', size=36, bold=True, color="FFFFFF")
-    font_bold_black = Font(name='Calibri', size=11, bold=True, color="000000")
-    
-    align_center = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    
-    border_thin_side = Side(border_style="thin", color="D9D9D9")
-    border_thin_all = Border(left=border_thin_side, right=border_thin_side, top=border_thin_side, bottom=border_thin_side)
-    
-    fill_dark_green = PatternFill(start_color="006B3D", end_color="006B3D", fill_type="solid")
-    fill_up = PatternFill(fill_type="solid", start_color="92D050")
-    fill_pq = PatternFill(fill_type="solid", start_color="FF0000")
-    fill_pp = PatternFill(fill_type="solid", start_color="9BC2E6")
-    fill_sd = PatternFill(fill_type="solid", start_color="FFEB9C")
-    
-    fill_oee_header = PatternFill(start_color="2F5597", end_color="2F5597", fill_type="solid")
-    fill_oee_subheader = PatternFill(start_color="DDEBF7", end_color="DDEBF7", fill_type="solid")
-    font_oee_header = Font(name='Calibri', size=11, bold=True, color="FFFFFF")
-    font_oee_sub = Font(name='Calibri', size=11, bold=True, color="000000")
-    
-    last_day = fim_mes.day
-    
-    col_calendar_start = 2
-    col_calendar_end = col_calendar_start + last_day - 1
-    summary_start_col = col_calendar_end + 2
-    
-    oee_table_start_col = summary_start_col + 5
-    col_oee_label = oee_table_start_col
-    col_oee_value = oee_table_start_col + 1
-    col_result_label = oee_table_start_col + 3
-    col_result_value = oee_table_start_col + 4
-    
-    ws.column_dimensions['A'].width = 20
-    ws.column_dimensions[get_column_letter(col_oee_label)].width = 25
-    ws.column_dimensions[get_column_letter(col_oee_value)].width = 15
-    ws.column_dimensions[get_column_letter(col_oee_value + 1)].width = 2
-    ws.column_dimensions[get_column_letter(col_result_label)].width = 25
-    ws.column_dimensions[get_column_letter(col_result_value)].width = 15
-
-    last_col_letter_total = get_column_letter(col_result_value)
-    ws.merge_cells(f'A1:{last_col_letter_total}1')
-    cell = ws['A1']; cell.value = "Controle de OEE - Laboratório"
-    cell.fill = fill_dark_green; cell.font = font_title; cell.alignment = align_center
-    ws.row_dimensions[1].height = 60
-    
-    ws.row_dimensions[3].height = 25
-    legend_items = {"UP": fill_up, "PQ": fill_pq, "PP": fill_pp, "SD": fill_sd}
-    start_col_legend = 2
-    for status_code, fill_color in legend_items.items():
-        cell = ws.cell(row=3, column=start_col_legend)
-        cell.value = status_code; cell.fill = fill_color; cell.font = font_legend; cell.alignment = align_center
-        ws.column_dimensions[get_column_letter(start_col_legend)].width = 8
-        start_col_legend += 1
-        
-    capacidade_col_start = summary_start_col
-    capacidade_col_end = summary_start_col + 7
-    ws.merge_cells(start_row=3, start_column=capacidade_col_start, end_row=3, end_column=capacidade_col_end)
-    cell = ws.cell(row=3, column=capacidade_col_start); cell.value = f"Capacidade de utilização: {capacidade_total} circuitos"
-    cell.fill = fill_dark_green; cell.font = font_header_white; cell.alignment = align_center
-    
-    month_year_row = 5
-    ws.row_dimensions[month_year_row].height = 50
-    month_col_end = col_calendar_start + (last_day // 2)
-    ws.merge_cells(start_row=month_year_row, start_column=col_calendar_start, end_row=month_year_row, end_column=month_col_end)
-    cell = ws.cell(row=month_year_row, column=col_calendar_start); cell.value = inicio_mes.strftime('%B').capitalize()
-    cell.fill = fill_dark_green; cell.font = font_month_year; cell.alignment = align_center
-    
-    year_col_start = month_col_end + 1
-    ws.merge_cells(start_row=month_year_row, start_column=year_col_start, end_row=month_year_row, end_column=col_calendar_end)
-    cell = ws.cell(row=month_year_row, column=year_col_start); cell.value = str(ano)
-    cell.fill = fill_dark_green; cell.font = font_month_year; cell.alignment = align_center
-    
-    header_row_dias_semana, header_row_numeros = 6, 7
-    ws.row_dimensions[header_row_dias_semana].height = 25
-    ws.row_dimensions[header_row_numeros].height = 25
-    
-    ws.merge_cells(start_row=6, start_column=1, end_row=7, end_column=1)
-    cell = ws.cell(row=6, column=1); cell.value = "Circuitos"
-    cell.fill = fill_dark_green; cell.font = font_header_white; cell.alignment = align_center
-    
-    dias_semana_map = ['dom', 'seg', 'ter', 'qua', 'qui', 'sex', 'sáb']
-    for i, dia in enumerate(dias_do_mes_range, start=col_calendar_start):
-        col_letter = get_column_letter(i)
-        cell_semana = ws.cell(row=header_row_dias_semana, column=i, value=dias_semana_map[int(dia.strftime('%w'))])
-        cell_semana.fill = fill_dark_green; cell_semana.font = font_header_white; cell_semana.alignment = align_center
-        cell_num = ws.cell(row=header_row_numeros, column=i, value=dia.day)
-        cell_num.fill = fill_dark_green; cell_num.font = font_header_white; cell_num.alignment = align_center
-        ws.column_dimensions[col_letter].width = 5
-        
-    ws.merge_cells(start_row=6, start_column=summary_start_col, end_row=6, end_column=summary_start_col + 3)
-    cell = ws.cell(row=6, column=summary_start_col)
-    cell.value = "Compilação"; cell.fill = fill_dark_green; cell.font = font_header_white; cell.alignment = align_center
-    
-    for i, header in enumerate(["UP", "PQ", "PP", "SD"]):
-        col_idx = summary_start_col + i
-        cell = ws.cell(row=7, column=col_idx, value=header)
-        cell.fill = fill_dark_green; cell.font = font_header_white; cell.alignment = align_center
-        ws.column_dimensions[get_column_letter(col_idx)].width = 7
-    
-    start_data_row = header_row_numeros + 1
-    current_row = start_data_row
-    if not relatorio_detalhado_df.empty:
-        for circuito, data_row in relatorio_detalhado_df.iterrows():
-            ws.cell(row=current_row, column=1, value=circuito).alignment = align_center
-            for day_num, status in data_row.items():
-                cell = ws.cell(row=current_row, column=col_calendar_start + day_num -1, value=status)
-                cell.alignment = align_center; cell.border = border_thin_all
-            data_range = f"{get_column_letter(col_calendar_start)}{current_row}:{get_column_letter(col_calendar_end)}{current_row}"
-            for i, status_code in enumerate(["UP", "PQ", "PP", "SD"]):
-                ws.cell(row=current_row, column=summary_start_col + i, value=f'=COUNTIF({data_range}, "{status_code}")').font = font_bold_black
-            current_row += 1
-
-    media_row = current_row + 1
-    if circuitos_usados_count > 0:
-        label_media_cell = ws.cell(row=media_row, column=1, value="MÉDIA")
-        label_media_cell.font = font_bold_black
-        label_media_cell.fill = fill_oee_subheader
-        label_media_cell.alignment = align_center
-        style_media = NamedStyle(name='media_style', font=font_bold_black, number_format='0')
-        for i in range(4):
-            col_idx = summary_start_col + i
-            col_letter = get_column_letter(col_idx)
-            sum_range = f"{col_letter}{start_data_row}:{col_letter}{current_row - 1}"
-            formula_media = f"=ROUNDUP(SUM({sum_range})/{circuitos_usados_count}, 0)"
-            media_cell = ws.cell(row=media_row, column=col_idx, value=formula_media)
-            media_cell.style = style_media
-            media_cell.border = border_thin_all
-            media_cell.fill = fill_oee_subheader
-
-    oee_start_row = 9
-    col_label = oee_table_start_col
-    col_value = oee_table_start_col + 1
-    col_result_label = oee_table_start_col + 3
-    col_result_value = oee_table_start_col + 4
-    
-    ws.merge_cells(start_row=oee_start_row, start_column=col_label, end_row=oee_start_row, end_column=col_value)
-    cell = ws.cell(row=oee_start_row, column=col_label, value="Valores para o Cálculo do OEE")
-    cell.fill = fill_oee_header
-    cell.font = font_oee_header
-    cell.alignment = align_center
-    cell.border = border_thin_all
-    
-    row_tempo_disp = oee_start_row + 1
-    cell = ws.cell(row=row_tempo_disp, column=col_label, value="Tempo Disponível (dias)")
-    cell.fill = fill_oee_subheader
-    cell.font = font_oee_sub
-    cell.border = border_thin_all
-    ws.cell(row=row_tempo_disp, column=col_value, value=sumario_ui.get('tempo_disponivel', 0)).number_format = '0.00'
-    ws.cell(row=row_tempo_disp, column=col_value).border = border_thin_all
-    
-    row_tempo_real = oee_start_row + 2
-    cell = ws.cell(row=row_tempo_real, column=col_label, value="Tempo Real Utilizado (dias)")
-    cell.fill = fill_oee_subheader
-    cell.font = font_oee_sub
-    cell.border = border_thin_all
-    ws.cell(row=row_tempo_real, column=col_value, value=sumario_ui.get('tempo_real_op', 0)).number_format = '0.00'
-    ws.cell(row=row_tempo_real, column=col_value).border = border_thin_all
-    
-    row_ensaios_sol = oee_start_row + 3
-    cell = ws.cell(row=row_ensaios_sol, column=col_label, value="Ensaios Solicitados")
-    cell.fill = fill_oee_subheader
-    cell.font = font_oee_sub
-    cell.border = border_thin_all
-    ws.cell(row=row_ensaios_sol, column=col_value, value=sumario_ui.get('ensaios_solicitados', 0)).border = border_thin_all
-    
-    row_ensaios_exec = oee_start_row + 4
-    cell = ws.cell(row=row_ensaios_exec, column=col_label, value="Ensaios Executados")
-    cell.fill = fill_oee_subheader
-    cell.font = font_oee_sub
-    cell.border = border_thin_all
-    ws.cell(row=row_ensaios_exec, column=col_value, value=sumario_ui.get('ensaios_executados', 0)).border = border_thin_all
-    
-    row_rel_emit = oee_start_row + 5
-    cell = ws.cell(row=row_rel_emit, column=col_label, value="Relatórios Emitidos")
-    cell.fill = fill_oee_subheader
-    cell.font = font_oee_sub
-    cell.border = border_thin_all
-    ws.cell(row=row_rel_emit, column=col_value, value=sumario_ui.get('relatorios_emitidos', 0)).border = border_thin_all
-    
-    row_rel_prazo = oee_start_row + 6
-    cell = ws.cell(row=row_rel_prazo, column=col_label, value="Relatórios no Prazo")
-    cell.fill = fill_oee_subheader
-    cell.font = font_oee_sub
-    cell.border = border_thin_all
-    ws.cell(row=row_rel_prazo, column=col_value, value=sumario_ui.get('relatorios_no_prazo', 0)).border = border_thin_all
-    
-    ws.merge_cells(start_row=oee_start_row, start_column=col_result_label, end_row=oee_start_row, end_column=col_result_value)
-    cell = ws.cell(row=oee_start_row, column=col_result_label, value="Resultados do OEE")
-    cell.fill = fill_oee_header
-    cell.font = font_oee_header
-    cell.alignment = align_center
-    cell.border = border_thin_all
-
-    row_disp_final = oee_start_row + 1
-    cell = ws.cell(row=row_disp_final, column=col_result_label, value="Disponibilidade")
-    cell.font = font_bold_black
-    cell.border = border_thin_all
-    cell = ws.cell(row=row_disp_final, column=col_result_value, value=f"={get_column_letter(col_value)}{row_tempo_real}/{get_column_letter(col_value)}{row_tempo_disp}")
-    cell.style = 'Percent'
-    cell.border = border_thin_all
-    
-    row_perf_final = oee_start_row + 2
-    cell = ws.cell(row=row_perf_final, column=col_result_label, value="Performance")
-    cell.font = font_bold_black
-    cell.border = border_thin_all
-    cell = ws.cell(row=row_perf_final, column=col_result_value, value=f"={get_column_letter(col_value)}{row_ensaios_exec}/{get_column_letter(col_value)}{row_ensaios_sol}")
-    cell.style = 'Percent'
-    cell.border = border_thin_all
-
-    row_qual_final = oee_start_row + 3
-    cell = ws.cell(row=row_qual_final, column=col_result_label, value="Qualidade")
-    cell.font = font_bold_black
-    cell.border = border_thin_all
-    cell = ws.cell(row=row_qual_final, column=col_result_value, value=f"={get_column_letter(col_value)}{row_rel_prazo}/{get_column_letter(col_value)}{row_rel_emit}")
-    cell.style = 'Percent'
-    cell.border = border_thin_all
-    
-    row_oee_final = oee_start_row + 5
-    
-    cell = ws.cell(row=row_oee_final, column=col_result_label, value="OEE Final")
-    cell.font = Font(name='Calibri', size=11, bold=True, color="FF0000")
-    cell.border = border_thin_all
-    
-    cell = ws.cell(row=row_oee_final, column=col_result_value, value=f"={get_column_letter(col_result_value)}{row_disp_final}*{get_column_letter(col_result_value)}{row_perf_final}*{get_column_letter(col_result_value)}{row_qual_final}")
-    cell.style = 'Percent'
-    cell.border = border_thin_all
-    
-    data_range_format = f"{get_column_letter(col_calendar_start)}{start_data_row}:{get_column_letter(col_calendar_end)}{current_row + 5}"
-    for status, fill_color in [("UP", fill_up), ("PQ", fill_pq), ("PP", fill_pp), ("SD", fill_sd)]:
-        ws.conditional_formatting.add(data_range_format, CellIsRule(operator='equal', formula=[f'"{status}"'], fill=fill_color))
-    
-    ws.freeze_panes = f'{get_column_letter(col_calendar_start)}{header_row_numeros + 1}'
-    
+    resultado = {
+        'ano': ano,
+        'mes': mes,
+        'sumario': sumario_ui,
+        'calendario': calendario,
+        'circuitos_calendario': circuitos_calendario,
+        'matriz_status': matriz_status,
+        'rotulos_status': rotulos_status,
+        'horas_status': horas_status,
+        'utilizacao': utilizacao,
+    }
+    return resultado
+
+def _escrever_excel(resultado, arquivo_saida_folder, formulas_excel, progresso=None):
+    # Só grava a planilha e devolve (caminho, segundos); o registro do tempo fica com quem chamou,
+    # porque nos lotes isto roda num processo filho, sem o log de desempenho do pai
+    ano, mes = resultado['ano'], resultado['mes']
+    inicio_mes = datetime(ano, mes, 1)
+    dias_do_mes_range = pd.date_range(start=inicio_mes, end=inicio_mes + pd.offsets.MonthEnd(0), freq='D')
+    sumario_ui = resultado['sumario']
+
     nome_arquivo_saida = f"Excel_OEE_{ano}_{mes:02d}.xlsx"
     caminho_completo_saida = os.path.join(arquivo_saida_folder, nome_arquivo_saida)
 
+    # openpyxl só é importado quando alguma planilha é gerada: cálculo e dashboard não pagam por ele
+    from modulos.planilha import escrever_planilha_oee
+
+    inicio = time.perf_counter()
+    temporario = f"{caminho_completo_saida}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
-        wb.save(caminho_completo_saida)
+        escrever_planilha_oee(
+            temporario, ano, mes, inicio_mes, dias_do_mes_range, calendario_para_dataframe(resultado['calendario']),
+            sumario_ui, sumario_ui['circuitos_usados'], sumario_ui['circuitos_total'], usar_formulas=formulas_excel,
+            progresso=progresso
+        )
+        os.replace(temporario, caminho_completo_saida)
+    except TarefaCancelada:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
     except Exception as e:
         print(f"Erro ao salvar o excel: {e}")
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return None, 0.0
+    return caminho_completo_saida, time.perf_counter() - inicio
+
+def _registrar_excel(resultado, caminho, segundos):
+    desempenho = resultado.setdefault('desempenho', {'total_segundos': 0.0, 'etapas': {}, 'contadores': {}})
+    desempenho['etapas']['excel'] = segundos
+    desempenho['total_segundos'] += segundos
+    registrar_desempenho('excel', {'etapas': {'excel': segundos}, 'contadores': {'linhas_planilha': len(resultado['calendario']['circuitos'])}},
+                         ano=resultado['ano'], mes=resultado['mes'])
+    resultado['caminho_excel'] = caminho
+
+def exportar_excel_oee(resultado, arquivo_saida_folder, formulas_excel=True, progresso=None):
+    caminho, segundos = _escrever_excel(resultado, arquivo_saida_folder, formulas_excel, progresso)
+    if caminho is None:
         return None
-    
-    salvar_historico_csv(ano, mes, sumario_ui, arquivo_saida_folder)
+    _registrar_excel(resultado, caminho, segundos)
+    return caminho
 
-    resultados = {
-        'caminho_excel': caminho_completo_saida,
-        'sumario': sumario_ui,
-        'df_preview': relatorio_detalhado_df
-    }
-    return resultados
\ No newline at end of file
+def gerar_dashboard_oee(arquivo_entrada_path, arquivo_saida_folder, ano, mes, capacidade_total=300, regras_de_force=None, min_dias_up=1, aplicar_min_dias_up=True, ensaios_executados=None, ensaios_solicitados=None, relatorios_no_prazo=None, relatorios_emitidos=None, formulas_excel=True):
+    resultados = calcular_oee(
+        arquivo_entrada_path, ano, mes, capacidade_total=capacidade_total, regras_de_force=regras_de_force,
+        min_dias_up=min_dias_up, aplicar_min_dias_up=aplicar_min_dias_up,
+        ensaios_executados=ensaios_executados, ensaios_solicitados=ensaios_solicitados,
+        relatorios_no_prazo=relatorios_no_prazo, relatorios_emitidos=relatorios_emitidos
+    )
+    if resultados is None:
+        return None
+    if exportar_excel_oee(resultados, arquivo_saida_folder, formulas_excel=formulas_excel) is None:
+        return None
+    salvar_historico_csv(ano, mes, resultados['sumario'], arquivo_saida_folder)
+    return resultados
+
+def _valor_do_mes(valor, ano, mes):
+    # Nos lotes as entradas de OEE podem vir por mês: {(ano, mes): valor}
+    if isinstance(valor, dict):
+        return valor.get((ano, mes))
+    return valor
+
+def calcular_oee_lote(arquivo_entrada_path, periodos, capacidade_total=300, regras_de_force=None, min_dias_up=1, aplicar_min_dias_up=True, ensaios_executados=None, ensaios_solicitados=None, relatorios_no_prazo=None, relatorios_emitidos=None, pasta_cache=None, cache_max_bytes=200 * 1024 * 1024, cache_max_entradas=500, progresso=None):
+    # Calcula vários meses com uma única leitura das atividades do intervalo inteiro
+    if regras_de_force is None:
+        regras_de_force = {}
+    periodos = sorted(set(periodos))
+    if not periodos:
+        return {}
+
+    resultados = {}
+    pendentes = {}
+    for ano, mes in periodos:
+        entradas = tuple(_valor_do_mes(v, ano, mes) for v in (ensaios_executados, ensaios_solicitados, relatorios_no_prazo, relatorios_emitidos))
+        chave_cache = None
+        if pasta_cache:
+            try:
+                chave_cache = _chave_cache_mes(arquivo_entrada_path, ano, mes, capacidade_total, regras_de_force, min_dias_up, aplicar_min_dias_up, *entradas)
+            except OSError as e:
+                print(f"Erro ao ler CSV: {e}")
+                return None
+            resultado = ler_resultado(pasta_cache, chave_cache)
+            if resultado is not None:
+                resultados[(ano, mes)] = resultado
+                continue
+        pendentes[(ano, mes)] = (entradas, chave_cache)
+
+    if pendentes:
+        inicio, _, _ = _limites_mes(*min(pendentes))
+        _, _, fim = _limites_mes(*max(pendentes))
+        inicio_consulta = time.perf_counter()
+        try:
+            df_periodo, todos_circuitos_no_arquivo = consultar_atividades(arquivo_entrada_path, inicio, fim)
+            if 'status' not in df_periodo.columns:
+                df_periodo['status'] = 'UP'
+        except Exception as e:
+            print(f"Erro ao ler CSV: {e}")
+            return None
+        # A consulta é única para o lote; cada mês registra a parte dele
+        tempo_consulta = (time.perf_counter() - inicio_consulta) / len(pendentes)
+
+        for i, ((ano, mes), (entradas, chave_cache)) in enumerate(pendentes.items()):
+            _informar(progresso, f'Calculando {mes:02d}/{ano}', i, len(pendentes))
+            inicio_mes, _, fim_do_periodo = _limites_mes(ano, mes)
+            no_mes = (df_periodo['datastart'] <= fim_do_periodo) & (df_periodo['datastop'].isna() | (df_periodo['datastop'] >= inicio_mes))
+            medidor = MedidorDesempenho()
+            medidor.acumular('consulta_atividades', tempo_consulta)
+            resultado = _calcular_mes(
+                df_periodo[no_mes].reset_index(drop=True), todos_circuitos_no_arquivo, ano, mes, capacidade_total, regras_de_force,
+                min_dias_up, aplicar_min_dias_up, *entradas, medidor
+            )
+            if chave_cache:
+                with medidor.etapa('cache'):
+                    _gravar_cache_mes(pasta_cache, chave_cache, resultado, cache_max_bytes, cache_max_entradas)
+            resultado['desempenho'] = medidor.resumo()
+            registrar_desempenho('calculo_oee', resultado['desempenho'], ano=ano, mes=mes, lote=True)
+            resultados[(ano, mes)] = resultado
+
+    return {periodo: resultados[periodo] for periodo in periodos}
+
+def _exportar_excel_processo(argumentos):
+    resultado, arquivo_saida_folder, formulas_excel = argumentos
+    return _escrever_excel(resultado, arquivo_saida_folder, formulas_excel)
+
+def exportar_excel_lote(resultados, arquivo_saida_folder, formulas_excel=True, max_workers=1, progresso=None):
+    # Uma planilha por mês; com max_workers > 1 as planilhas são montadas em processos separados
+    periodos = list(resultados)
+    tarefas = [(resultados[p], arquivo_saida_folder, formulas_excel) for p in periodos]
+    gravados = []
+    _informar(progresso, 'Gerando planilhas', 0, len(tarefas))
+    if max_workers > 1 and len(tarefas) > 1:
+        with _pool_processos(min(max_workers, len(tarefas))) as executor:
+            for gravado in executor.map(_exportar_excel_processo, tarefas):
+                gravados.append(gravado)
+                _informar(progresso, 'Gerando planilhas', len(gravados), len(tarefas))
+    else:
+        for tarefa in tarefas:
+            gravados.append(_exportar_excel_processo(tarefa))
+            _informar(progresso, 'Gerando planilhas', len(gravados), len(tarefas))
+
+    for periodo, (caminho, segundos) in zip(periodos, gravados):
+        if caminho is not None:
+            _registrar_excel(resultados[periodo], caminho, segundos)
+    return {periodo: caminho for periodo, (caminho, _) in zip(periodos, gravados)}
+
+def gerar_relatorios_lote(arquivo_entrada_path, arquivo_saida_folder, periodos, capacidade_total=300, regras_de_force=None, min_dias_up=1, aplicar_min_dias_up=True, ensaios_executados=None, ensaios_solicitados=None, relatorios_no_prazo=None, relatorios_emitidos=None, formulas_excel=True, max_workers=1, pasta_cache=None, cache_max_bytes=200 * 1024 * 1024, cache_max_entradas=500, pasta_historico=None, progresso=None):
+    resultados = calcular_oee_lote(
+        arquivo_entrada_path, periodos, capacidade_total=capacidade_total, regras_de_force=regras_de_force,
+        min_dias_up=min_dias_up, aplicar_min_dias_up=aplicar_min_dias_up,
+        ensaios_executados=ensaios_executados, ensaios_solicitados=ensaios_solicitados,
+        relatorios_no_prazo=relatorios_no_prazo, relatorios_emitidos=relatorios_emitidos,
+        pasta_cache=pasta_cache, cache_max_bytes=cache_max_bytes, cache_max_entradas=cache_max_entradas, progresso=progresso
+    )
+    if not resultados:
+        return resultados
+    for resultado in resultados.values():
+        resultado['formulas_excel'] = formulas_excel
+    exportar_excel_lote(resultados, arquivo_saida_folder, formulas_excel=formulas_excel, max_workers=max_workers, progresso=progresso)
+    _informar(progresso, 'Gravando histórico', 1, 1)
+    salvar_historico_lote([(ano, mes, r['sumario']) for (ano, mes), r in resultados.items()], pasta_historico or arquivo_saida_folder)
+    return resultados
@@ -0,0 +1,125 @@
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+NOME_RELATORIO = 'qualidade_dados.csv'
+
+FIM_ABERTO = np.iinfo(np.int64).max
+
+INICIO_NULO = np.iinfo(np.int64).min
+
+
+def caminho_relatorio_qualidade(caminho_csv):
+    return os.path.join(os.path.dirname(caminho_csv) or '.', NOME_RELATORIO)
+
+
+def analisar_intervalos(codigos, datastart, datastop, mesclar=True):
+    # Varredura por circuito em O(n log n): ordena por (circuito, aberta, início, fim, linha) e guarda o
+    # maior fim já visto no circuito. Uma linha igual à seguinte (circuito, início e fim) é
+    # duplicata e sai; fica a última na ordem do arquivo. Uma linha que começa antes do maior fim
+    # anterior sobrepõe e entra no mesmo grupo. Linha com datastop vazio (em aberto) só é apontada no
+    # relatório: fica no fim do circuito, num grupo só dela, para não engolir as atividades seguintes.
+    # Com mesclar, cada grupo vira um intervalo só: menor início, maior fim, circuito e atributos da
+    # última linha do grupo no arquivo.
+    codigos = np.asarray(codigos)
+    inicios = np.asarray(datastart, dtype='datetime64[ns]').view(np.int64)
+    abertos = np.isnat(np.asarray(datastop, dtype='datetime64[ns]'))
+    fins = np.asarray(datastop, dtype='datetime64[ns]').view(np.int64).copy()
+    fins[abertos] = FIM_ABERTO
+    n = len(codigos)
+
+    ordem = np.lexsort((np.arange(n), fins, inicios, abertos, codigos))
+    c, s, f = codigos[ordem], inicios[ordem], fins[ordem]
+    duplicata = np.zeros(n, dtype=bool)
+    if n > 1:
+        duplicata[:-1] = (c[1:] == c[:-1]) & (s[1:] == s[:-1]) & (f[1:] == f[:-1])
+
+    mantidas = np.flatnonzero(~duplicata)
+    cm, sm, fm = c[mantidas], s[mantidas], f[mantidas]
+    maximo_fins = pd.Series(fm).groupby(cm).cummax().to_numpy()
+    fim_anterior = np.full(len(mantidas), INICIO_NULO, dtype=np.int64)
+    mesmo_circuito = np.zeros(len(mantidas), dtype=bool)
+    if len(mantidas) > 1:
+        mesmo_circuito[1:] = cm[1:] == cm[:-1]
+        fim_anterior[1:] = np.where(mesmo_circuito[1:], maximo_fins[:-1], INICIO_NULO)
+    novo_grupo = ~(mesmo_circuito & (sm < fim_anterior)) | (fm == FIM_ABERTO)
+    grupo_mantidas = np.cumsum(novo_grupo) - 1
+    inicios_grupo = np.flatnonzero(novo_grupo)
+    tamanho_grupo = np.diff(np.append(inicios_grupo, len(mantidas)))
+
+    # Duplicatas ficam no grupo da cópia mantida, que é a próxima mantida na ordem
+    proxima_mantida = np.where(~duplicata, np.arange(n), n)
+    proxima_mantida = np.minimum.accumulate(proxima_mantida[::-1])[::-1]
+    posicao_mantida = np.searchsorted(mantidas, proxima_mantida)
+    grupo = np.empty(n, dtype=np.int64)
+    grupo[ordem] = grupo_mantidas[posicao_mantida]
+    sobreposta = np.zeros(n, dtype=bool)
+    sobreposta[ordem[mantidas]] = tamanho_grupo[grupo_mantidas] > 1
+    removida = np.zeros(n, dtype=bool)
+    removida[ordem] = duplicata
+
+    if mesclar and len(mantidas):
+        linhas = np.maximum.reduceat(ordem[mantidas], inicios_grupo)
+        novos_inicios = sm[inicios_grupo]
+        novos_fins = np.maximum.reduceat(fm, inicios_grupo)
+        ordem_arquivo = np.argsort(linhas, kind='stable')
+        linhas, novos_inicios, novos_fins = linhas[ordem_arquivo], novos_inicios[ordem_arquivo], novos_fins[ordem_arquivo]
+    else:
+        linhas = np.sort(ordem[mantidas])
+        novos_inicios, novos_fins = inicios[linhas], fins[linhas]
+    novos_datastop = novos_fins.copy()
+    novos_datastop[novos_fins == FIM_ABERTO] = np.datetime64('NaT', 'ns').view(np.int64)
+
+    return {
+        'linhas': linhas,
+        'datastart': novos_inicios.view('datetime64[ns]'),
+        'datastop': novos_datastop.view('datetime64[ns]'),
+        'duplicata': removida,
+        'sobreposta': sobreposta,
+        'sem_datastop': abertos,
+        'grupo': grupo,
+        'mesclado': mesclar,
+    }
+
+
+def resumo_qualidade(analise):
+    return {
+        'duplicatas': int(analise['duplicata'].sum()),
+        'sobrepostas': int(analise['sobreposta'].sum()),
+        'grupos_sobrepostos': len(np.unique(analise['grupo'][analise['sobreposta']])),
+        'sem_datastop': int((analise['sem_datastop'] & ~analise['duplicata']).sum()),
+        'registros_finais': len(analise['linhas']),
+    }
+
+
+def gravar_relatorio_qualidade(caminho_relatorio, circuitos, datastart, datastop, atributos, analise):
+    # Uma linha por (registro, problema). grupo liga a duplicata à cópia mantida e as linhas de uma
+    # mesma sobreposição; o relatório é regravado a cada processamento, vazio quando não há problemas.
+    problemas = [
+        ('duplicata', analise['duplicata'], 'removida'),
+        ('sobreposicao', analise['sobreposta'], 'mesclada' if analise['mesclado'] else 'mantida'),
+        ('sem_datastop', analise['sem_datastop'] & ~analise['duplicata'], 'mantida'),
+    ]
+    partes = []
+    for problema, mascara, acao in problemas:
+        linhas = np.flatnonzero(mascara)
+        partes.append(pd.DataFrame({
+            'circuito': np.asarray(circuitos, dtype=object)[linhas],
+            'datastart': np.asarray(datastart)[linhas],
+            'datastop': np.asarray(datastop)[linhas],
+            **{coluna: np.asarray(valores, dtype=object)[linhas] for coluna, valores in atributos.items()},
+            'problema': problema,
+            'grupo': analise['grupo'][linhas],
+            'acao': acao,
+        }))
+    df_relatorio = pd.concat(partes, ignore_index=True)
+    numeros = df_relatorio['circuito'].map(lambda nome: int(re.search(r'\d+', nome).group()))
+    df_relatorio = df_relatorio.iloc[np.lexsort((df_relatorio['datastart'].to_numpy(), df_relatorio['grupo'].to_numpy(), numeros.to_numpy()))]
+
+    temporario = f"{caminho_relatorio}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df_relatorio.to_csv(temporario, index=False, sep=';', date_format='%d/%m/%Y %H:%M:%S', na_rep='')
+    os.replace(temporario, caminho_relatorio)
+    return caminho_relatorio
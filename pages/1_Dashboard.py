@@ -26,6 +26,18 @@ else:
     fig_gauge.update_layout(height=400, margin=dict(l=20, r=20, t=50, b=20))
     st.plotly_chart(fig_gauge, use_container_width=True)
 
+    utilizacao = st.session_state.resultados_gerados.get('utilizacao')
+    if utilizacao:
+        st.header("Utilização por Norma, Modelo e Circuito")
+        st.caption("Dias-circuito ocupados pelos ensaios de cada grupo no mês, antes das regras de força. "
+                   "Utilização = dias / (circuitos do grupo × dias do mês).")
+        titulos = {'norma': "Norma", 'modelo': "Modelo", 'circuito': "Circuito"}
+        abas = st.tabs([titulos.get(nome, nome) for nome in utilizacao])
+        for aba, (nome, df_grupo) in zip(abas, utilizacao.items()):
+            with aba:
+                st.bar_chart(df_grupo.head(20), y='dias', horizontal=True)
+                st.dataframe(df_grupo.style.format({'utilizacao': "{:.2f}%"}), use_container_width=True)
+
 st.divider()
 if st.button("⬅️ Voltar ao Menu Principal"):
     st.switch_page("app.py")
\ No newline at end of file
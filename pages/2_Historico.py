@@ -1,20 +1,19 @@
 import streamlit as st
-import pandas as pd
 import os
 import config
 import plotly.express as px
+from modulos.cache_arquivos import carregar_historico
+from modulos.historico import NOME_CSV, apagar_meses, caminho_banco, historico_csv
 
 st.set_page_config(page_title="Análise Histórica", page_icon="📈", layout="wide")
 st.title("📈 Análise Histórica")
 
-caminho_csv = os.path.join(config.OUTPUT_FOLDER, 'historico_oee.csv')
+caminho_csv = os.path.join(config.OUTPUT_FOLDER, NOME_CSV)
 
-if os.path.exists(caminho_csv):
+if os.path.exists(caminho_banco(config.OUTPUT_FOLDER)) or os.path.exists(caminho_csv):
     try:
-        df_historico = pd.read_csv(caminho_csv)
-        df_historico['periodo'] = pd.to_datetime(df_historico['ano'].astype(str) + '-' + df_historico['mes'].astype(str) + '-01')
-        df_historico = df_historico.sort_values('periodo')
-        
+        df_historico = carregar_historico(config.OUTPUT_FOLDER)
+
         opcoes_grafico = {
             'OEE Final': 'oee_final',
             'Disponibilidade': 'disponibilidade',
@@ -43,6 +42,8 @@ if os.path.exists(caminho_csv):
         else:
             st.warning("Por favor, selecione pelo menos um indicador para visualizar o gráfico.")
 
+        st.download_button("⬇️ Baixar Histórico (.csv)", historico_csv(config.OUTPUT_FOLDER), NOME_CSV, 'text/csv')
+
         st.divider()
         with st.expander("Gerenciar Histórico de Dados"):
             st.subheader("Apagar meses específicos do histórico")
@@ -55,17 +56,17 @@ if os.path.exists(caminho_csv):
 
             if st.button("Apagar Meses Selecionados", type="primary"):
                 if meses_para_apagar:
-                    df_filtrado = df_historico[~df_historico['mes_ano_str'].isin(meses_para_apagar)]
-                    df_filtrado.drop(columns=['periodo', 'mes_ano_str']).to_csv(caminho_csv, index=False)
+                    df_apagar = df_historico[df_historico['mes_ano_str'].isin(meses_para_apagar)]
+                    apagar_meses(config.OUTPUT_FOLDER, zip(df_apagar['ano'], df_apagar['mes']))
                     st.success(f"Meses {', '.join(meses_para_apagar)} foram removidos! A página será recarregada.")
                     st.rerun()
                 else:
                     st.warning("Nenhum mês foi selecionado para remoção.")
 
     except Exception as e:
-        st.error(f"Não foi possível ler o arquivo de histórico CSV: {e}")
+        st.error(f"Não foi possível ler o histórico: {e}")
 else:
-    st.info("O arquivo de histórico (historico_oee.csv) será criado na pasta 'relatorios' assim que você gerar o primeiro relatório.")
+    st.info("O histórico será criado na pasta 'relatorios' assim que você gerar o primeiro relatório.")
 
 st.divider()
 if st.button("⬅️ Voltar ao Menu Principal"):
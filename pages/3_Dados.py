@@ -1,6 +1,11 @@
 import streamlit as st
 import os
 import config
+from modulos.processamento import exportar_excel_oee
+from modulos.calendario import calendario_para_dataframe
+from modulos.cache_arquivos import ler_bytes
+from modulos.espacos_trabalho import espaco_da_sessao
+from modulos.qualidade import caminho_relatorio_qualidade
 
 st.set_page_config(page_title="Dados Detalhados", page_icon="📄", layout="wide")
 st.title("📄 Dados Detalhados e Downloads")
@@ -12,31 +17,57 @@ def colorir_status(val):
     elif val == 'SD': color = '#FFEB9C'
     return f'background-color: {color}'
 
+espaco = espaco_da_sessao(st.session_state, config.SESSOES_FOLDER)
+csv_processado = espaco['csv_processado']
+
 if 'resultados_gerados' not in st.session_state or st.session_state.resultados_gerados is None:
     st.warning("Por favor, gere um relatório na Página Principal primeiro para visualizar os dados.")
 else:
     st.header("Tabela de Atividades do Mês")
     
-    df_preview = st.session_state.resultados_gerados.get('df_preview')
+    calendario = st.session_state.resultados_gerados.get('calendario')
+    df_preview = calendario_para_dataframe(calendario) if calendario is not None else None
     if df_preview is not None:
         styled_df = df_preview.style.map(colorir_status)
         st.dataframe(styled_df, use_container_width=True)
+
+    horas_status = st.session_state.resultados_gerados.get('horas_status')
+    if horas_status is not None:
+        st.header("Horas por Status (tempo exato)")
+        sumario = st.session_state.resultados_gerados['sumario']
+        col_dia, col_hora = st.columns(2)
+        col_dia.metric("Disponibilidade (dias inteiros)", f"{sumario.get('Disponibilidade', 0):.2f}%")
+        col_hora.metric("Disponibilidade (horas exatas)", f"{sumario.get('Disponibilidade_horas', 0):.2f}%")
+        circuitos_preview = df_preview.index if df_preview is not None else horas_status.index
+        st.dataframe(horas_status.reindex(circuitos_preview).dropna(how='all').style.format("{:.1f} h"), use_container_width=True)
     
     st.divider()
     st.subheader("Downloads")
     col_down1, col_down2 = st.columns(2)
     
     with col_down1:
-        try:
-            with open(config.PROCESSED_CSV_PATH, 'r', encoding='utf-8') as f: csv_data = f.read()
+        csv_data = ler_bytes(csv_processado)
+        if csv_data is not None:
             st.download_button("⬇️ Baixar Dados Processados (.csv)", csv_data, config.PROCESSED_CSV_FILENAME, 'text/csv', use_container_width=True)
-        except FileNotFoundError:
-            st.warning("Arquivo CSV processado não encontrado.")
+        else:
+            st.error("Os dados processados desta sessão não foram encontrados. Envie e processe os arquivos novamente na Página Principal.")
+        relatorio_qualidade = ler_bytes(caminho_relatorio_qualidade(csv_processado))
+        if relatorio_qualidade is not None and relatorio_qualidade.count(b'\n') > 1:
+            st.download_button("⬇️ Baixar Relatório de Qualidade dos Dados (.csv)", relatorio_qualidade, 'qualidade_dados.csv', 'text/csv', use_container_width=True)
     
     with col_down2:
-        caminho_excel = st.session_state.resultados_gerados['caminho_excel']
-        with open(caminho_excel, "rb") as file:
-            st.download_button("⬇️ Baixar Relatório Excel Completo", file, os.path.basename(caminho_excel), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
+        resultados = st.session_state.resultados_gerados
+        caminho_excel = resultados.get('caminho_excel')
+        # A planilha só é montada quando alguém pede o download
+        if not caminho_excel or not os.path.exists(caminho_excel):
+            if st.button("📊 Preparar Relatório Excel", use_container_width=True):
+                with st.spinner('Montando a planilha... 📊'):
+                    caminho_excel = exportar_excel_oee(resultados, espaco['saida'], formulas_excel=resultados.get('formulas_excel', True))
+                if caminho_excel is None:
+                    st.error("Falha ao gerar o arquivo Excel.")
+        if caminho_excel and os.path.exists(caminho_excel):
+            with open(caminho_excel, "rb") as file:
+                st.download_button("⬇️ Baixar Relatório Excel Completo", file, os.path.basename(caminho_excel), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
 
 st.divider()
 if st.button("⬅️ Voltar ao Menu Principal"):
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from modulos import cache_arquivos
+
+
+@pytest.fixture(autouse=True)
+def cache_vazio(monkeypatch):
+    monkeypatch.setattr(cache_arquivos, '_entradas', cache_arquivos.OrderedDict())
+
+
+def _arquivos(pasta, quantidade, tamanho=10):
+    caminhos = []
+    for i in range(quantidade):
+        caminho = pasta / f'{i}.csv'
+        caminho.write_bytes(b'x' * tamanho)
+        caminhos.append(str(caminho))
+    return caminhos
+
+
+def test_cache_limitado_por_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_arquivos, 'MAX_BYTES', 250)
+    caminhos = _arquivos(tmp_path, 4, tamanho=100)
+    for caminho in caminhos[:3]:
+        cache_arquivos.ler_bytes(caminho)
+    cache_arquivos.ler_bytes(caminhos[0])
+    cache_arquivos.ler_bytes(caminhos[3])
+    assert [chave[0] for chave in cache_arquivos._entradas] == [caminhos[0], caminhos[3]]
+
+
+def test_cache_limitado_por_entradas(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_arquivos, 'MAX_ENTRADAS', 2)
+    caminhos = _arquivos(tmp_path, 3)
+    for caminho in caminhos:
+        cache_arquivos.ler_bytes(caminho)
+    assert [chave[0] for chave in cache_arquivos._entradas] == caminhos[1:]
+
+
+def test_arquivo_alterado_e_relido(tmp_path):
+    caminho = _arquivos(tmp_path, 1)[0]
+    assert cache_arquivos.ler_bytes(caminho) == b'x' * 10
+    with open(caminho, 'wb') as f:
+        f.write(b'novo')
+    os.utime(caminho, ns=(10**18, 10**18))
+    assert cache_arquivos.ler_bytes(caminho) == b'novo'
+    os.remove(caminho)
+    assert cache_arquivos.ler_bytes(caminho) is None
+
+
+def test_invalidar_pasta_so_tira_o_que_esta_dentro(tmp_path):
+    (tmp_path / 'sessao').mkdir()
+    (tmp_path / 'sessao2').mkdir()
+    dentro = _arquivos(tmp_path / 'sessao', 2)
+    fora = _arquivos(tmp_path / 'sessao2', 1)
+    for caminho in dentro + fora:
+        cache_arquivos.ler_bytes(caminho)
+    cache_arquivos.invalidar_pasta(str(tmp_path / 'sessao'))
+    assert [chave[0] for chave in cache_arquivos._entradas] == fora
+    cache_arquivos.invalidar()
+    assert not cache_arquivos._entradas
@@ -0,0 +1,89 @@
+import gzip
+import os
+
+from modulos.armazenamento import impressao_digital_dados
+from modulos.cache_resultados import EXTENSAO, chave_resultado, gravar_resultado, ler_resultado, limpar_cache
+from modulos.manifesto import assinatura_arquivo
+from modulos.processamento import calcular_oee
+
+
+def _chave(**mudancas):
+    parametros = dict(
+        impressao_dados='abc', ano=2025, mes=7, regras_de_force={'circuitos_up': ['Circuit2', 'Circuit1']},
+        min_dias_up=1, aplicar_min_dias_up=False, capacidade_total=375, ensaios_executados=1,
+        ensaios_solicitados=2, relatorios_no_prazo=3, relatorios_emitidos=4
+    )
+    parametros.update(mudancas)
+    return chave_resultado(**parametros)
+
+
+def test_chave_depende_dos_parametros():
+    assert _chave() == _chave()
+    assert _chave() == _chave(regras_de_force={'circuitos_up': ['Circuit1', 'Circuit2']})
+    assert _chave() != _chave(mes=8)
+    assert _chave() != _chave(impressao_dados='outra')
+    assert _chave() != _chave(capacidade_total=300)
+
+
+def test_grava_e_le_sem_campos_da_execucao(tmp_path):
+    pasta = str(tmp_path)
+    gravar_resultado(pasta, 'k', {'sumario': {'OEE': 1.0}, 'caminho_excel': 'x.xlsx', 'desempenho': {}}, 10**9, 10)
+    assert ler_resultado(pasta, 'k') == {'sumario': {'OEE': 1.0}}
+    assert ler_resultado(pasta, 'ausente') is None
+
+
+def test_entrada_corrompida_conta_como_ausente(tmp_path):
+    pasta = str(tmp_path)
+    gravar_resultado(pasta, 'k', {'dados': list(range(100000))}, 10**9, 10)
+    caminho = os.path.join(pasta, 'k' + EXTENSAO)
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    with open(caminho, 'wb') as f:
+        f.write(conteudo[:len(conteudo) // 2])
+    assert ler_resultado(pasta, 'k') is None
+    assert not os.path.exists(caminho)
+
+    with gzip.open(caminho, 'wb') as f:
+        f.write(b'nao e pickle')
+    assert ler_resultado(pasta, 'k') is None
+    assert not os.path.exists(caminho)
+
+
+def test_limpeza_tira_os_menos_usados(tmp_path):
+    pasta = str(tmp_path)
+    for i, chave in enumerate(['a', 'b', 'c']):
+        gravar_resultado(pasta, chave, {'i': i}, 10**9, 10)
+        os.utime(os.path.join(pasta, chave + EXTENSAO), ns=(i * 10**9, i * 10**9))
+    # ler "toca" a entrada: 'a' passa a ser a mais recente
+    ler_resultado(pasta, 'a')
+    limpar_cache(pasta, 10**9, 2)
+    assert sorted(os.listdir(pasta)) == ['a' + EXTENSAO, 'c' + EXTENSAO]
+
+
+def test_mesmo_conteudo_em_sessoes_diferentes_divide_o_cache(tmp_path):
+    conteudo = ("circuito;datastart;datastop\n"
+                "Circuit001;01/07/2025 08:00:00;10/07/2025 08:00:00\n"
+                "Circuit002;05/07/2025 08:00:00;\n")
+    caminhos = []
+    for sessao in ('a', 'b'):
+        (tmp_path / sessao).mkdir()
+        caminho = tmp_path / sessao / 'dados_processados.csv'
+        caminho.write_text(conteudo)
+        caminhos.append(str(caminho))
+    pasta_cache = str(tmp_path / 'cache')
+
+    primeiro = calcular_oee(caminhos[0], 2025, 7, capacidade_total=10, pasta_cache=pasta_cache)
+    assert 'cache_acertos' not in primeiro['desempenho']['contadores']
+    os.utime(caminhos[1], ns=(10**18, 10**18))
+    assert impressao_digital_dados(caminhos[1]) == impressao_digital_dados(caminhos[0])
+    segundo = calcular_oee(caminhos[1], 2025, 7, capacidade_total=10, pasta_cache=pasta_cache)
+    assert segundo['desempenho']['contadores']['cache_acertos'] == 1
+    assert segundo['sumario'] == primeiro['sumario']
+
+    # Conteúdo diferente, chave diferente, com ou sem o índice das partições
+    with open(caminhos[1], 'a') as f:
+        f.write("Circuit003;06/07/2025 08:00:00;07/07/2025 08:00:00\n")
+    assert impressao_digital_dados(caminhos[1]) != impressao_digital_dados(caminhos[0])
+    terceiro = calcular_oee(caminhos[1], 2025, 7, capacidade_total=10, pasta_cache=pasta_cache)
+    assert 'cache_acertos' not in terceiro['desempenho']['contadores']
+    assert impressao_digital_dados(caminhos[1]) == assinatura_arquivo(caminhos[1])['hash']
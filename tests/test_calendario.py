@@ -0,0 +1,129 @@
+import math
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modulos.calendario import ROTULOS_STATUS, calendario_para_dataframe, construir_calendario_vencedores
+from modulos.processamento import calcular_oee
+
+
+def _ordenar(index):
+    numeros = index.str.extract(r'(\d+)').iloc[:, 0].fillna('9999').astype(int)
+    numeros[index == 'iDevice'] = -1
+    return numeros
+
+
+def _calendario_por_dia(circuitos, dias_do_mes_range, df_atividades):
+    # O laço por dia e por atividade da versão original, célula a célula
+    calendario = {(c, dia): ('PP' if dia.weekday() >= 5 else 'SD') for c in circuitos for dia in dias_do_mes_range}
+    for _, atividade in df_atividades[df_atividades['circuito'].isin(circuitos)].iterrows():
+        inicio = max(atividade['datastart'].normalize(), dias_do_mes_range[0])
+        fim = min(atividade['datastop'].normalize(), dias_do_mes_range[-1])
+        for dia in pd.date_range(start=inicio, end=fim, freq='D'):
+            calendario[(atividade['circuito'], dia)] = atividade['status']
+    return calendario
+
+
+def _relatorio_por_dia(df_atividades, ano, mes, regras_de_force, min_dias_up, aplicar_min_dias_up):
+    # Regras e totais como na versão original, sobre o DataFrame de strings
+    inicio_mes = datetime(ano, mes, 1)
+    dias = pd.date_range(start=inicio_mes, end=inicio_mes + pd.offsets.MonthEnd(0), freq='D')
+    df_atividades = df_atividades.copy()
+    df_atividades['datastop'] = df_atividades['datastop'].fillna(dias[-1] + pd.Timedelta(hours=23, minutes=59, seconds=59))
+    circuitos_up = regras_de_force.get('circuitos_up', [])
+    circuitos_pq = regras_de_force.get('circuitos_pq', [])
+    circuitos_vazio = regras_de_force.get('circuitos_vazio', [])
+    circuitos = sorted((set(df_atividades['circuito']) | set(circuitos_up) | set(circuitos_pq)) - set(circuitos_vazio))
+
+    calendario = _calendario_por_dia(circuitos, dias, df_atividades)
+    for circuito in circuitos_up:
+        for dia in dias:
+            if (circuito, dia) in calendario:
+                if regras_de_force.get('tipo_up') == "Forçar 100% UP":
+                    calendario[(circuito, dia)] = 'UP'
+                elif regras_de_force.get('tipo_up') == "Forçar Semana Padrão (Seg-Sex UP)":
+                    calendario[(circuito, dia)] = 'UP' if dia.weekday() < 5 else 'PP'
+    for circuito in circuitos_pq:
+        for dia in dias:
+            if (circuito, dia) in calendario:
+                calendario[(circuito, dia)] = 'PQ'
+
+    relatorio = pd.DataFrame([[calendario[(c, dia)] for dia in dias] for c in circuitos], index=circuitos, columns=dias.day, dtype=object)
+    apenas_sd_pp = [c for c, linha in relatorio.iterrows() if set(linha) <= {'PP', 'SD'}]
+    para_calculo = relatorio.drop(index=apenas_sd_pp)
+    if aplicar_min_dias_up:
+        para_calculo = para_calculo[[c in circuitos_up or c in circuitos_pq or (linha == 'UP').sum() >= min_dias_up
+                                     for c, linha in para_calculo.iterrows()]]
+    para_calculo.loc['iDevice'] = ['UP' if dia.weekday() < 5 else 'PP' for dia in dias]
+    vazios = pd.DataFrame('', index=apenas_sd_pp + list(circuitos_vazio), columns=relatorio.columns, dtype=object)
+    relatorio = pd.concat([para_calculo, vazios]).sort_index(key=_ordenar)
+
+    totais = {status: int((para_calculo == status).sum().sum()) for status in ['UP', 'PQ', 'PP', 'SD']}
+    medias = {status: total / len(para_calculo) for status, total in totais.items()}
+    tempo_disponivel = len(dias) - medias['PP'] - medias['SD']
+    disponibilidade = (medias['UP'] - medias['PQ'] - medias['SD']) / tempo_disponivel if tempo_disponivel > 0 else 0
+    return relatorio, totais, {status: math.ceil(media) for status, media in medias.items()}, round(disponibilidade * 100, 2)
+
+
+def _atividades_aleatorias(semente, n_circuitos=12, n_atividades=150):
+    gerador = np.random.default_rng(semente)
+    inicios = pd.Timestamp('2025-05-20') + pd.to_timedelta(gerador.integers(0, 90 * 24 * 60, n_atividades), unit='min')
+    duracoes = pd.to_timedelta(gerador.integers(0, 12 * 24 * 60, n_atividades), unit='min')
+    df = pd.DataFrame({
+        'circuito': [f'Circuit{n:03d}' for n in gerador.integers(1, n_circuitos + 1, n_atividades)],
+        'datastart': inicios,
+        'datastop': inicios + duracoes,
+        'status': gerador.choice(['UP', 'UP', 'UP', 'PQ'], n_atividades),
+    })
+    # Algumas atividades ainda em andamento
+    df.loc[gerador.random(n_atividades) < 0.05, 'datastop'] = pd.NaT
+    return df
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_matriz_igual_ao_laco_por_dia(semente):
+    df_atividades = _atividades_aleatorias(semente)
+    dias = pd.date_range('2025-07-01', '2025-07-31', freq='D')
+    df_atividades['datastop'] = df_atividades['datastop'].fillna(pd.Timestamp('2025-07-31 23:59:59'))
+    circuitos = sorted(set(df_atividades['circuito'])) + ['Circuit999']
+
+    matriz, rotulos, vencedor = construir_calendario_vencedores(circuitos, dias, df_atividades)
+    esperado = _calendario_por_dia(circuitos, dias, df_atividades)
+    valores = np.asarray(rotulos, dtype=object)[matriz]
+    assert {(c, dia): valores[i, j] for i, c in enumerate(circuitos) for j, dia in enumerate(dias)} == esperado
+
+    # A atividade vencedora de cada célula tem o status da célula e cobre o dia
+    for celula in np.flatnonzero(vencedor >= 0):
+        i, j = divmod(celula, len(dias))
+        atividade = df_atividades.iloc[vencedor[celula]]
+        assert atividade['circuito'] == circuitos[i] and atividade['status'] == valores[i, j]
+        assert atividade['datastart'].normalize() <= dias[j] <= atividade['datastop'].normalize()
+    assert ROTULOS_STATUS == rotulos[:len(ROTULOS_STATUS)]
+
+
+@pytest.mark.parametrize('regras_de_force, min_dias_up, aplicar_min_dias_up', [
+    ({}, 1, True),
+    ({}, 5, True),
+    ({}, 5, False),
+    ({'circuitos_up': ['Circuit003', 'Circuit050'], 'tipo_up': "Forçar 100% UP", 'circuitos_vazio': ['Circuit004']}, 3, True),
+    ({'circuitos_up': ['Circuit007'], 'tipo_up': "Forçar Semana Padrão (Seg-Sex UP)", 'circuitos_pq': ['Circuit001']}, 10, True),
+])
+def test_calcular_oee_igual_ao_laco_por_dia(tmp_path, regras_de_force, min_dias_up, aplicar_min_dias_up):
+    df_atividades = _atividades_aleatorias(7)
+    caminho_csv = str(tmp_path / 'dados_processados.csv')
+    df_atividades.to_csv(caminho_csv, sep=';', index=False, date_format='%d/%m/%Y %H:%M:%S', na_rep='')
+
+    resultado = calcular_oee(caminho_csv, 2025, 7, regras_de_force=regras_de_force, min_dias_up=min_dias_up,
+                             aplicar_min_dias_up=aplicar_min_dias_up, ensaios_executados=9, ensaios_solicitados=10,
+                             relatorios_no_prazo=1, relatorios_emitidos=1)
+    relatorio, totais, medias, disponibilidade = _relatorio_por_dia(df_atividades, 2025, 7, regras_de_force, min_dias_up, aplicar_min_dias_up)
+
+    atual = calendario_para_dataframe(resultado['calendario'])
+    assert list(atual.index) == list(relatorio.index)
+    np.testing.assert_array_equal(atual.to_numpy(), relatorio.to_numpy())
+    assert {status: int(total) for status, total in resultado['sumario']['totais'].items()} == totais
+    assert resultado['sumario']['medias'] == medias
+    assert resultado['sumario']['Disponibilidade'] == disponibilidade
+    assert resultado['sumario']['OEE'] == pytest.approx(disponibilidade * 0.9, abs=0.01)
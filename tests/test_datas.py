@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modulos import ingestao
+from modulos.ingestao import converter_datas, interpretar_data_flexivel
+
+
+def _referencia(valores, dayfirst):
+    # A conversão original, uma string por vez
+    return pd.Series([interpretar_data_flexivel(v, dayfirst=dayfirst) for v in valores], dtype='datetime64[ns]')
+
+
+VALORES = [
+    '01/07/2025 10:44:00', '02/07/2025 08:00:00', ' 03/07/2025 23:59:59 ', '01/07/2025 10:44:00',
+    '13/07/2025 07:00:00', '7/1/2025', '2025-07-01 10:00', '01-07-2025 10:00', '1/7/25 10:00',
+    '01/07/2025 10:00 PM', '32/13/2025 10:00:00', 'texto', '', None, np.nan, 5,
+]
+
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+@pytest.mark.parametrize('dayfirst', [True, False])
+def test_igual_a_conversao_por_string(dayfirst):
+    convertidos = converter_datas(VALORES, dayfirst=dayfirst)
+    esperado = _referencia(VALORES, dayfirst)
+    np.testing.assert_array_equal(convertidos.to_numpy(), esperado.to_numpy())
+
+
+def test_formato_dominante_vai_pelo_caminho_vetorizado(monkeypatch):
+    lentos = []
+    original = ingestao._interpretar_data_em_cache
+    monkeypatch.setattr(ingestao, '_interpretar_data_em_cache', lambda texto, dayfirst: lentos.append(texto) or original(texto, dayfirst))
+
+    valores = [f'{dia:02d}/07/2025 {hora:02d}:30:00' for dia in range(1, 29) for hora in range(0, 24, 6)] + ['7/1/2025', '2025-07-01 10:00']
+    convertidos = converter_datas(valores, dayfirst=True)
+    assert sorted(lentos) == ['2025-07-01 10:00', '7/1/2025']
+    assert convertidos.iloc[0] == pd.Timestamp('2025-07-01 00:30:00')
+    np.testing.assert_array_equal(convertidos.to_numpy(), _referencia(valores, True).to_numpy())
+
+
+def test_ano_com_dois_digitos_respeita_o_seculo_do_dateutil():
+    # strptime põe 00-68 em 20xx e 69-99 em 19xx; o dateutil usa uma janela de +-50 anos em torno do ano atual
+    ano_atual = datetime.now().year
+    valores = [f'01/07/{ano % 100:02d} 10:00' for ano in range(ano_atual - 60, ano_atual + 60)] + ['01/07/25 10:00'] * 50
+    convertidos = converter_datas(valores, dayfirst=True)
+    np.testing.assert_array_equal(convertidos.to_numpy(), _referencia(valores, True).to_numpy())
+
+
+def test_sem_textos_devolve_nat():
+    convertidos = converter_datas([None, np.nan, 3], dayfirst=True)
+    assert convertidos.isna().all() and convertidos.dtype == 'datetime64[ns]'
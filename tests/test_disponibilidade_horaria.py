@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modulos.disponibilidade_horaria import calcular_horas_status
+
+INICIO = pd.Timestamp('2025-07-01')
+FIM = pd.Timestamp('2025-08-01')
+
+
+def _horas_por_minuto(circuitos, df_atividades, regras_de_force):
+    # Um status por minuto: o padrão do dia e depois cada atividade, na ordem do arquivo, em [início, fim)
+    minutos = pd.date_range(INICIO, FIM, freq='min', inclusive='left')
+    padrao = np.where(np.asarray(minutos.weekday) < 5, 'SD', 'PP').astype(object)
+    grade = {c: padrao.copy() for c in circuitos}
+    for _, atividade in df_atividades.iterrows():
+        if atividade['circuito'] not in grade or pd.isna(atividade['datastart']):
+            continue
+        fim = FIM if pd.isna(atividade['datastop']) else atividade['datastop']
+        grade[atividade['circuito']][(minutos >= atividade['datastart']) & (minutos < fim)] = atividade['status']
+    for c in regras_de_force.get('circuitos_up', []):
+        if c in grade:
+            if regras_de_force.get('tipo_up') == "Forçar 100% UP":
+                grade[c][:] = 'UP'
+            elif regras_de_force.get('tipo_up') == "Forçar Semana Padrão (Seg-Sex UP)":
+                grade[c] = np.where(np.asarray(minutos.weekday) < 5, 'UP', 'PP').astype(object)
+    for c in regras_de_force.get('circuitos_pq', []):
+        if c in grade:
+            grade[c][:] = 'PQ'
+    return {c: pd.Series(valores).value_counts() / 60 for c, valores in grade.items()}
+
+
+def _atividades(semente, n=120):
+    gerador = np.random.default_rng(semente)
+    inicios = pd.Timestamp('2025-06-25') + pd.to_timedelta(gerador.integers(0, 45 * 24 * 60, n), unit='min')
+    df = pd.DataFrame({
+        'circuito': [f'Circuit{c:02d}' for c in gerador.integers(1, 9, n)],
+        'datastart': inicios,
+        'datastop': inicios + pd.to_timedelta(gerador.integers(-60, 6 * 24 * 60, n), unit='min'),
+        'status': gerador.choice(['UP', 'UP', 'PQ', 'MANUT'], n),
+    })
+    df.loc[gerador.random(n) < 0.05, 'datastop'] = pd.NaT
+    df.loc[gerador.random(n) < 0.03, 'datastart'] = pd.NaT
+    return df
+
+
+@pytest.mark.parametrize('semente, regras_de_force', [
+    (0, {}),
+    (1, {}),
+    (2, {'circuitos_up': ['Circuit01'], 'tipo_up': "Forçar 100% UP", 'circuitos_pq': ['Circuit02']}),
+    (3, {'circuitos_up': ['Circuit03', 'Circuit99'], 'tipo_up': "Forçar Semana Padrão (Seg-Sex UP)"}),
+])
+def test_horas_iguais_a_grade_de_minutos(semente, regras_de_force):
+    df_atividades = _atividades(semente)
+    circuitos = [f'Circuit{c:02d}' for c in range(1, 11)]
+    horas = calcular_horas_status(circuitos, INICIO, FIM, df_atividades, regras_de_force)
+    esperado = _horas_por_minuto(circuitos, df_atividades, regras_de_force)
+
+    assert list(horas.index) == circuitos
+    assert list(horas.columns[:4]) == ['UP', 'PQ', 'PP', 'SD']
+    np.testing.assert_allclose(horas.sum(axis=1), 31 * 24)
+    for circuito in circuitos:
+        obtido = horas.loc[circuito]
+        assert obtido[obtido > 0].to_dict() == pytest.approx(esperado[circuito].to_dict())
+
+
+def test_sem_atividades_segue_o_padrao_do_calendario():
+    vazio = pd.DataFrame({'circuito': pd.Series(dtype=object), 'datastart': pd.Series(dtype='datetime64[ns]'),
+                          'datastop': pd.Series(dtype='datetime64[ns]'), 'status': pd.Series(dtype=object)})
+    horas = calcular_horas_status(['Circuit01'], INICIO, FIM, vazio)
+    # Julho de 2025: 23 dias úteis e 8 dias de fim de semana
+    assert horas.loc['Circuit01'].to_dict() == {'UP': 0.0, 'PQ': 0.0, 'PP': 8 * 24.0, 'SD': 23 * 24.0}
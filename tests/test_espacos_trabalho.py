@@ -0,0 +1,62 @@
+import gc
+import os
+
+import pytest
+
+from modulos import cache_arquivos
+from modulos.espacos_trabalho import MARCADOR_USO, espaco_da_sessao, limpar_espacos, sessoes_vivas
+
+
+@pytest.fixture(autouse=True)
+def cache_vazio(monkeypatch):
+    monkeypatch.setattr(cache_arquivos, '_entradas', cache_arquivos.OrderedDict())
+
+
+def _espaco_com_csv(estado, base, tamanho=100, ultimo_uso=None):
+    espaco = espaco_da_sessao(estado, base)
+    with open(espaco['csv_processado'], 'wb') as f:
+        f.write(b'x' * tamanho)
+    if ultimo_uso is not None:
+        os.utime(os.path.join(espaco['raiz'], MARCADOR_USO), (ultimo_uso, ultimo_uso))
+    return espaco
+
+
+def test_mesma_sessao_mesmo_espaco(tmp_path):
+    estado = {}
+    primeiro = espaco_da_sessao(estado, str(tmp_path))
+    assert espaco_da_sessao(estado, str(tmp_path)) == primeiro
+    assert espaco_da_sessao({}, str(tmp_path))['id'] != primeiro['id']
+    assert os.path.isdir(primeiro['uploads']) and os.path.isdir(primeiro['saida'])
+    assert primeiro['id'] in sessoes_vivas()
+
+
+def test_limpeza_preserva_sessoes_abertas_e_esvazia_o_cache(tmp_path):
+    base = str(tmp_path)
+    aberta, fechada = {}, {}
+    espaco_aberto = _espaco_com_csv(aberta, base)
+    espaco_fechado = _espaco_com_csv(fechada, base)
+    for espaco in (espaco_aberto, espaco_fechado):
+        cache_arquivos.ler_bytes(espaco['csv_processado'])
+    del fechada
+    gc.collect()
+
+    assert espaco_fechado['id'] not in sessoes_vivas()
+    assert limpar_espacos(base, max_bytes=0, max_idade_segundos=-1) == [espaco_fechado['id']]
+    assert os.listdir(base) == [espaco_aberto['id']]
+    assert [chave[0] for chave in cache_arquivos._entradas] == [espaco_aberto['csv_processado']]
+
+
+def test_limpeza_por_idade_e_por_tamanho(tmp_path):
+    base = str(tmp_path)
+    estados = [{}, {}, {}, {}]
+    espacos = [_espaco_com_csv(estado, base, tamanho=1000, ultimo_uso=1000 + i) for i, estado in enumerate(estados)]
+    ids = [espaco['id'] for espaco in espacos]
+    # Nenhuma das sessões está mais aberta; só os ids em preservar ficam
+    del estados
+    gc.collect()
+
+    # Uso recente: nada é velho, mas o total passa de max_bytes e saem os menos usados
+    assert limpar_espacos(base, max_bytes=2500, max_idade_segundos=10**12, preservar=[ids[0]]) == [ids[1], ids[2]]
+    assert sorted(os.listdir(base)) == sorted([ids[0], ids[3]])
+    assert limpar_espacos(base, max_bytes=10**9, max_idade_segundos=0) == ids[::3]
+    assert limpar_espacos(str(tmp_path / 'nao_existe'), 0, 0) == []
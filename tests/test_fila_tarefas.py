@@ -0,0 +1,70 @@
+import os
+import threading
+
+import pytest
+
+from modulos.fila_tarefas import FilaTarefas, Progresso, TarefaCancelada
+from modulos.processamento import limpar_dados_brutos
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    caminho = tmp_path / 'dig01.txt'
+    caminho.write_text(''.join(f"Circuit{i % 7 + 1:03d}\t7/{i % 28 + 1:02d}/25 8:00\t7/{i % 28 + 1:02d}/25 9:00\n" for i in range(500)))
+    return str(caminho)
+
+
+def test_progresso_como_funcao_simples(arquivo, tmp_path):
+    chamadas = []
+    sucesso, _ = limpar_dados_brutos([arquivo], str(tmp_path / 'dados_processados.csv'), formato_data='mm/dd/aaaa',
+                                     tamanho_lote=50, progresso=lambda etapa, atual, total: chamadas.append(etapa))
+    assert sucesso
+    assert chamadas[0] == 'Lendo arquivos' and chamadas[-1] == 'Gravando dados processados'
+
+
+class _CancelaNaVerificacao(Progresso):
+    # Pede o cancelamento na n-ésima verificação
+    def __init__(self, n):
+        super().__init__()
+        self.verificacoes = 0
+        self.n = n
+
+    def verificar(self):
+        self.verificacoes += 1
+        if self.verificacoes == self.n:
+            self.cancelar()
+        super().verificar()
+
+
+def test_cancelamento_no_meio_da_leitura(arquivo, tmp_path):
+    # A 1ª verificação vem do progresso('Lendo arquivos', ...); a 2ª já é a do lote de registros
+    progresso = _CancelaNaVerificacao(2)
+    caminho_csv = str(tmp_path / 'dados_processados.csv')
+    with pytest.raises(TarefaCancelada, match='Lendo arquivos'):
+        limpar_dados_brutos([arquivo], caminho_csv, formato_data='mm/dd/aaaa', tamanho_lote=50, progresso=progresso)
+    assert progresso.verificacoes == 2
+    assert progresso.estado()['etapa'] == 'Lendo arquivos'
+    assert not os.path.exists(caminho_csv)
+
+
+def test_progresso_cancelado_para_na_proxima_chamada():
+    progresso = Progresso()
+    progresso('Lendo arquivos', 1, 4)
+    assert progresso.estado() == {'etapa': 'Lendo arquivos', 'atual': 1, 'total': 4, 'fracao': 0.25}
+    progresso.cancelar()
+    assert progresso.cancelada
+    with pytest.raises(TarefaCancelada):
+        progresso.verificar()
+    with pytest.raises(TarefaCancelada):
+        progresso('Gravando', 2, 4)
+
+
+def test_fila_recusa_acima_do_limite():
+    fila = FilaTarefas(max_workers=1, max_pendentes=2)
+    liberar = threading.Event()
+    futuros = [fila.enviar('sessao', liberar.wait, 5) for _ in range(3)]
+    assert futuros[2] is None
+    assert fila.pendentes() == 2 and fila.donos_ativos() == {'sessao'}
+    liberar.set()
+    assert all(f.result() for f in futuros[:2])
+    assert fila.enviar('outra', lambda: 1).result() == 1
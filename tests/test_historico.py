@@ -0,0 +1,63 @@
+import os
+
+import pandas as pd
+
+from modulos.cache_arquivos import carregar_historico
+from modulos.historico import COLUNAS_HISTORICO, NOME_CSV, apagar_meses, consultar_historico, exportar_csv, historico_csv, salvar_meses
+
+
+def _linha(ano, mes, oee):
+    return {'ano': ano, 'mes': mes, 'disponibilidade': 90.0, 'performance': 80.0, 'qualidade': 100.0, 'oee_final': oee}
+
+
+def test_upsert_por_ano_e_mes(tmp_path):
+    pasta = str(tmp_path)
+    salvar_meses(pasta, [_linha(2025, 6, 50.0), _linha(2025, 7, 60.0)])
+    salvar_meses(pasta, [_linha(2025, 7, 65.0)])
+    df = consultar_historico(pasta)
+    assert df[['ano', 'mes', 'oee_final']].values.tolist() == [[2025, 6, 50.0], [2025, 7, 65.0]]
+
+
+def test_instalacao_nova_so_tem_csv_sob_demanda(tmp_path):
+    pasta = str(tmp_path)
+    salvar_meses(pasta, [_linha(2025, 6, 50.0)])
+    apagar_meses(pasta, [(2024, 1)])
+    assert not os.path.exists(os.path.join(pasta, NOME_CSV))
+
+    caminho = exportar_csv(pasta)
+    assert pd.read_csv(caminho)['oee_final'].tolist() == [50.0]
+    assert historico_csv(pasta) == open(caminho, 'rb').read()
+
+
+def test_apagar_e_consultar_faixa(tmp_path):
+    pasta = str(tmp_path)
+    salvar_meses(pasta, [_linha(2024, 12, 40.0), _linha(2025, 1, 50.0), _linha(2025, 2, 60.0)])
+    apagar_meses(pasta, [(2025, 1)])
+    assert consultar_historico(pasta, inicio=(2024, 12), fim=(2025, 2))['mes'].tolist() == [12, 2]
+    assert consultar_historico(pasta, inicio=(2025, 1))['mes'].tolist() == [2]
+
+
+def test_leitura_nao_cria_o_banco(tmp_path):
+    pasta = str(tmp_path)
+    assert consultar_historico(pasta).empty
+    assert carregar_historico(pasta).empty
+    assert historico_csv(pasta).decode('utf-8').strip() == ','.join(COLUNAS_HISTORICO)
+    assert os.listdir(pasta) == []
+
+
+def test_csv_legado_continua_em_dia(tmp_path):
+    # Instalação anterior ao banco: o CSV é lido sem criar o banco e, depois, acompanha cada gravação
+    pasta = str(tmp_path)
+    caminho_csv = os.path.join(pasta, NOME_CSV)
+    pd.DataFrame([_linha(2023, 5, 30.0), _linha(2023, 6, 35.0), _linha(2023, 5, 31.0)]).to_csv(caminho_csv, index=False)
+    assert consultar_historico(pasta, inicio=(2023, 5), fim=(2023, 5))['oee_final'].tolist() == [31.0]
+    assert carregar_historico(pasta)['display'].tolist() == ['Maio/2023', 'Junho/2023']
+    assert os.listdir(pasta) == [NOME_CSV]
+
+    salvar_meses(pasta, [_linha(2025, 6, 50.0)])
+    assert consultar_historico(pasta)[['ano', 'mes']].values.tolist() == [[2023, 5], [2023, 6], [2025, 6]]
+    assert pd.read_csv(caminho_csv)['oee_final'].tolist() == [31.0, 35.0, 50.0]
+    apagar_meses(pasta, [(2023, 6)])
+    assert pd.read_csv(caminho_csv)['oee_final'].tolist() == [31.0, 50.0]
+    salvar_meses(pasta, [_linha(2025, 7, 60.0)], exportar=False)
+    assert pd.read_csv(caminho_csv)['oee_final'].tolist() == [31.0, 50.0]
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modulos.indice_intervalos import IndiceIntervalos
+
+
+def _atividades(semente, n=400):
+    gerador = np.random.default_rng(semente)
+    inicios = pd.Timestamp('2025-01-01') + pd.to_timedelta(gerador.integers(0, 365 * 24, n), unit='h')
+    fins = inicios + pd.to_timedelta(gerador.integers(0, 60 * 24, n), unit='h')
+    df = pd.DataFrame({
+        'circuito': [f'Circuit{c:03d}' for c in gerador.integers(1, 15, n)],
+        'datastart': inicios,
+        'datastop': fins,
+    })
+    df.loc[gerador.random(n) < 0.05, 'datastop'] = pd.NaT
+    df.loc[gerador.random(n) < 0.03, 'datastart'] = pd.NaT
+    return df
+
+
+def _forca_bruta(df, t0, t1, circuitos=None):
+    # datastop vazio é uma atividade em aberto; sem datastart a linha nunca aparece
+    paradas = df['datastop'].fillna(pd.Timestamp.max)
+    mascara = df['datastart'].notna() & (df['datastart'] <= t1) & (paradas >= t0)
+    if circuitos is not None:
+        mascara &= df['circuito'].isin(circuitos)
+    return np.flatnonzero(mascara.to_numpy())
+
+
+@pytest.mark.parametrize('semente', range(4))
+def test_consulta_igual_a_forca_bruta(semente):
+    df = _atividades(semente)
+    indice = IndiceIntervalos(df['circuito'], df['datastart'], df['datastop'])
+    assert len(indice) == df['datastart'].notna().sum()
+
+    gerador = np.random.default_rng(100 + semente)
+    for _ in range(50):
+        t0 = pd.Timestamp('2024-12-01') + pd.Timedelta(hours=int(gerador.integers(0, 420 * 24)))
+        t1 = t0 + pd.Timedelta(hours=int(gerador.integers(0, 45 * 24)))
+        np.testing.assert_array_equal(indice.consultar(t0, t1), _forca_bruta(df, t0, t1))
+        circuitos = [f'Circuit{c:03d}' for c in gerador.integers(1, 20, 3)]
+        np.testing.assert_array_equal(indice.consultar(t0, t1, circuitos), _forca_bruta(df, t0, t1, circuitos))
+
+
+def test_bordas_inclusivas_e_indice_vazio():
+    df = pd.DataFrame({
+        'circuito': ['Circuit001', 'Circuit001'],
+        'datastart': pd.to_datetime(['2025-07-01 08:00', '2025-07-10 08:00']),
+        'datastop': pd.to_datetime(['2025-07-05 08:00', None]),
+    })
+    indice = IndiceIntervalos(df['circuito'], df['datastart'], df['datastop'])
+    assert indice.consultar('2025-07-05 08:00', '2025-07-06').tolist() == [0]
+    assert indice.consultar('2025-06-01', '2025-07-01 08:00').tolist() == [0]
+    assert indice.consultar('2025-07-05 08:00:01', '2025-07-10 07:59').tolist() == []
+    assert indice.consultar('2030-01-01', '2030-01-02').tolist() == [1]
+    assert indice.consultar('2025-07-01', '2025-07-31', circuitos=['Circuit999']).tolist() == []
+
+    vazio = IndiceIntervalos([], np.array([], dtype='datetime64[ns]'), np.array([], dtype='datetime64[ns]'))
+    assert len(vazio) == 0 and vazio.consultar('2025-07-01', '2025-07-31').tolist() == []
@@ -0,0 +1,121 @@
+import io
+
+import pytest
+
+from modulos import ingestao
+from modulos.ingestao import (
+    ArquivoEmMemoria, detectar_formato, iterar_lotes_registros, iterar_registros_brutos
+)
+
+TSV = (
+    "Circuit001\t7/22/25 10:44\t7/29/25 6:00\tSAEJ2801\tM60GD\tAMOSTRA_1\n"
+    "Circuit001\t7/15/25 13:56\t7/22/25 9:12\tSAEJ2801\tM60GD\tAMOSTRA_2\n"
+    "Circuit002\t7/20/25 8:00\t\tSAEJ2801\tM60GD\tAMOSTRA_3\n"
+    "Circuit003\t7/01/25 8:00\t7/02/25\tNORMA\tMODELO\tAMOSTRA_4\n"
+    "\t\t\t\n"
+    "Circuit004\t7/03/25 8:00\t7/04/25 9:00\tveja Circuit005\tX\tY\n"
+    "Circuit006\t7/05/25 8:00\n"
+    " 10:00 continua\n"
+    "Circuit007\t7/06/25 8:00\t7/07/25 8:00\n"
+)
+
+IRREGULAR = (
+    "Relatório do digitalizador\n"
+    "ensaio do Circuit010 iniciado em 7/22/25 10:44\n"
+    "  encerrado em 7/29/25 6:00 observação\n"
+    "Circuit011 7/01/25 8:00 Circuit012 7/02/25 9:00\n"
+    "7/03/25 10:00 fim\n"
+)
+
+
+def _linhas(fontes):
+    # Cada arquivo inteiro na memória, em utf-8 ou, se não for válido, em latin-1
+    for fonte in fontes:
+        try:
+            with open(fonte, 'rb') as f:
+                dados = f.read()
+        except FileNotFoundError:
+            continue
+        try:
+            texto = dados.decode('utf-8')
+        except UnicodeDecodeError:
+            texto = dados.decode('latin-1')
+        yield from io.StringIO(texto, newline=None)
+
+
+def _registros_de_referencia(fontes):
+    return list(iterar_registros_brutos(_linhas(fontes)))
+
+
+def _registros_em_lotes(fontes, tamanho_bloco, estatisticas=None):
+    registros = []
+    for colunas in iterar_lotes_registros(fontes, estatisticas, tamanho_bloco):
+        registros.extend(zip(*[list(coluna) for coluna in colunas]))
+    return registros
+
+
+def _fontes(tmp_path, textos, codificacao='utf-8'):
+    fontes = []
+    for i, texto in enumerate(textos):
+        caminho = tmp_path / f'dig{i}.txt'
+        caminho.write_bytes(texto.encode(codificacao))
+        fontes.append(str(caminho))
+    return fontes
+
+
+@pytest.mark.parametrize('tamanho_bloco', [1, 7, 64, 1 << 20])
+def test_lotes_iguais_a_varredura(tmp_path, tamanho_bloco):
+    fontes = _fontes(tmp_path, [TSV, IRREGULAR, TSV.replace('\n', '\r\n')])
+    assert _registros_em_lotes(fontes, tamanho_bloco) == _registros_de_referencia(fontes)
+
+
+@pytest.mark.parametrize('tamanho_bloco', [1, 64, 1 << 20])
+def test_uploads_em_memoria_e_latin1(tmp_path, tamanho_bloco):
+    texto = TSV.replace('AMOSTRA_1', 'AMOSTRA_ÇÃO')
+    fontes = _fontes(tmp_path, [texto], 'latin-1')
+    em_memoria = [ArquivoEmMemoria('dig0.txt', memoryview(texto.encode('latin-1')))]
+    esperado = _registros_de_referencia(fontes)
+    assert any(r[5] == 'AMOSTRA_ÇÃO' for r in esperado)
+    assert _registros_em_lotes(fontes, tamanho_bloco) == esperado
+    assert _registros_em_lotes(em_memoria, tamanho_bloco) == esperado
+
+
+def test_atributos_pela_posicao_mesmo_sem_datastop(tmp_path):
+    registros = _registros_em_lotes(_fontes(tmp_path, [TSV]), 1 << 20)
+    assert ('Circuit002', '7/20/25 8:00', None, 'SAEJ2801', 'M60GD', 'AMOSTRA_3') in registros
+
+
+def test_estatisticas_do_caminho_rapido(tmp_path):
+    estatisticas = {}
+    fontes = _fontes(tmp_path, [TSV, IRREGULAR])
+    _registros_em_lotes(fontes, 1 << 20, estatisticas)
+    assert estatisticas['arquivos_tsv'] == 1
+    assert estatisticas['arquivos_irregular'] == 1
+    assert estatisticas['bytes'] == sum(len(t.encode()) for t in (TSV, IRREGULAR))
+    assert 0 < estatisticas['linhas_tsv'] < estatisticas['linhas']
+
+
+def test_detectar_formato():
+    assert detectar_formato(TSV) == 'tsv'
+    assert detectar_formato(IRREGULAR) == 'irregular'
+    assert detectar_formato('') == 'irregular'
+
+
+def test_arquivo_inexistente_e_ignorado(tmp_path):
+    fontes = _fontes(tmp_path, [TSV])
+    assert _registros_em_lotes([str(tmp_path / 'nao_existe.txt')] + fontes, 1 << 20) == _registros_de_referencia(fontes)
+
+
+@pytest.mark.parametrize('tamanho_bloco', [1, 5, 64, 1 << 20])
+@pytest.mark.parametrize('final', ['', '\r', 'Ã'])
+def test_latin1_so_no_fim_e_lido_uma_vez(tmp_path, monkeypatch, tamanho_bloco, final):
+    # O utf-8 só falha perto do fim: a leitura troca para latin-1 ali, sem reler o arquivo
+    texto = TSV.replace('\n', '\r\n') * 20 + "Circuit008\t7/08/25 8:00\t7/09/25 8:00\tNÇ\tMÃ\tAÉ\r\n" + TSV + final
+    fontes = _fontes(tmp_path, [texto], 'latin-1')
+    leituras = []
+    blocos_de_bytes = ingestao._blocos_de_bytes
+    monkeypatch.setattr(ingestao, '_blocos_de_bytes', lambda *a: leituras.append(a) or blocos_de_bytes(*a))
+    registros = _registros_em_lotes(fontes, tamanho_bloco)
+    assert len(leituras) == 1
+    assert ('Circuit008', '7/08/25 8:00', '7/09/25 8:00', 'NÇ', 'MÃ', 'AÉ') in registros
+    assert registros == _registros_de_referencia(fontes)
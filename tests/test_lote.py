@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modulos.processamento import calcular_oee, calcular_oee_lote, exportar_excel_lote
+
+PERIODOS = [(2025, 8), (2025, 6), (2025, 7), (2025, 7)]
+
+
+@pytest.fixture
+def caminho_csv(tmp_path):
+    gerador = np.random.default_rng(3)
+    n = 200
+    inicios = pd.Timestamp('2025-05-15') + pd.to_timedelta(gerador.integers(0, 110 * 24, n), unit='h')
+    df = pd.DataFrame({
+        'circuito': [f'Circuit{c:03d}' for c in gerador.integers(1, 20, n)],
+        'datastart': inicios,
+        'datastop': inicios + pd.to_timedelta(gerador.integers(1, 15 * 24, n), unit='h'),
+    })
+    df.loc[gerador.random(n) < 0.05, 'datastop'] = pd.NaT
+    caminho = str(tmp_path / 'dados_processados.csv')
+    df.to_csv(caminho, sep=';', index=False, date_format='%d/%m/%Y %H:%M:%S', na_rep='')
+    return caminho
+
+
+def _comparar(a, b):
+    assert a['sumario'] == b['sumario']
+    assert a['calendario']['circuitos'] == b['calendario']['circuitos']
+    np.testing.assert_array_equal(a['calendario']['codigos'], b['calendario']['codigos'])
+    pd.testing.assert_frame_equal(a['horas_status'], b['horas_status'])
+
+
+def test_lote_igual_a_um_mes_por_vez(caminho_csv):
+    ensaios = {(2025, 6): 8, (2025, 7): 9, (2025, 8): 10}
+    regras = {'circuitos_up': ['Circuit002'], 'tipo_up': "Forçar 100% UP", 'circuitos_vazio': ['Circuit005']}
+    resultados = calcular_oee_lote(caminho_csv, PERIODOS, capacidade_total=20, regras_de_force=regras, min_dias_up=2,
+                                   ensaios_executados=ensaios, ensaios_solicitados=10, relatorios_no_prazo=1, relatorios_emitidos=1)
+    assert list(resultados) == [(2025, 6), (2025, 7), (2025, 8)]
+    for (ano, mes), resultado in resultados.items():
+        um_mes = calcular_oee(caminho_csv, ano, mes, capacidade_total=20, regras_de_force=regras, min_dias_up=2,
+                              ensaios_executados=ensaios[(ano, mes)], ensaios_solicitados=10, relatorios_no_prazo=1, relatorios_emitidos=1)
+        _comparar(resultado, um_mes)
+        assert resultado['sumario']['Performance'] == ensaios[(ano, mes)] * 10
+
+
+def test_lote_usa_o_cache_de_resultados(caminho_csv, tmp_path):
+    pasta_cache = str(tmp_path / 'cache')
+    primeiro = calcular_oee_lote(caminho_csv, PERIODOS, pasta_cache=pasta_cache)
+    assert len(os.listdir(pasta_cache)) == 3
+    segundo = calcular_oee_lote(caminho_csv, PERIODOS, pasta_cache=pasta_cache)
+    for periodo in primeiro:
+        assert 'desempenho' not in segundo[periodo]
+        _comparar(primeiro[periodo], segundo[periodo])
+    assert calcular_oee_lote(caminho_csv, []) == {}
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_planilhas_do_lote_e_tempos_no_log(caminho_csv, tmp_path, caplog, max_workers):
+    resultados = calcular_oee_lote(caminho_csv, PERIODOS)
+    pasta = tmp_path / f'saida{max_workers}'
+    pasta.mkdir()
+    with caplog.at_level(logging.INFO, logger='modulos.desempenho'):
+        caminhos = exportar_excel_lote(resultados, str(pasta), max_workers=max_workers)
+
+    assert caminhos == {(ano, mes): str(pasta / f'Excel_OEE_{ano}_{mes:02d}.xlsx') for ano, mes in resultados}
+    assert sorted(os.listdir(pasta)) == sorted(os.path.basename(c) for c in caminhos.values())
+    registros = [json.loads(r.getMessage()) for r in caplog.records if r.name == 'modulos.desempenho']
+    assert sorted((r['ano'], r['mes']) for r in registros if r['operacao'] == 'excel') == list(resultados)
+    for periodo, resultado in resultados.items():
+        assert resultado['caminho_excel'] == caminhos[periodo]
+        assert resultado['desempenho']['etapas']['excel'] > 0
+
+
+def test_planilha_que_falha_fica_sem_caminho(caminho_csv, tmp_path):
+    resultados = calcular_oee_lote(caminho_csv, [(2025, 7)])
+    assert exportar_excel_lote(resultados, str(tmp_path / 'nao_existe')) == {(2025, 7): None}
+    assert 'caminho_excel' not in resultados[(2025, 7)]
@@ -0,0 +1,145 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from modulos.desempenho import MedidorDesempenho
+from modulos.manifesto import carregar_manifesto, carregar_registros, salvar_manifesto, salvar_registros
+from modulos.processamento import calcular_oee, limpar_dados_brutos
+
+ARQUIVOS = {
+    'dig01.txt': (
+        "Circuit001\t7/22/25 10:44\t7/29/25 6:00\tSAEJ2801\tM60GD\tA1\n"
+        "Circuit001\t7/15/25 13:56\t7/22/25 9:12\tSAEJ2801\tM60GD\tA2\n"
+        "Circuit002\t7/01/25 8:00\t7/10/25 8:00\tNORMA\tM70\tA3\n"
+    ),
+    'dig02.txt': (
+        "Circuit002\t7/05/25 8:00\t7/12/25 8:00\tNORMA\tM70\tA4\n"
+        "Circuit003\t7/20/25 8:00\t\tNORMA\tM70\tA5\n"
+        "Circuit001\t7/22/25 10:44\t7/29/25 6:00\tSAEJ2801\tM60GD\tA1\n"
+        "Circuit004\t6/28/25 8:00\t6/29/25 8:00\tOUTRA\tM80\tA8\n"
+    ),
+    'dig03.txt': (
+        "Circuit004\t6/28/25 8:00\t7/03/25 8:00\tOUTRA\tM80\tA6\n"
+        "Circuit002\t7/01/25 8:00\t7/10/25 8:00\tNORMA\tM70\tA3\n"
+    ),
+}
+
+
+@pytest.fixture
+def arquivos(tmp_path):
+    pasta = tmp_path / 'brutos'
+    pasta.mkdir()
+    caminhos = {}
+    for nome, conteudo in ARQUIVOS.items():
+        (pasta / nome).write_text(conteudo)
+        caminhos[nome] = str(pasta / nome)
+    return caminhos
+
+
+def _processar(lista, pasta, **kwargs):
+    os.makedirs(pasta, exist_ok=True)
+    caminho_csv = os.path.join(pasta, 'dados_processados.csv')
+    sucesso, circuitos = limpar_dados_brutos(lista, caminho_csv, formato_data='mm/dd/aaaa', **kwargs)
+    assert sucesso
+    return caminho_csv, circuitos
+
+
+def _completo(lista, tmp_path):
+    pasta = tmp_path / 'completo'
+    shutil.rmtree(pasta, ignore_errors=True)
+    return _processar(lista, str(pasta))[0]
+
+
+def _ler(caminho):
+    with open(caminho, 'rb') as f:
+        return f.read()
+
+
+def test_incremental_igual_ao_completo(arquivos, tmp_path):
+    pasta_incremental = str(tmp_path / 'incremental')
+    todos = list(arquivos.values())
+    cenarios = [
+        todos,
+        [arquivos['dig01.txt'], arquivos['dig03.txt']],  # arquivo retirado
+        [arquivos['dig03.txt'], arquivos['dig01.txt'], arquivos['dig02.txt']],  # outra ordem e arquivo de volta
+    ]
+    for i, lista in enumerate(cenarios):
+        if i == 2:
+            with open(arquivos['dig01.txt'], 'a') as f:
+                f.write("Circuit005\t7/02/25 8:00\t7/03/25 8:00\tNOVA\tM90\tA7\n")
+        caminho_incremental, _ = _processar(lista, pasta_incremental, incremental=True)
+        caminho_completo = _completo(lista, tmp_path)
+        assert _ler(caminho_incremental) == _ler(caminho_completo)
+        qualidade = lambda caminho: _ler(os.path.join(os.path.dirname(caminho), 'qualidade_dados.csv'))
+        assert qualidade(caminho_incremental) == qualidade(caminho_completo)
+
+
+def test_arquivo_retirado_sai_do_incremental(arquivos, tmp_path):
+    pasta = str(tmp_path / 'incremental')
+    _processar(list(arquivos.values()), pasta, incremental=True)
+    caminho_csv, circuitos = _processar([arquivos['dig01.txt']], pasta, incremental=True)
+    assert circuitos == ['Circuit001', 'Circuit002']
+    assert 'Circuit004' not in set(pd.read_csv(caminho_csv, sep=';')['circuito'])
+
+
+def test_gravacoes_simultaneas_do_estado(arquivos, tmp_path):
+    # Várias tarefas na mesma pasta gravam manifesto e registros ao mesmo tempo
+    pasta = str(tmp_path / 'incremental')
+    _processar(list(arquivos.values()), pasta, incremental=True)
+    manifesto, df_registros = carregar_manifesto(pasta), carregar_registros(pasta)
+
+    def gravar(_):
+        for _ in range(30):
+            salvar_manifesto(pasta, manifesto)
+            salvar_registros(pasta, df_registros)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(gravar, range(4)))
+    assert carregar_manifesto(pasta) == manifesto
+    pd.testing.assert_frame_equal(carregar_registros(pasta), df_registros)
+    assert sorted(os.listdir(pasta)) == ['dados_processados.csv', 'dados_processados_particoes', 'manifesto_ingestao.json',
+                                         'qualidade_dados.csv', 'registros_processados.pkl']
+
+
+def test_duplicatas_e_sobreposicoes_no_csv(arquivos, tmp_path):
+    medidor = MedidorDesempenho()
+    caminho_csv, _ = _processar(list(arquivos.values()), str(tmp_path / 'saida'), medidor=medidor)
+    df = pd.read_csv(caminho_csv, sep=';')
+    # Circuit001 10:44 aparece em dois arquivos e Circuit002 01/07 também: cada um fica uma vez só.
+    # Circuit002 01/07-10/07 e 05/07-12/07 se sobrepõem e viram um intervalo; Circuit004 começa duas
+    # vezes no mesmo instante com fins diferentes e fica com o maior
+    assert len(df) == 5
+    assert df[df['circuito'] == 'Circuit002'][['datastart', 'datastop']].values.tolist() == [['01/07/2025 08:00:00', '12/07/2025 08:00:00']]
+    assert df[df['circuito'] == 'Circuit004']['datastop'].tolist() == ['03/07/2025 08:00:00']
+    contadores = medidor.resumo()['contadores']
+    assert contadores['duplicatas'] == 2
+    assert contadores['sobrepostas'] == 4
+    assert contadores['sem_datastop'] == 1
+    assert contadores['registros_gravados'] == 5
+
+
+def test_mesclar_nao_muda_a_disponibilidade(arquivos, tmp_path):
+    lista = list(arquivos.values())
+    mesclado, _ = _processar(lista, str(tmp_path / 'mesclado'))
+    separado, _ = _processar(lista, str(tmp_path / 'separado'), mesclar_sobreposicoes=False)
+    assert len(pd.read_csv(separado, sep=';')) == 7
+    for ano, mes in ((2025, 6), (2025, 7)):
+        a = calcular_oee(mesclado, ano, mes, capacidade_total=10)
+        b = calcular_oee(separado, ano, mes, capacidade_total=10)
+        assert a['sumario'] == b['sumario']
+        pd.testing.assert_frame_equal(a['horas_status'], b['horas_status'])
+
+
+def test_atividade_em_aberto_nao_engole_as_seguintes(tmp_path):
+    bruto = tmp_path / 'dig.txt'
+    bruto.write_text(
+        "Circuit010\t7/01/25 8:00\t\tNORMA\tM70\tA1\n"
+        "Circuit010\t7/05/25 8:00\t7/06/25 8:00\tOUTRA\tM80\tA2\n"
+        "Circuit010\t7/08/25 8:00\t7/09/25 8:00\tOUTRA\tM80\tA3\n"
+    )
+    caminho_csv, _ = _processar([str(bruto)], str(tmp_path / 'saida'))
+    df = pd.read_csv(caminho_csv, sep=';', keep_default_na=False)
+    assert sorted(zip(df['amostra'], df['datastop'])) == [('A1', ''), ('A2', '06/07/2025 08:00:00'), ('A3', '09/07/2025 08:00:00')]
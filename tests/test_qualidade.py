@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from modulos.qualidade import analisar_intervalos, gravar_relatorio_qualidade, resumo_qualidade
+
+
+def _t(texto):
+    return np.datetime64(texto, 'ns') if texto else np.datetime64('NaT', 'ns')
+
+
+def _intervalos(linhas):
+    codigos = np.array([c for c, _, _ in linhas])
+    return codigos, np.array([_t(a) for _, a, _ in linhas]), np.array([_t(b) for _, _, b in linhas])
+
+
+def test_duplicata_exata_sai_e_fica_a_ultima_copia():
+    codigos, inicios, fins = _intervalos([
+        (0, '2025-07-01T08:00', '2025-07-02T08:00'),
+        (1, '2025-07-01T08:00', '2025-07-02T08:00'),
+        (0, '2025-07-01T08:00', '2025-07-02T08:00'),
+    ])
+    analise = analisar_intervalos(codigos, inicios, fins)
+    assert analise['linhas'].tolist() == [1, 2]
+    assert analise['duplicata'].tolist() == [True, False, False]
+    assert not analise['sobreposta'].any()
+    assert resumo_qualidade(analise)['duplicatas'] == 1
+
+
+def test_sobreposicao_mesclada_cobre_a_uniao():
+    codigos, inicios, fins = _intervalos([
+        (0, '2025-07-01', '2025-07-05'),
+        (0, '2025-07-03', '2025-07-10'),
+        (0, '2025-07-04', '2025-07-06'),
+        (0, '2025-07-10', '2025-07-12'),  # só encosta no fim anterior: não sobrepõe
+    ])
+    analise = analisar_intervalos(codigos, inicios, fins, mesclar=True)
+    assert analise['sobreposta'].tolist() == [True, True, True, False]
+    assert analise['linhas'].tolist() == [2, 3]
+    np.testing.assert_array_equal(analise['datastart'], [_t('2025-07-01'), _t('2025-07-10')])
+    np.testing.assert_array_equal(analise['datastop'], [_t('2025-07-10'), _t('2025-07-12')])
+
+
+def test_sem_mesclar_mantem_as_linhas_sobrepostas():
+    codigos, inicios, fins = _intervalos([
+        (0, '2025-07-01', '2025-07-05'),
+        (0, '2025-07-03', '2025-07-10'),
+    ])
+    analise = analisar_intervalos(codigos, inicios, fins, mesclar=False)
+    assert analise['linhas'].tolist() == [0, 1]
+    assert analise['sobreposta'].all()
+    np.testing.assert_array_equal(analise['datastop'], fins)
+
+
+def test_datastop_vazio_nao_absorve_as_atividades_seguintes():
+    codigos, inicios, fins = _intervalos([
+        (0, '2025-07-01', None),
+        (0, '2025-07-05', '2025-07-06'),
+        (0, '2025-07-08', '2025-07-12'),
+        (0, '2025-07-10', '2025-07-15'),
+        (1, '2025-07-05', '2025-07-06'),
+        (0, '2025-07-01', None),
+    ])
+    analise = analisar_intervalos(codigos, inicios, fins, mesclar=True)
+    assert analise['sem_datastop'].tolist() == [True, False, False, False, False, True]
+    assert analise['duplicata'].tolist() == [True, False, False, False, False, False]
+    assert analise['sobreposta'].tolist() == [False, False, True, True, False, False]
+    assert analise['linhas'].tolist() == [1, 3, 4, 5]
+    np.testing.assert_array_equal(analise['datastart'], [_t('2025-07-05'), _t('2025-07-08'), _t('2025-07-05'), _t('2025-07-01')])
+    np.testing.assert_array_equal(analise['datastop'], [_t('2025-07-06'), _t('2025-07-15'), _t('2025-07-06'), _t(None)])
+    assert resumo_qualidade(analise)['sem_datastop'] == 1
+
+
+def test_circuitos_diferentes_nao_se_sobrepoem():
+    codigos, inicios, fins = _intervalos([
+        (0, '2025-07-01', '2025-07-05'),
+        (1, '2025-07-02', '2025-07-04'),
+    ])
+    analise = analisar_intervalos(codigos, inicios, fins)
+    assert not analise['sobreposta'].any()
+    assert len(analise['linhas']) == 2
+
+
+def test_relatorio_lista_cada_problema(tmp_path):
+    codigos, inicios, fins = _intervalos([
+        (0, '2025-07-01', '2025-07-05'),
+        (0, '2025-07-01', '2025-07-05'),
+        (0, '2025-07-03', '2025-07-08'),
+        (0, '2025-07-03', None),
+    ])
+    analise = analisar_intervalos(codigos, inicios, fins)
+    atributos = {'norma': pd.Categorical(['A', 'A', 'B', 'C'])}
+    caminho = gravar_relatorio_qualidade(str(tmp_path / 'qualidade_dados.csv'), np.array(['Circuit1'] * 4, dtype=object),
+                                         inicios, fins, atributos, analise)
+    df = pd.read_csv(caminho, sep=';')
+    assert sorted(zip(df['problema'], df['acao'])) == [
+        ('duplicata', 'removida'), ('sem_datastop', 'mantida'), ('sobreposicao', 'mesclada'), ('sobreposicao', 'mesclada')
+    ]
+    # A duplicata e a sobreposição no mesmo grupo; a linha em aberto fica num grupo só dela
+    assert df.groupby('problema')['grupo'].unique().map(list).to_dict() == {'duplicata': [0], 'sobreposicao': [0], 'sem_datastop': [1]}
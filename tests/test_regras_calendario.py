@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modulos.calendario import (
+    ROTULOS_STATUS, aplicar_forcas_matriz, calendario_para_dataframe, contar_status_por_linha, selecionar_circuitos
+)
+
+DIAS = pd.date_range('2025-07-01', '2025-07-31', freq='D')
+ROTULOS = ROTULOS_STATUS + ['MANUT', np.nan]
+
+
+def _matriz(semente, n_circuitos=40):
+    gerador = np.random.default_rng(semente)
+    return gerador.integers(0, len(ROTULOS), (n_circuitos, len(DIAS))).astype(np.int8)
+
+
+def test_contagem_por_linha_igual_a_um_bincount_por_circuito():
+    matriz = _matriz(0)
+    esperado = np.array([np.bincount(linha, minlength=len(ROTULOS)) for linha in matriz.astype(np.int64)])
+    np.testing.assert_array_equal(contar_status_por_linha(matriz, len(ROTULOS)), esperado)
+    assert contar_status_por_linha(matriz[:0], len(ROTULOS)).shape == (0, len(ROTULOS))
+
+
+def test_calendario_em_dataframe_de_strings():
+    matriz = _matriz(1, n_circuitos=3)
+    calendario = {'codigos': matriz, 'rotulos': ROTULOS, 'circuitos': ['Circuit001', 'Circuit002', 'iDevice'], 'dias': list(DIAS.day)}
+    df = calendario_para_dataframe(calendario)
+    assert list(df.index) == calendario['circuitos'] and list(df.columns) == list(DIAS.day) and df.columns.name == 'Data'
+    for i in range(matriz.shape[0]):
+        for j in range(matriz.shape[1]):
+            valor = ROTULOS[matriz[i, j]]
+            assert df.iat[i, j] == valor or (pd.isna(valor) and pd.isna(df.iat[i, j]))
+
+
+def _forcas_celula_a_celula(matriz, circuitos, regras_de_force):
+    valores = np.asarray(ROTULOS, dtype=object)[matriz]
+    for i, circuito in enumerate(circuitos):
+        for j, dia in enumerate(DIAS):
+            if circuito in regras_de_force.get('circuitos_up', []):
+                if regras_de_force.get('tipo_up') == "Forçar 100% UP":
+                    valores[i, j] = 'UP'
+                elif regras_de_force.get('tipo_up') == "Forçar Semana Padrão (Seg-Sex UP)":
+                    valores[i, j] = 'UP' if dia.weekday() < 5 else 'PP'
+            if circuito in regras_de_force.get('circuitos_pq', []):
+                valores[i, j] = 'PQ'
+    return valores
+
+
+def _selecao_por_circuito(matriz, circuitos, regras_de_force, min_dias_up, aplicar_min_dias_up):
+    # Como o laço por circuito anterior: nulos fora de SD/PP e do mínimo de dias UP; sai a linha só com '' ou só com nulos
+    usados, apenas_sd_pp = [], []
+    forcados = set(regras_de_force.get('circuitos_up', [])) | set(regras_de_force.get('circuitos_pq', []))
+    for circuito, linha in zip(circuitos, np.asarray(ROTULOS, dtype=object)[matriz]):
+        status = [s for s in linha if not pd.isna(s)]
+        so_sd_pp = bool(status) and set(status) <= {'SD', 'PP'}
+        usado = bool(status) and not so_sd_pp and any(s != '' for s in linha)
+        if aplicar_min_dias_up:
+            usado &= circuito in forcados or status.count('UP') >= min_dias_up
+        usados.append(usado)
+        apenas_sd_pp.append(so_sd_pp)
+    return usados, apenas_sd_pp
+
+
+@pytest.mark.parametrize('regras_de_force', [
+    {},
+    {'circuitos_up': ['Circuit001', 'Circuit999'], 'tipo_up': "Forçar 100% UP"},
+    {'circuitos_up': ['Circuit002', 'Circuit003'], 'tipo_up': "Forçar Semana Padrão (Seg-Sex UP)", 'circuitos_pq': ['Circuit003', 'Circuit998']},
+    {'circuitos_up': ['Circuit004'], 'tipo_up': "Outro", 'circuitos_pq': ['Circuit005']},
+])
+def test_forcas_iguais_a_celula_a_celula(regras_de_force):
+    matriz = _matriz(2, n_circuitos=8)
+    circuitos = [f'Circuit{i:03d}' for i in range(1, 9)]
+    esperado = _forcas_celula_a_celula(matriz, circuitos, regras_de_force)
+    aplicar_forcas_matriz(matriz, circuitos, DIAS, regras_de_force)
+    np.testing.assert_array_equal(np.asarray(ROTULOS, dtype=object)[matriz].astype(str), esperado.astype(str))
+    assert aplicar_forcas_matriz(matriz[:0], [], DIAS, regras_de_force).shape == (0, len(DIAS))
+
+
+@pytest.mark.parametrize('semente', range(3))
+@pytest.mark.parametrize('min_dias_up, aplicar_min_dias_up', [(1, True), (4, True), (4, False)])
+def test_selecao_igual_a_um_circuito_por_vez(semente, min_dias_up, aplicar_min_dias_up):
+    gerador = np.random.default_rng(semente)
+    # Poucos status por linha para aparecerem linhas só com SD/PP, só com '' ou só com nulos
+    codigos = {'': 0, 'SD': 1, 'PP': 2, 'UP': 3, 'PQ': 4, 'MANUT': 5, 'nulo': 6}
+    escolhas = [['SD', 'PP'], ['SD'], [''], ['nulo'], ['', 'nulo'], ['SD', 'nulo'], ['UP', 'SD'], ['UP', 'PP', 'PQ'], ['MANUT', 'SD'], ['PQ']]
+    linhas = [escolhas[i % len(escolhas)] for i in range(40)]
+    matriz = np.array([[codigos[s] for s in gerador.choice(opcoes, len(DIAS))] for opcoes in linhas], dtype=np.int8)
+    circuitos = [f'Circuit{i:03d}' for i in range(len(linhas))]
+    regras_de_force = {'circuitos_up': ['Circuit000', 'Circuit006'], 'circuitos_pq': ['Circuit009']}
+
+    usados, apenas_sd_pp = selecionar_circuitos(matriz, ROTULOS, circuitos, regras_de_force, min_dias_up, aplicar_min_dias_up)
+    esperado_usados, esperado_sd_pp = _selecao_por_circuito(matriz, circuitos, regras_de_force, min_dias_up, aplicar_min_dias_up)
+    assert usados.tolist() == esperado_usados
+    assert apenas_sd_pp.tolist() == esperado_sd_pp
+    # Forçado fica mesmo sem o mínimo de dias UP, mas não se só tiver SD/PP
+    assert not usados[0] and apenas_sd_pp[0]
+    assert not usados[2] and not usados[3]
+
+
+def test_selecao_sem_circuitos():
+    usados, apenas_sd_pp = selecionar_circuitos(np.zeros((0, len(DIAS)), dtype=np.int8), ROTULOS, [], {}, 1, True)
+    assert usados.shape == apenas_sd_pp.shape == (0,)
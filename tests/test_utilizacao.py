@@ -0,0 +1,71 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modulos.calendario import agregar_utilizacao, construir_calendario_vencedores
+
+DIAS = pd.date_range('2025-07-01', '2025-07-31', freq='D')
+
+
+def _atividades(semente, n=150):
+    gerador = np.random.default_rng(semente)
+    inicios = pd.Timestamp('2025-06-20') + pd.to_timedelta(gerador.integers(0, 45 * 24, n), unit='h')
+    return pd.DataFrame({
+        'circuito': [f'Circuit{c:03d}' for c in gerador.integers(1, 12, n)],
+        'datastart': inicios,
+        'datastop': inicios + pd.to_timedelta(gerador.integers(0, 10 * 24, n), unit='h'),
+        'status': gerador.choice(['UP', 'UP', 'PQ', 'MANUT'], n),
+        'norma': gerador.choice(['SAEJ2801', 'NBR', 'IEC', None], n),
+        'modelo': gerador.choice(['M60', 'M70'], n),
+    })
+
+
+def _agrupamentos(df, circuitos):
+    agrupamentos = {}
+    for coluna in ('norma', 'modelo'):
+        categorico = pd.Categorical(df[coluna])
+        agrupamentos[coluna] = (categorico.codes, list(categorico.categories))
+    agrupamentos['circuito'] = (pd.Index(circuitos, dtype=object).get_indexer(df['circuito']), circuitos)
+    return agrupamentos
+
+
+def _por_celula(df, circuitos, matriz, rotulos, vencedor, coluna):
+    # Célula a célula: o grupo é o da atividade que venceu o dia
+    dias, circuitos_grupo = defaultdict(Counter), defaultdict(set)
+    for celula in np.flatnonzero(vencedor >= 0):
+        i, j = divmod(celula, len(DIAS))
+        grupo = df.iloc[vencedor[celula]][coluna]
+        grupo = '(não informado)' if pd.isna(grupo) else grupo
+        dias[grupo][rotulos[matriz[i, j]]] += 1
+        circuitos_grupo[grupo].add(circuitos[i])
+    return {
+        grupo: {**contagem, 'dias': sum(contagem.values()), 'circuitos': len(circuitos_grupo[grupo]),
+                'utilizacao': round(sum(contagem.values()) / (len(circuitos_grupo[grupo]) * len(DIAS)) * 100, 2)}
+        for grupo, contagem in dias.items()
+    }
+
+
+@pytest.mark.parametrize('semente', range(3))
+def test_utilizacao_igual_a_contagem_por_celula(semente):
+    df = _atividades(semente)
+    # Circuito sem atividade na matriz e atividade de circuito fora dela
+    circuitos = sorted(set(df['circuito']) - {'Circuit011'}) + ['Circuit999']
+    matriz, rotulos, vencedor = construir_calendario_vencedores(circuitos, DIAS, df)
+    utilizacao = agregar_utilizacao(matriz, rotulos, vencedor, _agrupamentos(df, circuitos))
+
+    assert list(utilizacao) == ['norma', 'modelo', 'circuito']
+    for coluna, df_grupo in utilizacao.items():
+        assert df_grupo.index.name == coluna
+        assert df_grupo['dias'].is_monotonic_decreasing
+        esperado = _por_celula(df, circuitos, matriz, rotulos, vencedor, coluna)
+        obtido = {grupo: {k: v for k, v in linha.items() if v} for grupo, linha in df_grupo.to_dict('index').items()}
+        assert obtido == esperado
+
+
+def test_sem_atividades_no_mes():
+    df = _atividades(0).iloc[:0]
+    matriz, rotulos, vencedor = construir_calendario_vencedores(['Circuit001'], DIAS, df)
+    utilizacao = agregar_utilizacao(matriz, rotulos, vencedor, _agrupamentos(df, ['Circuit001']))
+    assert all(df_grupo.empty for df_grupo in utilizacao.values())